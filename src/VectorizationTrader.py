@@ -1,229 +1,252 @@
 import numpy as np
+from population import Population, Strategy
 
-def finish_position_change(traders, current_price: float) -> tuple[np.int32, np.int32]:
-    current_price = np.float64(current_price)
-    buy_traders = traders['order_positions'] > 0
-    sell_traders = traders['order_positions'] < 0
-    not_enough_cash = (traders['order_positions'] > 0) & (traders['cash'] < traders['order_positions'] * current_price)
-    if np.any(not_enough_cash):
-        traders['order_positions'][not_enough_cash] = np.floor(traders['cash'][not_enough_cash] / current_price).astype(np.int32)
-        traders['positions'][not_enough_cash] += traders['order_positions'][not_enough_cash]
-        traders['cash'][not_enough_cash] -= traders['order_positions'][not_enough_cash] * current_price
-    not_enough_position = (traders['order_positions'] < 0) & ((traders['positions'] + traders['order_positions']) < 0)
-    if np.any(not_enough_position):
-        traders['order_positions'][not_enough_position] = -traders['positions'][not_enough_position]
-        traders['cash'][not_enough_position] -= traders['order_positions'][not_enough_position] * current_price
-        traders['positions'][not_enough_position] = 0
-    others = ~(not_enough_position | not_enough_cash)
-    if np.any(others):
-        traders['positions'][others] += traders['order_positions'][others]
-        traders['cash'][others] -= traders['order_positions'][others] * current_price
-    buy_amount = np.sum(traders['order_positions'][buy_traders])
-    sell_amount = np.sum(traders['order_positions'][sell_traders])
-    traders['order_positions'] = 0
-    return buy_amount, sell_amount
-
-class NoiseTrader():
-    def __init__(self, n: int, 
-                 min_start_cash = 10000.0, max_start_cash = 30000.0,
-                 min_start_positions = 100, max_start_positions = 300,
-                 average_trade_amount = 15, average_wait_time = 1.0, backruptcy_cash = 1000.0):
-        n = np.int32(n)
-        random_trader = np.dtype([
-            ('cash', 'float64'),
-            ('positions', 'int32'),
-            ('order_positions', 'int32'),
-            ('cooldown', 'int32'),
-        ])
+class NoiseStrategy(Strategy):
+    # buys or sells an exponential amount with probability 0.4 each, and waits an exponential cooldown
+    name = 'noise'
+    floats = 2
+    masks = 1
+
+    def __init__(self, average_trade_amount = 15, average_wait_time = 1.0, bankruptcy_cash = 1000.0) -> None:
         self.__average_trade_amount = np.int32(average_trade_amount)
         self.__average_wait_time = np.float64(average_wait_time)
-        self.__bankruptcy_cash = np.float64(backruptcy_cash)
-        self.__traders = np.zeros(n, dtype=random_trader)
-        self.__traders['cash'] = np.random.uniform(min_start_cash, max_start_cash, n)
-        self.__traders['positions'] = np.random.randint(min_start_positions, max_start_positions, n).astype(np.int32)
-        self.__traders['order_positions'] = 0
-        self.__traders['cooldown'] = np.random.exponential(self.__average_wait_time, n).astype(np.int32)
-
-    def tick_decision(self, current_price: float) -> tuple[np.int32, np.int32]:
-        # deal with bankrupters
-        bankrupters = (self.__traders['cash'] <= self.__bankruptcy_cash) & (self.__traders['cooldown'] == 0)
-        amount = np.maximum(np.floor((self.__bankruptcy_cash - self.__traders['cash'][bankrupters]) / current_price * 2.0).astype(np.int32), 
-                            np.floor(np.random.exponential(self.__average_trade_amount, np.sum(bankrupters))).astype(np.int32))
-        amount = np.maximum(1, amount)
-        self.__traders['order_positions'][bankrupters] = -amount
-        # trade
-        decision_random = np.random.rand(np.size(self.__traders))
-        trade_random = np.random.exponential(self.__average_trade_amount, np.size(self.__traders)).astype(np.int32)
-        buy_traders = (self.__traders['cooldown'] == 0) & (self.__traders['cash'] > self.__bankruptcy_cash) & (decision_random < 0.4)
-        sell_traders = (self.__traders['cooldown'] == 0) & (self.__traders['cash'] > self.__bankruptcy_cash) & (decision_random >= 0.4) & (decision_random < 0.8)
-        self.__traders['order_positions'][buy_traders] = trade_random[buy_traders]
-        self.__traders['order_positions'][sell_traders] = -trade_random[sell_traders]
-        # deal with cooldown
-        active_traders = (self.__traders['cooldown'] == 0)
-        self.__traders['cooldown'][active_traders] = np.random.exponential(self.__average_wait_time, np.sum(active_traders)).astype(np.int32)
-        inactive_traders = ~(active_traders)
-        self.__traders['cooldown'][inactive_traders] -= 1
-        return finish_position_change(self.__traders, current_price)
-    
-class MomentumTrader():
-    def __init__(self, n: int, 
+        self.bankruptcy_cash = np.float64(bankruptcy_cash)
+
+    def get_parameters(self) -> dict:
+        return {'average_trade_amount': int(self.__average_trade_amount), 'average_wait_time': float(self.__average_wait_time)}
+
+    def first_wake(self, state: dict, generator: np.random.Generator, size: int) -> np.ndarray:
+        return generator.exponential(self.__average_wait_time, size).astype(np.int32)
+
+    def signal(self, agents: dict) -> None:
+        decision, trade = agents['floats']
+        mask, = agents['masks']
+        orders = agents['orders']
+        agents['rng'].random(out=decision)
+        agents['rng'].standard_exponential(out=trade)
+        np.multiply(trade, self.__average_trade_amount, out=trade)
+        np.trunc(trade, out=trade)
+        np.copyto(orders, trade)
+        np.greater_equal(decision, 0.8, out=mask)
+        np.copyto(orders, 0.0, where=mask)
+        np.greater_equal(decision, 0.4, out=mask)
+        np.negative(orders, out=orders, where=mask)
+        # a bankrupt noise trader sells at least what it meant to trade
+        agents['least'] = trade
+
+    def wait(self, agents: dict, out: np.ndarray) -> None:
+        cooldown = agents['floats'][0]
+        agents['rng'].standard_exponential(out=cooldown)
+        np.multiply(cooldown, self.__average_wait_time, out=cooldown)
+        np.copyto(out, cooldown, casting='unsafe')
+
+class NoiseTrader(Population):
+    def __init__(self, n: int,
                  min_start_cash = 10000.0, max_start_cash = 30000.0,
                  min_start_positions = 100, max_start_positions = 300,
-                 min_buy_proportion = 0.1, max_buy_proportion = 0.2,
+                 average_trade_amount = 15, average_wait_time = 1.0, backruptcy_cash = 1000.0,
+                 replicas = 1, seed = None, dtypes = None, churn = None, ledger = None):
+        super().__init__(NoiseStrategy(average_trade_amount, average_wait_time, backruptcy_cash), n,
+                         min_start_cash, max_start_cash, min_start_positions, max_start_positions,
+                         replicas=replicas, seed=seed, dtypes=dtypes, churn=churn, ledger=ledger)
+
+class MomentumStrategy(Strategy):
+    # compares the price's distance from its t tick moving average with the 3t tick volatility, t being the
+    # trader's decision time, and sells out once the price runs risk_coef above the average
+    name = 'momentum'
+    fields = {'decision_time': np.int32, 'judge_coef': np.float64, 'risk_coef': np.float64}
+    floats = 7
+    masks = 2
+    indices = 2
+    window = 1080
+
+    def __init__(self, min_buy_proportion = 0.1, max_buy_proportion = 0.2,
                  min_sell_proportion = 0.2, max_sell_proportion = 0.3,
-                 backruptcy_cash = 1000.0):
-        n = np.int32(n)
-        momentum_trader = np.dtype([
-            ('cash', 'float64'),
-            ('positions', 'int32'),
-            ('order_positions', 'int32'),
-            ('cooldown', 'int32'),
-            ('decision_time', 'int32'),
-            ('judge_coef', 'float64'),
-            ('risk_coef', 'float64'),
-        ])
+                 bankruptcy_cash = 1000.0, window = 1080) -> None:
         self.__min_buy_proportion = np.float64(min_buy_proportion)
         self.__max_buy_proportion = np.float64(max_buy_proportion)
         self.__min_sell_proportion = np.float64(min_sell_proportion)
         self.__max_sell_proportion = np.float64(max_sell_proportion)
-        self.__bankruptcy_cash = np.float64(backruptcy_cash)
-        self.__traders = np.zeros(n, dtype=momentum_trader)
-        self.__traders['cash'] = np.random.uniform(min_start_cash, max_start_cash, n)
-        self.__traders['positions'] = np.random.randint(min_start_positions, max_start_positions, n)
-        self.__traders['order_positions'] = 0
-        rand = np.random.rand(n)
-        self.__traders['decision_time'] = np.where(
+        self.bankruptcy_cash = np.float64(bankruptcy_cash)
+        self.window = int(window)
+
+    def get_parameters(self) -> dict:
+        return {'min_buy_proportion': float(self.__min_buy_proportion), 'max_buy_proportion': float(self.__max_buy_proportion),
+                'min_sell_proportion': float(self.__min_sell_proportion), 'max_sell_proportion': float(self.__max_sell_proportion)}
+
+    def initialize(self, state: dict, generator: np.random.Generator, shape: tuple) -> None:
+        rand = generator.random(shape)
+        state['decision_time'][:] = np.where(
                 rand < 0.5,
-                np.random.randint(30, 60, n),
+                generator.integers(30, 60, shape),
                 np.where(
                     rand < 0.8,
-                    np.random.randint(120, 180, n),
-                    np.random.randint(240, 360, n)
+                    generator.integers(120, 180, shape),
+                    generator.integers(240, 360, shape)
                 )
             )
-        self.__traders['judge_coef'] = np.random.uniform(1.0, 1.5, n)
-        self.__traders['risk_coef'] = np.random.uniform(1.05, 1.15, n)
-        active_times = self.__traders['decision_time'] 
-        self.__traders['cooldown'] = np.random.randint(active_times * 3, active_times * 4, n)
-        self.__price_before_1080ticks = np.zeros(1080, dtype=np.float64)
-        self.__price_prefix_sum = np.zeros(1080, dtype=np.float64)
-        self.__price_square_prefix_sum = np.zeros(1080, dtype=np.float64)
-        self.__len = 0
-
-    def __append(self, current_price: np.float64):
-        if self.__len == 0:
-            self.__price_before_1080ticks[self.__len] = current_price
-            self.__price_prefix_sum[self.__len] = current_price
-            self.__price_square_prefix_sum[self.__len] = (current_price) ** 2
-            self.__len += 1
-        elif self.__len < 1080:
-            self.__price_before_1080ticks[self.__len] = current_price
-            self.__price_prefix_sum[self.__len] =  self.__price_prefix_sum[self.__len - 1] + current_price
-            self.__price_square_prefix_sum[self.__len] = self.__price_square_prefix_sum[self.__len - 1] + (current_price) ** 2
-            self.__len += 1
-        else:
-            self.__price_before_1080ticks[:-1] = self.__price_before_1080ticks[1:]
-            self.__price_before_1080ticks[-1] = current_price
-            del_element = self.__price_prefix_sum[0]
-            self.__price_prefix_sum[:-1] = self.__price_prefix_sum[1:]
-            self.__price_prefix_sum[-1] = self.__price_prefix_sum[-2] + current_price
-            self.__price_prefix_sum -= del_element
-            del_element = self.__price_square_prefix_sum[0]
-            self.__price_square_prefix_sum[:-1] = self.__price_square_prefix_sum[1:]
-            self.__price_square_prefix_sum[-1] = self.__price_square_prefix_sum[-2] + (current_price) ** 2
-            self.__price_prefix_sum -= del_element
-    
-    def tick_decision(self, current_price: float)-> tuple[np.int32, np.int32]:
-        self.__append(current_price)
-        # deal with bankrupters
-        bankrupters = (self.__traders['cash'] <= self.__bankruptcy_cash) & (self.__traders['cooldown'] == 0)
-        amount = np.maximum(np.floor((self.__bankruptcy_cash - self.__traders['cash'][bankrupters]) / current_price * 2.0).astype(np.int32), 1)
-        self.__traders['order_positions'][bankrupters] = -amount
-        # trade
-            # initialization
-        MA_t = np.zeros(np.size(self.__traders), dtype=np.float64)
-        avg_3t = np.zeros(np.size(self.__traders), dtype=np.float64)
-        total_avgsquare_3t = np.zeros(np.size(self.__traders), dtype=np.float64)
-        avg_t = np.zeros(np.size(self.__traders), dtype=np.float64)
-        total_avgsquare_t = np.zeros(np.size(self.__traders), dtype=np.float64)
-        sigma_market = np.zeros(np.size(self.__traders), dtype=np.float64)
-        sigma_t = np.zeros(np.size(self.__traders), dtype=np.float64)
-        signal = np.zeros(np.size(self.__traders), dtype=np.float64)
-        judge = np.zeros(np.size(self.__traders), dtype=np.float64)
-            # calculate MA_t, sigma_market, sigma_t
-        active_traders = (self.__traders['cooldown'] == 0) & (self.__traders['cash'] > self.__bankruptcy_cash) & (self.__len >= self.__traders['decision_time'] * 3)
-        MA_t[active_traders] = (self.__price_prefix_sum[-1] - self.__price_prefix_sum[-1 - self.__traders['decision_time'][active_traders]]) / self.__traders['decision_time'][active_traders]
-        avg_3t[active_traders] = (self.__price_prefix_sum[-1] - self.__price_prefix_sum[-1 - self.__traders['decision_time'][active_traders] * 3]) / (self.__traders['decision_time'][active_traders] * 3)
-        total_avgsquare_3t[active_traders] = (self.__traders['decision_time'][active_traders] * 3) * (avg_3t[active_traders] ** 2)
-        avg_t[active_traders] = (self.__price_prefix_sum[-1] - self.__price_prefix_sum[-1 - self.__traders['decision_time'][active_traders]]) / self.__traders['decision_time'][active_traders]
-        total_avgsquare_t[active_traders] = (self.__traders['decision_time'][active_traders]) * (avg_t[active_traders] ** 2)
-        sigma_market[active_traders] = (self.__price_square_prefix_sum[-1] - self.__price_square_prefix_sum[-1 - self.__traders['decision_time'][active_traders] * 3]) - total_avgsquare_3t[active_traders]
-        sigma_t[active_traders] = (self.__price_square_prefix_sum[-1] - self.__price_square_prefix_sum[-1 - self.__traders['decision_time'][active_traders]]) - total_avgsquare_t[active_traders]
-        signal[active_traders] = (current_price - MA_t[active_traders]) / sigma_t[active_traders]
-        judge[active_traders] = self.__traders['judge_coef'][active_traders] * sigma_market[active_traders]
-            # deal with trade
-        risk_trader = (active_traders) & (current_price > MA_t * self.__traders['risk_coef'])
-        self.__traders['order_positions'][risk_trader] = -self.__traders['positions'][risk_trader]
-        buy_trader = (active_traders) & (~risk_trader) & (signal > judge)
-        self.__traders['order_positions'][buy_trader] = np.floor(self.__traders['cash'][buy_trader] / current_price * np.random.uniform(self.__min_buy_proportion, self.__max_buy_proportion, size=np.sum(buy_trader))).astype(np.int32)
-        sell_trader = (active_traders) & (~risk_trader) & (signal < -judge)
-        self.__traders['order_positions'][sell_trader] = -np.floor(self.__traders['positions'][sell_trader] * np.random.uniform(self.__min_sell_proportion, self.__max_sell_proportion, size=np.sum(sell_trader))).astype(np.int32)
-        # deal with cooldown
-        active_traders = (self.__traders['cooldown'] == 0)
-        if np.any(active_traders):
-            active_times = self.__traders['decision_time'][active_traders]
-            self.__traders['cooldown'][active_traders] = np.random.randint(active_times, active_times * 2, np.sum(active_traders))
-        inactive_traders = ~(active_traders)
-        self.__traders['cooldown'][inactive_traders] -= 1
-        return finish_position_change(self.__traders, current_price)
-    
-class ValueInvestors():
-    def __init__(self, n: int, 
-                 min_start_cash = 40000.0, max_start_cash = 80000.0,
-                 min_start_positions = 600, max_start_positions = 1000,
+        state['judge_coef'][:] = generator.uniform(1.0, 1.5, shape)
+        state['risk_coef'][:] = generator.uniform(1.05, 1.15, shape)
+
+    def first_wake(self, state: dict, generator: np.random.Generator, size: int) -> np.ndarray:
+        active_times = state['decision_time']
+        return generator.integers(active_times * 3, active_times * 4)
+
+    def signal(self, agents: dict) -> None:
+        window = agents['window']
+        current_price, cash, positions, orders = agents['price'], agents['cash'], agents['positions'], agents['orders']
+        t, sum_t, sum_3t, square_sum_t, square_sum_3t, held, end = agents['floats']
+        deciders, mask = agents['masks']
+        decision_time_3t, index = agents['indices']
+        decision_time = agents['decision_time']
+        replica = agents['replica']
+        # calculate MA_t, sigma_market, sigma_t
+        np.multiply(decision_time, 3, out=decision_time_3t)
+        np.less_equal(decision_time_3t, len(window), out=deciders)
+        np.copyto(t, decision_time)
+        window.sum(decision_time, out=sum_t, index=index, column=replica, end=end)
+        window.sum(decision_time_3t, out=sum_3t, index=index, column=replica, end=end)
+        window.square_sum(decision_time, out=square_sum_t, index=index, column=replica, end=end)
+        window.square_sum(decision_time_3t, out=square_sum_3t, index=index, column=replica, end=end)
+        MA_t = np.divide(sum_t, t, out=held)
+        sigma_market = square_sum_3t
+        np.multiply(sum_3t, sum_3t, out=sum_3t)
+        np.multiply(t, 3.0, out=end)
+        np.divide(sum_3t, end, out=sum_3t)
+        np.subtract(square_sum_3t, sum_3t, out=sigma_market)
+        sigma_t = square_sum_t
+        np.multiply(sum_t, sum_t, out=sum_t)
+        np.divide(sum_t, t, out=sum_t)
+        np.subtract(square_sum_t, sum_t, out=sigma_t)
+        signal = sum_t
+        np.subtract(current_price, MA_t, out=signal)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(signal, sigma_t, out=signal)
+        judge = np.multiply(agents['judge_coef'], sigma_market, out=sigma_market)
+        # deal with trade: the gathered coefficients are not written back, so they double as scratch
+        risk = np.multiply(MA_t, agents['risk_coef'], out=agents['risk_coef'])
+        np.less(risk, current_price, out=mask)
+        np.logical_and(mask, deciders, out=mask)
+        np.negative(positions, out=orders, where=mask)
+        np.logical_not(mask, out=mask)
+        np.logical_and(deciders, mask, out=deciders)
+        proportion = agents['judge_coef']
+        agents['rng'].random(out=proportion)
+        np.greater(signal, judge, out=mask)
+        np.logical_and(mask, deciders, out=mask)
+        np.multiply(proportion, self.__max_buy_proportion - self.__min_buy_proportion, out=t)
+        np.add(t, self.__min_buy_proportion, out=t)
+        np.divide(cash, current_price, out=end)
+        np.multiply(end, t, out=end)
+        np.floor(end, out=end)
+        np.copyto(orders, end, where=mask)
+        np.negative(judge, out=judge)
+        np.less(signal, judge, out=mask)
+        np.logical_and(mask, deciders, out=mask)
+        np.multiply(proportion, self.__max_sell_proportion - self.__min_sell_proportion, out=t)
+        np.add(t, self.__min_sell_proportion, out=t)
+        np.multiply(positions, t, out=end)
+        np.floor(end, out=end)
+        np.negative(end, out=orders, where=mask)
+
+    def wait(self, agents: dict, out: np.ndarray) -> None:
+        cooldown = agents['floats'][0]
+        decision_time = agents['decision_time']
+        agents['rng'].random(out=cooldown)
+        np.multiply(cooldown, decision_time, out=cooldown)
+        np.copyto(out, cooldown, casting='unsafe')
+        np.add(out, decision_time, out=out)
+
+class MomentumTrader(Population):
+    def __init__(self, n: int,
+                 min_start_cash = 10000.0, max_start_cash = 30000.0,
+                 min_start_positions = 100, max_start_positions = 300,
                  min_buy_proportion = 0.1, max_buy_proportion = 0.2,
                  min_sell_proportion = 0.2, max_sell_proportion = 0.3,
-                 decision_deviation_scale = 0.015,
-                 average_wait_time = 240.0, backruptcy_cash = 2500.0):
-        n = np.int32(n)
-        value_investors = np.dtype([
-            ('cash', 'float64'),
-            ('positions', 'int32'),
-            ('order_positions', 'int32'),
-            ('cooldown', 'int32'),
-            ('judge_coef', 'float64'),
-        ])
+                 backruptcy_cash = 1000.0, window = 1080, replicas = 1, seed = None, dtypes = None, churn = None, ledger = None):
+        super().__init__(MomentumStrategy(min_buy_proportion, max_buy_proportion, min_sell_proportion, max_sell_proportion,
+                                          backruptcy_cash, window), n,
+                         min_start_cash, max_start_cash, min_start_positions, max_start_positions,
+                         replicas=replicas, seed=seed, dtypes=dtypes, churn=churn, ledger=ledger)
+
+class ValueStrategy(Strategy):
+    # buys below 0.9 and sells above 1.1 times a noisy estimate of the basic value, scaled by judge_coef
+    name = 'value'
+    fields = {'judge_coef': np.float64}
+    floats = 3
+    masks = 1
+
+    def __init__(self, min_buy_proportion = 0.1, max_buy_proportion = 0.2,
+                 min_sell_proportion = 0.2, max_sell_proportion = 0.3,
+                 decision_deviation_scale = 0.015, average_wait_time = 240.0, bankruptcy_cash = 2500.0) -> None:
         self.__min_buy_proportion = np.float64(min_buy_proportion)
         self.__max_buy_proportion = np.float64(max_buy_proportion)
         self.__min_sell_proportion = np.float64(min_sell_proportion)
         self.__max_sell_proportion = np.float64(max_sell_proportion)
         self.__decision_deviation_scale = np.float64(decision_deviation_scale)
         self.__average_wait_time = np.float64(average_wait_time)
-        self.__bankruptcy_cash = np.float64(backruptcy_cash)
-        self.__traders = np.zeros(n, dtype=value_investors)
-        self.__traders['cash'] = np.random.uniform(min_start_cash, max_start_cash, n)
-        self.__traders['positions'] = np.random.randint(min_start_positions, max_start_positions, n).astype(np.int32)
-        self.__traders['order_positions'] = 0
-        self.__traders['cooldown'] = np.random.exponential(self.__average_wait_time, n).astype(np.int32)
-        self.__traders['judge_coef'] = np.random.uniform(-0.05, 0.05, n)
-
-    def tick_decision(self, current_price: float, basic_value: float) -> tuple[np.int32, np.int32]:
-        # deal with bankrupters
-        bankrupters = (self.__traders['cash'] <= self.__bankruptcy_cash) & (self.__traders['cooldown'] == 0)
-        amount = np.maximum(np.floor((self.__bankruptcy_cash - self.__traders['cash'][bankrupters]) / current_price * 2.0).astype(np.int32), 1)
-        self.__traders['order_positions'][bankrupters] = -amount
-        # trade
-        pridicted_IV = basic_value * (1 + np.random.normal(0, self.__decision_deviation_scale, np.size(self.__traders)))
-        buy_signal = 0.9 * pridicted_IV * (1 + self.__traders['judge_coef'])
-        sell_signal = 1.1 * pridicted_IV * (1 + self.__traders['judge_coef'])
-        buy_traders = (self.__traders['cooldown'] == 0) & (self.__traders['cash'] > self.__bankruptcy_cash) & (current_price < buy_signal)
-        self.__traders['order_positions'][buy_traders] = np.floor(self.__traders['cash'][buy_traders] / current_price * np.random.uniform(self.__min_buy_proportion, self.__max_buy_proportion, np.sum(buy_traders))).astype(np.int32)
-        sell_traders = (self.__traders['cooldown'] == 0) & (self.__traders['cash'] > self.__bankruptcy_cash) & (current_price > sell_signal)
-        self.__traders['order_positions'][sell_traders] = -np.floor(self.__traders['positions'][sell_traders] * np.random.uniform(self.__min_sell_proportion, self.__max_sell_proportion, np.sum(sell_traders))).astype(np.int32)
-        # deal with cooldown
-        active_traders = (self.__traders['cooldown'] == 0)
-        self.__traders['cooldown'][active_traders] = np.random.exponential(self.__average_wait_time, np.sum(active_traders)).astype(np.int32)
-        inactive_traders = ~(active_traders)
-        self.__traders['cooldown'][inactive_traders] -= 1
-        return finish_position_change(self.__traders, current_price)
+        self.bankruptcy_cash = np.float64(bankruptcy_cash)
+
+    def get_parameters(self) -> dict:
+        return {'min_buy_proportion': float(self.__min_buy_proportion), 'max_buy_proportion': float(self.__max_buy_proportion),
+                'min_sell_proportion': float(self.__min_sell_proportion), 'max_sell_proportion': float(self.__max_sell_proportion),
+                'decision_deviation_scale': float(self.__decision_deviation_scale),
+                'average_wait_time': float(self.__average_wait_time)}
+
+    def initialize(self, state: dict, generator: np.random.Generator, shape: tuple) -> None:
+        # the first wake is drawn ahead of judge_coef, first_wake hands it back
+        state['wake'] = generator.exponential(self.__average_wait_time, shape).astype(np.int32)
+        state['judge_coef'][:] = generator.uniform(-0.05, 0.05, shape)
 
+    def first_wake(self, state: dict, generator: np.random.Generator, size: int) -> np.ndarray:
+        return state['wake']
+
+    def signal(self, agents: dict) -> None:
+        current_price, cash, positions, orders = agents['price'], agents['cash'], agents['positions'], agents['orders']
+        pridicted_IV, proportion, held = agents['floats']
+        mask, = agents['masks']
+        agents['rng'].standard_normal(out=pridicted_IV)
+        np.multiply(pridicted_IV, self.__decision_deviation_scale, out=pridicted_IV)
+        np.add(pridicted_IV, 1.0, out=pridicted_IV)
+        np.multiply(pridicted_IV, agents['basic_value'], out=pridicted_IV)
+        signal = agents['judge_coef']
+        np.add(signal, 1.0, out=signal)
+        np.multiply(signal, pridicted_IV, out=signal)
+        agents['rng'].random(out=proportion)
+        # deal with trade: the estimate is spent, its buffer holds the costs from here on
+        cost = pridicted_IV
+        np.multiply(signal, 0.9, out=cost)
+        np.greater(cost, current_price, out=mask)
+        np.multiply(proportion, self.__max_buy_proportion - self.__min_buy_proportion, out=held)
+        np.add(held, self.__min_buy_proportion, out=held)
+        np.divide(cash, current_price, out=cost)
+        np.multiply(cost, held, out=cost)
+        np.floor(cost, out=cost)
+        np.copyto(orders, cost, where=mask)
+        np.multiply(signal, 1.1, out=cost)
+        np.less(cost, current_price, out=mask)
+        np.multiply(proportion, self.__max_sell_proportion - self.__min_sell_proportion, out=held)
+        np.add(held, self.__min_sell_proportion, out=held)
+        np.multiply(positions, held, out=cost)
+        np.floor(cost, out=cost)
+        np.negative(cost, out=orders, where=mask)
+
+    def wait(self, agents: dict, out: np.ndarray) -> None:
+        cooldown = agents['floats'][0]
+        agents['rng'].standard_exponential(out=cooldown)
+        np.multiply(cooldown, self.__average_wait_time, out=cooldown)
+        np.copyto(out, cooldown, casting='unsafe')
+
+class ValueInvestors(Population):
+    def __init__(self, n: int,
+                 min_start_cash = 40000.0, max_start_cash = 80000.0,
+                 min_start_positions = 600, max_start_positions = 1000,
+                 min_buy_proportion = 0.1, max_buy_proportion = 0.2,
+                 min_sell_proportion = 0.2, max_sell_proportion = 0.3,
+                 decision_deviation_scale = 0.015,
+                 average_wait_time = 240.0, backruptcy_cash = 2500.0,
+                 replicas = 1, seed = None, dtypes = None, churn = None, ledger = None):
+        super().__init__(ValueStrategy(min_buy_proportion, max_buy_proportion, min_sell_proportion, max_sell_proportion,
+                                       decision_deviation_scale, average_wait_time, backruptcy_cash), n,
+                         min_start_cash, max_start_cash, min_start_positions, max_start_positions,
+                         replicas=replicas, seed=seed, dtypes=dtypes, churn=churn, ledger=ledger)
@@ -0,0 +1,195 @@
+import json
+from collections import deque
+import numpy as np
+from kernel import Scratch
+
+# per-agent accumulators kept as extra TraderState columns, so churn compaction, resizing and checkpoints
+# carry them along: average cost of the held shares (0 until first marked), realized PnL, shares traded,
+# fills, and the highest mark-to-market wealth seen with the deepest fall from it as a fraction
+LEDGER_FIELDS = ('cost_basis', 'realized', 'volume', 'trades', 'peak', 'drawdown')
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+KEEP_DAYS = 1000
+
+def gini(values: np.ndarray) -> float:
+    # of non-negative values sorted ascending, 0 for perfect equality
+    total = values.sum()
+    if values.size == 0 or total <= 0:
+        return 0.0
+    ranks = np.arange(1, values.size + 1, dtype=np.float64)
+    return float(2.0 * np.dot(ranks, values) / (values.size * total) - (values.size + 1.0) / values.size)
+
+def summarize(columns: dict, quantiles: tuple = QUANTILES) -> dict:
+    # totals, wealth and realized PnL quantiles, wealth Gini and drawdowns of one class of agents
+    wealth = np.sort(columns['wealth'])
+    realized = np.sort(columns['realized'])
+    empty = wealth.size == 0
+    return {'agents': int(wealth.size),
+            'wealth': float(wealth.sum()), 'cash': float(columns['cash'].sum()), 'positions': int(columns['positions'].sum()),
+            'realized': float(realized.sum()), 'unrealized': float(columns['unrealized'].sum()),
+            'volume': float(columns['volume'].sum()), 'trades': int(columns['trades'].sum()),
+            'gini': gini(wealth),
+            'wealth_quantiles': [] if empty else np.quantile(wealth, quantiles).tolist(),
+            'realized_quantiles': [] if empty else np.quantile(realized, quantiles).tolist(),
+            'drawdown_mean': 0.0 if empty else float(columns['drawdown'].mean()),
+            'drawdown_max': 0.0 if empty else float(columns['drawdown'].max())}
+
+class Ledger:
+    def __init__(self) -> None:
+        # one population's accumulators, updated from settle() on the waking agents only
+        self.__state = None
+        self.__churn = None
+        self.__scratch = Scratch(1, floats=8, masks=2, indices=0)
+
+    def attach(self, state, churn=None) -> None:
+        if self.__state is not None:
+            raise ValueError('a Ledger belongs to one population')
+        missing = [name for name in LEDGER_FIELDS if name not in state.get_fields()]
+        if missing:
+            raise ValueError('state has no ledger columns %s' % missing)
+        self.__state = state
+        self.__churn = churn
+
+    def get_state(self):
+        return self.__state
+
+    def get_live(self):
+        # slots of the agents that count, None for all of them
+        return None if self.__churn is None else self.__churn.get_live()
+
+    def settle(self, active_traders: np.ndarray, orders: np.ndarray, current_price, cash: np.ndarray, positions: np.ndarray) -> None:
+        # orders are the filled amounts, cash and positions already settled, current_price a float or per trader
+        k = active_traders.size
+        if k > self.__scratch.get_capacity():
+            self.__scratch = Scratch(2 * k, floats=8, masks=2, indices=0)
+        basis, realized, volume, trades, peak, drawdown, held, work = self.__scratch.get_floats(k)
+        mask, side = self.__scratch.get_masks(k)
+        state = self.__state
+        for name, buffer in zip(LEDGER_FIELDS, (basis, realized, volume, trades, peak, drawdown)):
+            state.gather(name, active_traders, buffer)
+        # deal with agents never marked: their shares are valued at the price they first trade at
+        np.equal(basis, 0.0, out=mask)
+        np.copyto(basis, current_price, where=mask)
+        np.subtract(positions, orders, out=held)
+        # sells realize against the average cost
+        np.less(orders, 0, out=side)
+        np.subtract(current_price, basis, out=work)
+        np.multiply(work, orders, out=work)
+        np.subtract(realized, work, out=realized, where=side)
+        # buys move the average cost
+        np.greater(orders, 0, out=side)
+        np.multiply(held, basis, out=held)
+        np.multiply(orders, current_price, out=work)
+        np.add(held, work, out=held)
+        np.divide(held, positions, out=basis, where=side)
+        np.not_equal(orders, 0, out=mask)
+        np.add(trades, mask, out=trades)
+        np.abs(orders, out=work)
+        np.add(volume, work, out=volume)
+        # deal with drawdown, sampled whenever the agent wakes
+        np.multiply(positions, current_price, out=work)
+        np.add(work, cash, out=work)
+        np.maximum(peak, work, out=peak)
+        np.greater(peak, 0.0, out=mask)
+        np.subtract(peak, work, out=held)
+        np.divide(held, peak, out=held, where=mask)
+        np.copyto(held, 0.0, where=~mask)
+        np.maximum(drawdown, held, out=drawdown)
+        for name, buffer in zip(LEDGER_FIELDS, (basis, realized, volume, trades, peak, drawdown)):
+            state.scatter(name, active_traders, buffer)
+
+    def mark(self, current_price) -> dict:
+        # every live agent at current_price (a float, or one per replica market): unmarked shares get it as
+        # their cost, peak and drawdown catch up; returns the per-agent columns a snapshot needs
+        state = self.__state
+        price = np.reshape(np.asarray(current_price, dtype=np.float64), (-1, 1))
+        price = np.broadcast_to(price, state.get_matrix('cash').shape).reshape(-1)
+        live = self.get_live()
+        columns = {name: state.get_column(name) for name in ('cash', 'positions') + LEDGER_FIELDS}
+        if live is not None:
+            price = price[live]
+            columns = {name: column[live] for name, column in columns.items()}
+        basis = columns['cost_basis']
+        np.copyto(basis, price, where=basis == 0.0)
+        wealth = columns['positions'] * price + columns['cash']
+        peak = np.maximum(columns['peak'], wealth)
+        drawdown = np.zeros_like(wealth)
+        np.divide(peak - wealth, peak, out=drawdown, where=peak > 0.0)
+        np.maximum(columns['drawdown'], drawdown, out=drawdown)
+        updates = {'cost_basis': basis, 'peak': peak, 'drawdown': drawdown}
+        for name, values in updates.items():
+            if live is None:
+                state.get_column(name)[:] = values
+            else:
+                state.get_column(name)[live] = values
+        columns.update(updates)
+        columns['wealth'] = wealth
+        columns['unrealized'] = columns['positions'] * (price - basis)
+        return columns
+
+class Accounting:
+    def __init__(self, quantiles: tuple = QUANTILES, path: str = None, keep: int = KEEP_DAYS, verbose: bool = False) -> None:
+        # node listener: on_day marks every ledger at the close and keeps one summary row per day, the
+        # last keep rows in memory and every row in the JSONL file at path; no per-agent history is kept
+        self.__quantiles = tuple(float(quantile) for quantile in quantiles)
+        self.__ledgers = []
+        self.__days = deque(maxlen=int(keep))
+        self.__trace = open(path, 'w') if path is not None else None
+        self.__verbose = verbose
+
+    def create(self, source: str) -> Ledger:
+        # a ledger for one population of class source, chunks of one class share the source
+        ledger = Ledger()
+        self.__ledgers.append((source, ledger))
+        return ledger
+
+    def get_ledgers(self) -> list:
+        return self.__ledgers
+
+    def get_days(self) -> deque:
+        return self.__days
+
+    def open(self, node) -> None:
+        # shares held from the start are valued at the opening price
+        for _, ledger in self.__ledgers:
+            ledger.mark(node.get_current_price())
+
+    def on_tick(self, node) -> None:
+        pass
+
+    def on_day(self, node) -> None:
+        row = self.snapshot(node.get_current_price())
+        row['day'] = node.get_day()
+        self.__days.append(row)
+        if self.__trace is not None:
+            self.__trace.write(json.dumps(row) + '\n')
+            self.__trace.flush()
+        if self.__verbose:
+            print(format_accounts(row))
+
+    def snapshot(self, current_price) -> dict:
+        classes = {}
+        for source, ledger in self.__ledgers:
+            columns = ledger.mark(current_price)
+            if source in classes:
+                classes[source] = {name: np.concatenate((classes[source][name], column)) for name, column in columns.items()}
+            else:
+                classes[source] = columns
+        row = {'price': float(np.mean(current_price)), 'quantiles': list(self.__quantiles),
+               'classes': {source: summarize(columns, self.__quantiles) for source, columns in classes.items()}}
+        wealth = np.sort(np.concatenate([columns['wealth'] for columns in classes.values()])) if classes else np.zeros(0)
+        row['gini'] = gini(wealth)
+        return row
+
+    def close(self) -> None:
+        if self.__trace is not None:
+            self.__trace.close()
+            self.__trace = None
+
+def format_accounts(row: dict) -> str:
+    lines = ["day %s, price %.4f, wealth gini %.3f" % (row.get('day'), row['price'], row['gini']),
+             "%-10s %8s %14s %12s %12s %12s %6s %8s" % ('class', 'agents', 'wealth', 'realized', 'unrealized', 'volume', 'gini', 'max dd')]
+    for source, summary in row['classes'].items():
+        lines.append("%-10s %8d %14.0f %12.0f %12.0f %12.0f %6.3f %8.3f" % (
+            source, summary['agents'], summary['wealth'], summary['realized'], summary['unrealized'], summary['volume'],
+            summary['gini'], summary['drawdown_max']))
+    return '\n'.join(lines)
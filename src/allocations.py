@@ -0,0 +1,65 @@
+import tracemalloc
+from market import Node
+from streams import spawn_seeds
+from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+
+# the allocation gates the tests import; kept apart from benchmark.py so that importing them loads only the
+# node and the three populations, not plotly, the order book or the sharded runtime
+
+# peak bytes a whole tick_decision may allocate, wake calendar included, at any population size
+ALLOCATION_BUDGET = 16384
+SEED = 2025
+
+def run_ticks(node: Node, noise_trader, momentum_trader, value_investor, ticks: int) -> None:
+    for tick in range(1, ticks + 1):
+        current_price = node.get_current_price()
+        buy_amount, sell_amount = noise_trader.tick_decision(current_price)
+        node.clinch(buy_amount)
+        node.clinch(sell_amount)
+        buy_amount, sell_amount = momentum_trader.tick_decision(current_price)
+        node.clinch(buy_amount)
+        node.clinch(sell_amount)
+        buy_amount, sell_amount = value_investor.tick_decision(current_price, node.get_basic_value())
+        node.clinch(buy_amount)
+        node.clinch(sell_amount)
+        node.tick_update(tick)
+
+def build_market(n1: int, n2: int, n3: int, seed=SEED) -> tuple:
+    node_seed, noise_seed, momentum_seed, value_seed = spawn_seeds(seed, 4)
+    return (Node(seed=node_seed), NoiseTrader(n1, seed=noise_seed),
+            MomentumTrader(n2, seed=momentum_seed), ValueInvestors(n3, seed=value_seed))
+
+class TickAllocationProbe:
+    # peak bytes allocated inside a whole tick_decision, wake calendar included
+    def __init__(self) -> None:
+        self.__peak = 0
+
+    def get_peak(self) -> int:
+        return self.__peak
+
+    def measure(self, call, *args):
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            result = call(*args)
+            self.__peak = max(self.__peak, tracemalloc.get_traced_memory()[1] - base)
+        finally:
+            tracemalloc.stop()
+        return result
+
+def measure_tick_allocations(n1: int, n2: int, n3: int, ticks: int, warmup: int = 1200) -> dict:
+    node, noise_trader, momentum_trader, value_investor = build_market(n1, n2, n3)
+    run_ticks(node, noise_trader, momentum_trader, value_investor, warmup)
+    peaks = {'noise': 0, 'momentum': 0, 'value': 0}
+    for _ in range(ticks):
+        current_price = node.get_current_price()
+        for name, call, args in (('noise', noise_trader.tick_decision, (current_price,)),
+                                 ('momentum', momentum_trader.tick_decision, (current_price,)),
+                                 ('value', value_investor.tick_decision, (current_price, node.get_basic_value()))):
+            probe = TickAllocationProbe()
+            buy_amount, sell_amount = probe.measure(call, *args)
+            peaks[name] = max(peaks[name], probe.get_peak())
+            node.clinch(buy_amount)
+            node.clinch(sell_amount)
+        node.tick_update()
+    return peaks
@@ -0,0 +1,197 @@
+import json
+import numpy as np
+
+SCALES = (1, 60, 600)
+LAGS = (1, 10, 100)
+QUANTILES = (0.01, 0.05, 0.5, 0.95, 0.99)
+BLOCK = 4096
+GAMMA = 1.02
+MIN_RETURN = 1e-9
+TAIL = 0.05
+
+# relative-accuracy sketch: |r| falls in bucket i when GAMMA^(i-1) < |r| <= GAMMA^i, one count array per sign
+# and one count for exact zeros, so every quantile is within (GAMMA - 1) / 2 of the true value
+BUCKET_OFFSET = int(np.ceil(np.log(MIN_RETURN) / np.log(GAMMA)))
+BUCKETS = 1 - BUCKET_OFFSET
+BUCKET_VALUES = 2.0 * GAMMA ** (np.arange(BUCKETS) + BUCKET_OFFSET) / (1.0 + GAMMA)
+
+def fold_moments(moments: np.ndarray, values: np.ndarray) -> None:
+    # merge a block into (n, mean, M2, M3, M4), Pebay's pairwise update
+    nb = values.size
+    if nb == 0:
+        return
+    mean_b = values.mean()
+    centered = values - mean_b
+    squared = centered * centered
+    M2b, M3b, M4b = squared.sum(), (squared * centered).sum(), (squared * squared).sum()
+    na, mean_a, M2a, M3a, M4a = moments
+    n = na + nb
+    delta = mean_b - mean_a
+    moments[0] = n
+    moments[1] = mean_a + delta * nb / n
+    moments[2] = M2a + M2b + delta * delta * na * nb / n
+    moments[3] = (M3a + M3b + delta ** 3 * na * nb * (na - nb) / n ** 2
+                  + 3.0 * delta * (na * M2b - nb * M2a) / n)
+    moments[4] = (M4a + M4b + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+                  + 6.0 * delta * delta * (na * na * M2b + nb * nb * M2a) / n ** 2
+                  + 4.0 * delta * (na * M3b - nb * M3a) / n)
+
+class ReturnStats:
+    def __init__(self, lags: tuple = LAGS) -> None:
+        # constant memory: five moments, the sketch, and max(lags) absolute returns to bridge blocks
+        self.__lags = tuple(int(lag) for lag in lags)
+        self.__moments = np.zeros(5, dtype=np.float64)
+        self.__positive = np.zeros(BUCKETS, dtype=np.int64)
+        self.__negative = np.zeros(BUCKETS, dtype=np.int64)
+        self.__zeros = 0
+        # absolute returns: count, sum, square sum, and per lag count and sum of products
+        self.__absolute = np.zeros(3, dtype=np.float64)
+        self.__products = np.zeros((len(self.__lags), 2), dtype=np.float64)
+        self.__tail = np.zeros(0, dtype=np.float64)
+
+    def get_count(self) -> int:
+        return int(self.__moments[0])
+
+    def add(self, returns: np.ndarray) -> None:
+        if returns.size == 0:
+            return
+        fold_moments(self.__moments, returns)
+        magnitude = np.abs(returns)
+        # deal with the sketch
+        nonzero = magnitude > 0
+        self.__zeros += returns.size - np.count_nonzero(nonzero)
+        buckets = np.ceil(np.log(np.maximum(magnitude[nonzero], MIN_RETURN)) / np.log(GAMMA)).astype(np.int64)
+        np.clip(buckets - BUCKET_OFFSET, 0, BUCKETS - 1, out=buckets)
+        positive = returns[nonzero] > 0
+        self.__positive += np.bincount(buckets[positive], minlength=BUCKETS)
+        self.__negative += np.bincount(buckets[~positive], minlength=BUCKETS)
+        # deal with absolute return autocorrelation, pairs reaching back into the previous block use the tail
+        self.__absolute += (magnitude.size, magnitude.sum(), np.dot(magnitude, magnitude))
+        joined = np.concatenate((self.__tail, magnitude))
+        start = self.__tail.size
+        for row, lag in enumerate(self.__lags):
+            first = max(start, lag)
+            if first < joined.size:
+                self.__products[row] += (joined.size - first, np.dot(joined[first:], joined[first - lag:joined.size - lag]))
+        self.__tail = joined[-max(self.__lags):].copy()
+
+    def get_moments(self) -> dict:
+        n, mean, M2, M3, M4 = self.__moments
+        if n < 2 or M2 <= 0:
+            return {'count': int(n), 'mean': float(mean), 'std': np.nan, 'skew': np.nan, 'kurtosis': np.nan}
+        return {'count': int(n), 'mean': float(mean), 'std': float(np.sqrt(M2 / (n - 1))),
+                'skew': float(np.sqrt(n) * M3 / M2 ** 1.5), 'kurtosis': float(n * M4 / (M2 * M2) - 3.0)}
+
+    def __ordered(self) -> tuple:
+        # every bucket from the most negative return to the most positive one
+        counts = np.concatenate((self.__negative[::-1], [self.__zeros], self.__positive))
+        values = np.concatenate((-BUCKET_VALUES[::-1], [0.0], BUCKET_VALUES))
+        return counts, values
+
+    def get_quantiles(self, quantiles: tuple = QUANTILES) -> dict:
+        counts, values = self.__ordered()
+        total = counts.sum()
+        if total == 0:
+            return {q: np.nan for q in quantiles}
+        ranks = np.cumsum(counts)
+        return {q: float(values[min(np.searchsorted(ranks, q * total, side='left'), values.size - 1)]) for q in quantiles}
+
+    def get_tail_index(self, tail: float = TAIL) -> dict:
+        # Hill estimator over the largest tail share of |r|, and of each side, read off the sketch
+        return {'absolute': self.__hill(self.__positive + self.__negative, tail),
+                'left': self.__hill(self.__negative, tail), 'right': self.__hill(self.__positive, tail)}
+
+    def __hill(self, counts: np.ndarray, tail: float) -> float:
+        total = self.__moments[0]
+        ranks = np.cumsum(counts[::-1])
+        k = int(tail * total)
+        if k < 10 or ranks[-1] < k:
+            return np.nan
+        threshold = BUCKETS - 1 - int(np.searchsorted(ranks, k, side='left'))
+        above = counts[threshold:]
+        excess = np.log(BUCKET_VALUES[threshold:] / BUCKET_VALUES[threshold])
+        spread = np.dot(above, excess) / above.sum()
+        return float(1.0 / spread) if spread > 0 else np.nan
+
+    def get_autocorrelation(self) -> dict:
+        n, total, square_total = self.__absolute
+        if n < 2:
+            return {lag: np.nan for lag in self.__lags}
+        mean = total / n
+        variance = square_total / n - mean * mean
+        acf = {}
+        for lag, (pairs, products) in zip(self.__lags, self.__products):
+            acf[lag] = float((products / pairs - mean * mean) / variance) if pairs > 0 and variance > 0 else np.nan
+        return acf
+
+    def get_summary(self, quantiles: tuple = QUANTILES, tail: float = TAIL) -> dict:
+        return dict(self.get_moments(), quantiles=self.get_quantiles(quantiles), tail_index=self.get_tail_index(tail),
+                    abs_autocorrelation=self.get_autocorrelation())
+
+class StylizedFacts:
+    def __init__(self, scales: tuple = SCALES, lags: tuple = LAGS, path: str = None, verbose: bool = False,
+                 block: int = BLOCK) -> None:
+        # node listener: prices are buffered a block at a time and folded into per-scale log return
+        # estimators, so a tick costs one store and memory does not grow with the run
+        self.__scales = tuple(int(scale) for scale in scales)
+        self.__stats = {scale: ReturnStats(lags) for scale in self.__scales}
+        self.__last = {scale: np.nan for scale in self.__scales}
+        self.__buffer = np.zeros(int(block), dtype=np.float64)
+        self.__count = 0
+        self.__ticks = 0
+        self.__trace = open(path, 'w') if path is not None else None
+        self.__verbose = verbose
+        self.__days = []
+
+    def get_scales(self) -> tuple:
+        return self.__scales
+
+    def get_stats(self, scale: int) -> ReturnStats:
+        return self.__stats[scale]
+
+    def get_days(self) -> list:
+        return self.__days
+
+    def on_tick(self, node) -> None:
+        self.__buffer[self.__count] = node.get_current_price()
+        self.__count += 1
+        if self.__count == self.__buffer.size:
+            self.flush()
+
+    def flush(self) -> None:
+        # scale s samples every tick whose index is a multiple of s, returns chain across blocks
+        logs = np.log(self.__buffer[:self.__count])
+        for scale in self.__scales:
+            sampled = logs[(-self.__ticks) % scale::scale]
+            if sampled.size == 0:
+                continue
+            self.__stats[scale].add(np.diff(sampled, prepend=self.__last[scale])[1 if np.isnan(self.__last[scale]) else 0:])
+            self.__last[scale] = sampled[-1]
+        self.__ticks += self.__count
+        self.__count = 0
+
+    def on_day(self, node) -> None:
+        self.flush()
+        row = {'day': node.get_day(), 'ticks': self.__ticks,
+               'scales': {scale: stats.get_summary() for scale, stats in self.__stats.items()}}
+        self.__days.append(row)
+        if self.__trace is not None:
+            self.__trace.write(json.dumps(row) + '\n')
+            self.__trace.flush()
+        if self.__verbose:
+            print(format_facts(row))
+
+    def close(self) -> None:
+        if self.__trace is not None:
+            self.__trace.close()
+            self.__trace = None
+
+def format_facts(row: dict) -> str:
+    lines = ["day %d, %d ticks" % (row['day'], row['ticks']),
+             "%-8s %10s %10s %9s %9s %8s %8s %8s" % ('scale', 'returns', 'std', 'skew', 'kurtosis', 'hill', 'acf1', 'acf_max')]
+    for scale, summary in row['scales'].items():
+        acf = list(summary['abs_autocorrelation'].values())
+        lines.append("%-8s %10d %10.2e %9.2f %9.2f %8.2f %8.3f %8.3f" % (
+            scale, summary['count'], summary['std'], summary['skew'], summary['kurtosis'],
+            summary['tail_index']['absolute'], acf[0], acf[-1]))
+    return '\n'.join(lines)
@@ -0,0 +1,510 @@
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import threading
+import tracemalloc
+import urllib.request
+import numpy as np
+from accounting import Accounting, LEDGER_FIELDS
+from analytics import StylizedFacts
+from market import Node, ReplicaNode
+from multiasset import MarketSimulation
+from hft import MeanReversionHFT
+from orderbook import OrderBook
+from population import Population
+from checkpoint import read_snapshot, write_snapshot
+from churn import Churn
+from feed import LiveFeed
+from replay import Replay
+from sharded import ShardedSimulation
+from simulation import Simulation
+from storage import COMPACT
+from streams import spawn_seeds
+from trader import RandomTrader, TrendTrader, ValueTrader
+from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+from allocations import ALLOCATION_BUDGET, SEED, build_market, measure_tick_allocations, run_ticks
+
+SUITE_SCALES = (10 ** 3, 10 ** 4, 10 ** 5)
+# the single-scale measurements run at LIGHT_AGENTS unless --heavy asks for HEAVY_AGENTS, which also adds
+# it to the suite scales
+LIGHT_AGENTS = 10 ** 5
+HEAVY_AGENTS = 10 ** 6
+SUITE_TICKS = 2000
+SUITE_SECONDS = 2.0
+MEMORY_TICKS = 20
+OBJECT_LIMIT = 10 ** 5
+REGRESSION_THRESHOLD = 0.2
+
+def measure_throughput(n1: int, n2: int, n3: int, ticks: int, warmup: int = 1200) -> float:
+    node, noise_trader, momentum_trader, value_investor = build_market(n1, n2, n3)
+    run_ticks(node, noise_trader, momentum_trader, value_investor, warmup)
+    start = time.perf_counter()
+    run_ticks(node, noise_trader, momentum_trader, value_investor, ticks)
+    return ticks / (time.perf_counter() - start)
+
+def build_replicas(replicas: int, n1: int, n2: int, n3: int, seed=SEED) -> tuple:
+    node_seed, noise_seed, momentum_seed, value_seed = spawn_seeds(seed, 4)
+    return (ReplicaNode(replicas, seed=node_seed), NoiseTrader(n1, replicas=replicas, seed=noise_seed),
+            MomentumTrader(n2, replicas=replicas, seed=momentum_seed), ValueInvestors(n3, replicas=replicas, seed=value_seed))
+
+def measure_replica_throughput(replicas: int, n1: int, n2: int, n3: int, ticks: int, warmup: int = 1200) -> float:
+    # aggregate ticks x replicas per second, every market advanced by the same tick_decision calls
+    node, noise_trader, momentum_trader, value_investor = build_replicas(replicas, n1, n2, n3)
+    run_ticks(node, noise_trader, momentum_trader, value_investor, warmup)
+    start = time.perf_counter()
+    run_ticks(node, noise_trader, momentum_trader, value_investor, ticks)
+    return ticks * replicas / (time.perf_counter() - start)
+
+def measure_bytes_per_agent(agents: int, dtypes: dict = None) -> dict:
+    # resident bytes per agent: state columns, kernel scratch, and everything else seen by tracemalloc
+    results = {}
+    for name, population in (('noise', NoiseTrader), ('momentum', MomentumTrader), ('value', ValueInvestors)):
+        tracemalloc.start()
+        try:
+            built = population(agents, seed=SEED, dtypes=dtypes)
+            traced = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        nbytes = built.get_nbytes()
+        results[name] = {'state': built.get_state().get_bytes_per_agent(), 'scratch': nbytes['scratch'] / agents,
+                         'total': traced / agents}
+    return results
+
+def measure_concurrency(agents: int, ticks: int, workers: int, chunks: int = 1) -> tuple:
+    # ticks/s sequential and on a thread pool over the same populations
+    results = []
+    for pool in (0, workers):
+        simulation = Simulation(*population_mix(agents), seed=SEED, workers=pool, chunks=chunks)
+        start = time.perf_counter()
+        simulation.run(ticks)
+        results.append(ticks / (time.perf_counter() - start))
+        simulation.close()
+    return results[0], results[1]
+
+def measure_sharded(agents: int, ticks: int, workers: int, warmup: int = 20) -> tuple:
+    # ticks/s of one market whose populations are split over worker processes, against the same chunks in-process
+    simulation = ShardedSimulation(*population_mix(agents), seed=SEED, workers=workers)
+    try:
+        simulation.run(warmup)
+        start = time.perf_counter()
+        simulation.run(ticks)
+        sharded = ticks / (time.perf_counter() - start)
+    finally:
+        simulation.close()
+    simulation = Simulation(*population_mix(agents), seed=SEED, chunks=workers)
+    simulation.run(warmup)
+    start = time.perf_counter()
+    simulation.run(ticks)
+    return ticks / (time.perf_counter() - start), sharded
+
+def measure_market_scaling(assets_list=(1, 4, 16, 64, 256), agents: int = 8000, ticks: int = 1000) -> dict:
+    # ticks/s of one multi-asset Market as the asset count grows at a fixed number of agents
+    results = {}
+    for assets in assets_list:
+        simulation = MarketSimulation(agents // 2, agents * 3 // 10, assets=assets, seed=SEED, momentum=agents // 5)
+        simulation.run(100)
+        start = time.perf_counter()
+        simulation.run(ticks)
+        results[assets] = ticks / (time.perf_counter() - start)
+    return results
+
+def measure_order_book(orders: int = 200000, seed=SEED) -> dict:
+    # mixed limit/market/cancel flow around a fixed mid, then the traced bytes of a book of resting orders
+    generator = np.random.default_rng(seed)
+    kinds = generator.random(orders)
+    sides = generator.integers(0, 2, orders).tolist()
+    offsets = generator.integers(1, 50, orders).tolist()
+    sizes = generator.integers(1, 500, orders).tolist()
+    picks = generator.random(orders).tolist()
+    book = OrderBook()
+    live = []
+    start = time.perf_counter()
+    for kind, side, offset, size, pick in zip(kinds.tolist(), sides, offsets, sizes, picks):
+        if kind < 0.1:
+            book.market(side, size)
+        elif kind < 0.3 and live:
+            index = int(pick * len(live))
+            live[index], live[-1] = live[-1], live[index]
+            book.cancel(live.pop())
+        else:
+            order_id, _, _ = book.limit(side, 35.0 + (offset if side else -offset) * 0.01, size)
+            if order_id >= 0:
+                live.append(order_id)
+    single = orders / (time.perf_counter() - start)
+    quantities = np.where(generator.random(orders) < 0.5, 1, -1) * generator.integers(1, 500, orders)
+    prices = 35.0 - np.sign(quantities) * generator.integers(1, 50, orders) * 0.01
+    prices[generator.random(orders) < 0.1] = np.nan
+    book = OrderBook()
+    start = time.perf_counter()
+    book.submit(quantities, prices)
+    batched = orders / (time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        book = OrderBook(capacity=orders)
+        base = tracemalloc.get_traced_memory()[0]
+        book.submit(np.arange(1, orders + 1) % 500 + 1, 35.0 - (np.arange(orders) % 50 + 1) * 0.01)
+        per_order = (tracemalloc.get_traced_memory()[0] - base) / book.get_resting()
+    finally:
+        tracemalloc.stop()
+    return {'orders_per_second': single, 'batched_orders_per_second': batched, 'bytes_per_resting_order': per_order,
+            'structure_bytes': book.get_nbytes()}
+
+def measure_replay(agents: int = 1000, days: int = 1, day_tick: int = 14400, steps: int = 1440) -> dict:
+    # one recorded path, replayed per population and compared with stepping tick_decision along it,
+    # stepping is timed over the first steps ticks and scaled to the whole path
+    simulation = Simulation(*population_mix(agents), seed=SEED, day_tick=day_tick)
+    prices = np.zeros(days * day_tick)
+    for tick in range(prices.size):
+        prices[tick] = simulation.get_node().get_current_price()
+        simulation.step()
+    results = {}
+    for (name, population), size, seed in zip((('noise', NoiseTrader), ('momentum', MomentumTrader), ('value', ValueInvestors)),
+                                              population_mix(agents), spawn_seeds(SEED, 3)):
+        replay = Replay(prices, seed=SEED)
+        replay.add(name, population(size, seed=seed))
+        start = time.perf_counter()
+        replay.run()
+        replayed = time.perf_counter() - start
+        stepped = population(size, seed=seed)
+        start = time.perf_counter()
+        for price in prices[:steps].tolist():
+            stepped.tick_decision(price, 45.0) if population is ValueInvestors else stepped.tick_decision(price)
+        stepping = (time.perf_counter() - start) * prices.size / min(steps, prices.size)
+        results[name] = {'replay_seconds': replayed, 'stepping_seconds': stepping, 'speedup': stepping / replayed,
+                         'trades_per_agent': float(replay.get_trades(name).mean()), 'pnl_per_agent': float(replay.get_pnl(name).mean())}
+    return results
+
+def measure_analytics_overhead(ticks: int = 20000, day_tick: int = 5000) -> tuple:
+    # the same run with and without the stylized facts listener, and the listener's last daily row
+    plain = Simulation(seed=SEED, day_tick=day_tick)
+    start = time.perf_counter()
+    plain.run(ticks)
+    plain_seconds = time.perf_counter() - start
+    facts = StylizedFacts()
+    watched = Simulation(seed=SEED, day_tick=day_tick, analytics=facts)
+    start = time.perf_counter()
+    watched.run(ticks)
+    watched_seconds = time.perf_counter() - start
+    return watched_seconds / plain_seconds - 1.0, facts.get_days()[-1]
+
+def measure_feed_overhead(ticks: int = 20000, day_tick: int = 5000, polls: float = 1.0) -> dict:
+    # the same run with and without the live feed while a client polls the dashboard endpoints polls
+    # times a second, and how many ticks were dropped
+    plain = Simulation(seed=SEED, day_tick=day_tick)
+    start = time.perf_counter()
+    plain.run(ticks)
+    plain_seconds = time.perf_counter() - start
+    feed = LiveFeed(port=0)
+    watched = Simulation(seed=SEED, day_tick=day_tick, feed=feed)
+    url = 'http://%s:%d' % feed.get_address()
+    done = threading.Event()
+    served = []
+    def poll() -> None:
+        while not done.wait(1.0 / polls):
+            for path in ('/status', '/bars?resolution=60&count=500', '/prices?points=1000'):
+                served.append(len(urllib.request.urlopen(url + path).read()))
+    client = threading.Thread(target=poll)
+    client.start()
+    start = time.perf_counter()
+    watched.run(ticks)
+    watched_seconds = time.perf_counter() - start
+    done.set()
+    client.join()
+    watched.close()
+    # the producer's own cost, steadier than the end-to-end difference on a busy machine
+    probe = LiveFeed(capacity=ticks)
+    node = Node(seed=SEED)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        probe.on_tick(node)
+    publish_seconds = time.perf_counter() - start
+    probe.close()
+    return {'overhead': watched_seconds / plain_seconds - 1.0, 'publish_share': publish_seconds / plain_seconds,
+            'dropped': feed.get_dropped(), 'requests': len(served)}
+
+def measure_cold_start(runs: int = 3) -> dict:
+    # best of runs: a fresh interpreter running the headless CLI for one tick, wall clock from spawn to
+    # exit, and main.py's own cold start to first tick
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    best = {'process_seconds': np.inf, 'first_tick_seconds': np.inf}
+    for _ in range(runs):
+        start = time.perf_counter()
+        finished = subprocess.run([sys.executable, main, '--headless', '--ticks', '1', '--quiet', '--timing'],
+                                  capture_output=True, text=True, check=True)
+        best['process_seconds'] = min(best['process_seconds'], time.perf_counter() - start)
+        best['first_tick_seconds'] = min(best['first_tick_seconds'],
+                                         float(re.search(r'first tick ([0-9.]+)s', finished.stderr).group(1)))
+    return best
+
+def measure_accounting(agents: int = 10 ** 6, ticks: int = 100) -> dict:
+    # ticks/s with and without per-agent ledgers, the cost of one daily distribution snapshot and the
+    # ledger's bytes per agent
+    results = {}
+    for label, accounting in (('plain', None), ('ledger', Accounting())):
+        simulation = Simulation(*population_mix(agents), seed=SEED, day_tick=10 * ticks, accounting=accounting)
+        start = time.perf_counter()
+        simulation.run(ticks)
+        results[label] = ticks / (time.perf_counter() - start)
+    price = simulation.get_node().get_current_price()
+    start = time.perf_counter()
+    accounting.snapshot(price)
+    results['snapshot_seconds'] = time.perf_counter() - start
+    state = accounting.get_ledgers()[0][1].get_state()
+    results['bytes_per_agent'] = sum(state.get_column(name).dtype.itemsize for name in LEDGER_FIELDS)
+    return results
+
+def measure_checkpoint(agents: int = 10 ** 6, ticks: int = 200) -> dict:
+    # the pause a checkpoint costs the simulation thread, and the background write and the restore with
+    # and without compression, in a scratch directory removed afterwards
+    simulation = Simulation(*population_mix(agents), seed=SEED, day_tick=ticks)
+    simulation.run(ticks + ticks // 2)
+    results = {}
+    start = time.perf_counter()
+    snapshot = simulation.get_snapshot()
+    results['snapshot_seconds'] = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'checkpoint.ckpt')
+        for compress in (False, True):
+            start = time.perf_counter()
+            size = write_snapshot(path, snapshot, compress)
+            results['write_seconds' + ('_compressed' if compress else '')] = time.perf_counter() - start
+            results['bytes' + ('_compressed' if compress else '')] = size
+        start = time.perf_counter()
+        restored = Simulation(**read_snapshot(path)['config'])
+        restored.set_snapshot(read_snapshot(path))
+        results['restore_seconds'] = time.perf_counter() - start
+    return results
+
+def measure_churn(agents: int = 10 ** 5, ticks: int = 200) -> dict:
+    # ticks/s of a population with every other agent retired, before and after compaction, against a
+    # full one and a fresh one the size of the survivors; the cost should follow the live count
+    def tps(population, valued: bool) -> float:
+        node = Node(seed=SEED)
+        start = time.perf_counter()
+        for tick in range(1, ticks + 1):
+            if valued:
+                buy_amount, sell_amount = population.tick_decision(node.get_current_price(), node.get_basic_value())
+            else:
+                buy_amount, sell_amount = population.tick_decision(node.get_current_price())
+            node.clinch(buy_amount, 'churn')
+            node.clinch(sell_amount, 'churn')
+            node.tick_update(tick)
+        return ticks / (time.perf_counter() - start)
+    results = {}
+    for name, build, valued in (('noise', lambda n, churn=None: NoiseTrader(n, seed=SEED, churn=churn), False),
+                                ('hft', lambda n, churn=None: Population(MeanReversionHFT(), n, seed=SEED, churn=churn), True)):
+        churn = Churn(compact_share=1.0)
+        churned = build(agents, churn)
+        # every other agent broke with nothing to sell, retired at its next wake
+        churned.get_state().get_column('cash')[::2] = 0.0
+        churned.get_state().get_column('positions')[::2] = 0
+        tps(churned, valued)
+        results[name] = {'full': tps(build(agents), valued), 'retired': tps(churned, valued)}
+        churn.compact()
+        results[name]['compacted'] = tps(churned, valued)
+        results[name]['fresh'] = tps(build(churn.get_live_count()), valued)
+        results[name]['live'] = churn.get_live_count()
+    return results
+
+def population_mix(agents: int) -> tuple:
+    # the 500/200/300 mix of main.py scaled to the given total
+    return agents * 5 // 10, agents * 2 // 10, agents - agents * 5 // 10 - agents * 2 // 10
+
+def setup_node_tick_update(agents: int):
+    node = Node(seed=SEED)
+    flow = np.random.default_rng(SEED).integers(-200, 200, size=4096)
+    state = {'tick': 0}
+    def step():
+        state['tick'] += 1
+        node.clinch(int(flow[state['tick'] % flow.size]))
+        node.tick_update(state['tick'])
+    return step
+
+def setup_population(kind: str):
+    def setup(agents: int):
+        node = Node(seed=SEED)
+        if kind == 'noise':
+            population = NoiseTrader(agents, seed=SEED)
+            return lambda: population.tick_decision(node.get_current_price())
+        if kind == 'momentum':
+            population = MomentumTrader(agents, seed=SEED)
+            return lambda: population.tick_decision(node.get_current_price())
+        if kind == 'hft':
+            population = Population(MeanReversionHFT(), agents, seed=SEED)
+            return lambda: population.tick_decision(node.get_current_price(), node.get_basic_value())
+        population = ValueInvestors(agents, seed=SEED)
+        return lambda: population.tick_decision(node.get_current_price(), node.get_basic_value())
+    return setup
+
+def setup_object_traders(agents: int):
+    # the trader.py object-per-agent model in the same 500/200/300 mix
+    np.random.seed(SEED)
+    n1, n2, n3 = population_mix(agents)
+    random_traders = [RandomTrader() for _ in range(n1)]
+    trend_traders = [TrendTrader() for _ in range(n2)]
+    value_traders = [ValueTrader() for _ in range(n3)]
+    prices = list(35.0 + np.cumsum(np.random.normal(0, 0.01, 1080)))
+    def step():
+        for trader in random_traders:
+            trader.tick_decision(35.0, 1000.0)
+        for trader in trend_traders:
+            trader.tick_decision(35.0, prices, 1000.0)
+        for trader in value_traders:
+            trader.tick_decision(35.0, 35.0, 1000.0)
+    return step
+
+def setup_end_to_end(agents: int):
+    simulation = Simulation(*population_mix(agents), seed=SEED)
+    return simulation.step
+
+SUITE = {
+    'node_tick_update': (setup_node_tick_update, False),
+    'noise_tick_decision': (setup_population('noise'), True),
+    'momentum_tick_decision': (setup_population('momentum'), True),
+    'value_tick_decision': (setup_population('value'), True),
+    'hft_tick_decision': (setup_population('hft'), True),
+    'object_traders': (setup_object_traders, True),
+    'end_to_end': (setup_end_to_end, True),
+}
+
+def measure_component(setup, agents: int, ticks: int, seconds: float) -> dict:
+    # peak memory of setup plus a few ticks under tracemalloc, then ticks/s on an untraced instance
+    tracemalloc.start()
+    try:
+        step = setup(agents)
+        for _ in range(MEMORY_TICKS):
+            step()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    step = setup(agents)
+    for _ in range(min(ticks // 10, 200)):
+        step()
+    done = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while done < ticks and elapsed < seconds:
+        step()
+        done += 1
+        elapsed = time.perf_counter() - start
+    return {'agents': agents, 'ticks': done, 'ticks_per_second': done / elapsed, 'peak_bytes': peak_bytes}
+
+def run_suite(scales=SUITE_SCALES, ticks: int = SUITE_TICKS, seconds: float = SUITE_SECONDS, components=None) -> dict:
+    results = {}
+    for name, (setup, scaled) in SUITE.items():
+        if components is not None and name not in components:
+            continue
+        for agents in (scales if scaled else (0,)):
+            if name == 'object_traders' and agents > OBJECT_LIMIT:
+                continue
+            key = name if not scaled else '%s@%d' % (name, agents)
+            results[key] = dict(measure_component(setup, agents, ticks, seconds), component=name)
+            print("%-34s %12.1f ticks/s %10.1f MB peak" % (key, results[key]['ticks_per_second'],
+                                                           results[key]['peak_bytes'] / 2 ** 20))
+    return results
+
+def write_results(path: str, results: dict) -> None:
+    document = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+    with open(path + '.tmp', 'w') as file:
+        json.dump(document, file, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def find_regressions(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    # slower by more than threshold, or a peak larger by more than threshold, against the same key
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        if result['ticks_per_second'] < base['ticks_per_second'] * (1 - threshold):
+            regressions.append("%s: %.1f ticks/s, baseline %.1f" % (key, result['ticks_per_second'], base['ticks_per_second']))
+        if result['peak_bytes'] > base['peak_bytes'] * (1 + threshold):
+            regressions.append("%s: %d peak bytes, baseline %d" % (key, result['peak_bytes'], base['peak_bytes']))
+    return regressions
+
+if __name__ == "__main__":
+    # correctness lives in tests/, this script only measures and gates on budgets and regressions
+    parser = argparse.ArgumentParser(description='Time every simulation component across population scales')
+    parser.add_argument('--scales', type=int, nargs='+', default=None, help='suite scales, SUITE_SCALES by default')
+    parser.add_argument('--heavy', action='store_true', help='also run the %d agent measurements' % HEAVY_AGENTS)
+    parser.add_argument('--ticks', type=int, default=SUITE_TICKS)
+    parser.add_argument('--seconds', type=float, default=SUITE_SECONDS, help='time limit per measurement')
+    parser.add_argument('--components', nargs='+', default=None, choices=sorted(SUITE))
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', default=None, help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--sharded', type=int, default=0, help='agents for the multi-process run, 0 to skip')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    agents = HEAVY_AGENTS if args.heavy else LIGHT_AGENTS
+    scales = args.scales if args.scales is not None else list(SUITE_SCALES) + ([HEAVY_AGENTS] if args.heavy else [])
+    results = run_suite(scales, args.ticks, args.seconds, args.components)
+    for replicas in (1, 16, 128):
+        tps = measure_replica_throughput(replicas, 500, 200, 300, min(args.ticks, 2000))
+        results['replicas@%d' % replicas] = {'component': 'replicas', 'agents': 1000 * replicas, 'ticks': min(args.ticks, 2000),
+                                             'ticks_per_second': tps, 'peak_bytes': 0}
+        print("replicas %d of 500/200/300: %.1f ticks x replicas/s" % (replicas, tps))
+    for label, dtypes in (('precise', None), ('compact', COMPACT)):
+        for name, sizes in measure_bytes_per_agent(agents, dtypes).items():
+            print("%s %-8s bytes per agent: state %d, scratch %.0f, total %.1f" % (label, name, sizes['state'], sizes['scratch'], sizes['total']))
+    for assets, tps in measure_market_scaling(ticks=min(args.ticks, 1000)).items():
+        results['market_assets@%d' % assets] = {'component': 'market', 'agents': 8000, 'ticks': min(args.ticks, 1000),
+                                                'ticks_per_second': tps, 'peak_bytes': 0}
+        print("market with %d assets: %.1f ticks/s" % (assets, tps))
+    book = measure_order_book()
+    results['order_book'] = {'component': 'order_book', 'agents': 0, 'ticks': 200000,
+                             'ticks_per_second': book['orders_per_second'], 'peak_bytes': int(book['bytes_per_resting_order'])}
+    print("order book: %.0f orders/s, %.0f batched orders/s, %.1f bytes per resting order" % (
+        book['orders_per_second'], book['batched_orders_per_second'], book['bytes_per_resting_order']))
+    accounts = measure_accounting(agents)
+    print("ledgers at %d agents: %.1f ticks/s, %.1f without, %.3fs daily snapshot, %d bytes per agent" % (
+        agents, accounts['ledger'], accounts['plain'], accounts['snapshot_seconds'], accounts['bytes_per_agent']))
+    cold = measure_cold_start()
+    results['cold_start'] = {'component': 'cold_start', 'agents': 1000, 'ticks': 1,
+                             'ticks_per_second': 1.0 / cold['process_seconds'], 'peak_bytes': 0}
+    print("headless cold start: %.3fs to first tick, %.3fs process wall clock" % (cold['first_tick_seconds'], cold['process_seconds']))
+    checkpoint = measure_checkpoint(agents)
+    print("checkpoint at %d agents: %.3fs pause, %.2fs write (%.1f MB), %.2fs compressed (%.1f MB), %.2fs restore" % (
+        agents, checkpoint['snapshot_seconds'], checkpoint['write_seconds'], checkpoint['bytes'] / 2 ** 20,
+        checkpoint['write_seconds_compressed'], checkpoint['bytes_compressed'] / 2 ** 20, checkpoint['restore_seconds']))
+    for name, churned in measure_churn().items():
+        print("churn %-5s 10^5 agents %.1f ticks/s, half retired %.1f, compacted %.1f, fresh half %.1f" % (
+            name, churned['full'], churned['retired'], churned['compacted'], churned['fresh']))
+    live = measure_feed_overhead()
+    print("live feed with a 1/s client: %+.1f%% run time, publishing %.2f%%, %d requests, %d ticks dropped" % (
+        100.0 * live['overhead'], 100.0 * live['publish_share'], live['requests'], live['dropped']))
+    overhead, facts = measure_analytics_overhead()
+    print("stylized facts listener: %+.1f%% run time, tick kurtosis %.2f, |r| lag 1 autocorrelation %.3f" % (
+        100.0 * overhead, facts['scales'][1]['kurtosis'], facts['scales'][1]['abs_autocorrelation'][1]))
+    for name, replayed in measure_replay().items():
+        results['replay@%s' % name] = {'component': 'replay', 'agents': 1000, 'ticks': 14400,
+                                       'ticks_per_second': 14400 / replayed['replay_seconds'], 'peak_bytes': 0}
+        print("replay %-8s %.3fs for a day, stepping %.2fs, %.0fx" % (name, replayed['replay_seconds'],
+                                                                       replayed['stepping_seconds'], replayed['speedup']))
+    if args.sharded > 0:
+        single, sharded = measure_sharded(args.sharded, 20, args.workers)
+        results['sharded@%d' % args.sharded] = {'component': 'sharded', 'agents': args.sharded, 'ticks': 20,
+                                               'ticks_per_second': sharded, 'peak_bytes': 0}
+        print("%d agents: %.2f ticks/s in one process, %.2f on %d shards" % (args.sharded, single, sharded, args.workers))
+    sequential, pooled = measure_concurrency(agents, 50, os.cpu_count() or 1, chunks=4)
+    print("%d agents in 4 chunks: %.1f ticks/s sequential, %.1f on %d threads" % (agents, sequential, pooled, os.cpu_count() or 1))
+    failed = False
+    for scale in (1, 100):
+        ticked = measure_tick_allocations(500 * scale, 200 * scale, 300 * scale, 200)
+        print("whole tick allocation peak at %d/%d/%d: %s" % (500 * scale, 200 * scale, 300 * scale, ticked))
+        failed |= max(ticked.values()) > ALLOCATION_BUDGET
+    write_results(args.output, results)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file)['results'], args.threshold)
+        for regression in regressions:
+            print("regression " + regression)
+        failed |= len(regressions) > 0
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,142 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+
+BAR_TICKS = 120
+SESSION_OPEN = np.timedelta64(9 * 3600 + 30 * 60, 's')
+LUNCH_BREAK = np.timedelta64(90 * 60, 's')
+START_DATE = np.datetime64('2025-01-01')
+# the baseline charts' controls: linear and log price axis and a zoom reset on every chart
+AXIS_BUTTONS = dict(type='buttons', direction='left', showactive=True, pad={'r': 10, 't': 10}, x=0.1, xanchor='left',
+                    y=1.1, yanchor='top',
+                    buttons=[dict(label='线性坐标', method='relayout', args=[{'yaxis.type': 'linear'}]),
+                             dict(label='对数坐标', method='relayout', args=[{'yaxis.type': 'log'}]),
+                             dict(label='重置缩放', method='relayout', args=[{'xaxis.autorange': True, 'yaxis.autorange': True}])])
+
+@lru_cache(maxsize=None)
+def session_axis(day_tick: int, bar_ticks: int = BAR_TICKS) -> np.ndarray:
+    # time of day of every bar open, one tick per second with the lunch break after the morning half
+    ticks = np.arange(0, day_tick, bar_ticks, dtype=np.int64)
+    seconds = ticks.astype('timedelta64[s]') + SESSION_OPEN
+    seconds[ticks >= day_tick // 2] += LUNCH_BREAK
+    seconds.flags.writeable = False
+    return seconds
+
+def kline_bars(prices: np.ndarray, bar_ticks: int = BAR_TICKS) -> dict:
+    # open/high/low/close over consecutive bar_ticks blocks, the last block may be short
+    prices = np.asarray(prices, dtype=np.float64)
+    full = prices.size // bar_ticks
+    blocks = prices[:full * bar_ticks].reshape(full, bar_ticks)
+    bars = {'open': blocks[:, 0], 'high': blocks.max(axis=1), 'low': blocks.min(axis=1), 'close': blocks[:, -1]}
+    if prices.size > full * bar_ticks:
+        tail = prices[full * bar_ticks:]
+        for name, value in (('open', tail[0]), ('high', tail.max()), ('low', tail.min()), ('close', tail[-1])):
+            bars[name] = np.append(bars[name], value)
+    return bars
+
+def day_kline(prices: np.ndarray, day: int, day_tick: int, bar_ticks: int = BAR_TICKS) -> dict:
+    bars = kline_bars(prices, bar_ticks)
+    bars['time'] = START_DATE + np.timedelta64(day, 'D') + session_axis(day_tick, bar_ticks)[:bars['open'].size]
+    return bars
+
+def week_kline(bars: dict, dates: np.ndarray) -> dict:
+    # daily bars folded into Monday to Sunday weeks, each labelled by its Sunday like a weekly resample
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    # 1970-01-01 was a Thursday
+    weeks = (days + 3) // 7
+    _, starts = np.unique(weeks, return_index=True)
+    stops = np.append(starts[1:], days.size) - 1
+    return {'open': np.asarray(bars['open'])[starts], 'high': np.maximum.reduceat(np.asarray(bars['high']), starts),
+            'low': np.minimum.reduceat(np.asarray(bars['low']), starts), 'close': np.asarray(bars['close'])[stops],
+            'time': (weeks[starts] * 7 + 3).astype('datetime64[D]')}
+
+class KlineReport:
+    def __init__(self, day_tick: int, bar_ticks: int = BAR_TICKS) -> None:
+        # keeps only today's ticks plus finished bars, so memory grows with bars rather than ticks
+        self.__day_tick = int(day_tick)
+        self.__bar_ticks = int(bar_ticks)
+        self.__prices = np.zeros(self.__day_tick, dtype=np.float64)
+        self.__ticks = 0
+        self.__days = []
+        self.__executor = None
+        self.__future = None
+
+    def get_days(self) -> list:
+        return self.__days
+
+    def on_tick(self, node) -> None:
+        if self.__ticks == self.__prices.size:
+            self.__close_day()
+        self.__prices[self.__ticks] = node.get_current_price()
+        self.__ticks += 1
+
+    def on_day(self, node) -> None:
+        self.__close_day()
+
+    def __close_day(self) -> None:
+        if self.__ticks > 0:
+            self.__days.append(day_kline(self.__prices[:self.__ticks], len(self.__days), self.__day_tick, self.__bar_ticks))
+        self.__ticks = 0
+
+    def add_day(self, prices: np.ndarray) -> None:
+        # deal with days coming from a recorder instead of a live node
+        self.__days.append(day_kline(prices, len(self.__days), self.__day_tick, self.__bar_ticks))
+
+    def write(self, path: str, day_price_history: dict = None) -> None:
+        self.__close_day()
+        write_report(path, self.__days, day_price_history)
+
+    def write_async(self, path: str, day_price_history: dict = None):
+        # rendering runs on a single background thread, the returned future reports when the file is done
+        self.__close_day()
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=1)
+        days = list(self.__days)
+        if day_price_history is not None:
+            day_price_history = {name: np.array(column) for name, column in day_price_history.items()}
+        self.__future = self.__executor.submit(write_report, path, days, day_price_history)
+        return self.__future
+
+    def close(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+def candlestick(bars: dict, x, name: str):
+    import plotly.graph_objects as go
+    return go.Candlestick(x=x, open=bars['open'], high=bars['high'], low=bars['low'], close=bars['close'],
+                          increasing_line_color='red', decreasing_line_color='green', name=name)
+
+def write_report(path: str, days: list, day_price_history: dict = None) -> None:
+    # one html file, plotly.js embedded once and shared by every chart
+    import plotly.graph_objects as go
+    figures = []
+    if day_price_history is not None and len(day_price_history['open']) > 0:
+        dates = START_DATE + np.arange(len(day_price_history['open'])).astype('timedelta64[D]')
+        weeks = week_kline(day_price_history, dates)
+        # the weekly bars are a second, hidden trace the 日线/周线 buttons switch to
+        figure = go.Figure(data=[candlestick(day_price_history, dates, '日K线'), candlestick(weeks, weeks['time'], '周K线')])
+        figure.update_traces(visible=False, selector=dict(name='周K线'))
+        figure.update_layout(title='多日K线走势分析', xaxis=dict(type='date', tickformat='%Y-%m-%d', rangeslider=dict(visible=False)),
+                             yaxis=dict(title='价格'), hovermode='x unified', template='plotly_white', height=600,
+                             updatemenus=[AXIS_BUTTONS,
+                                          dict(type='buttons', direction='left', showactive=True, pad={'r': 10, 't': 10}, x=0.6,
+                                               xanchor='left', y=1.1, yanchor='top',
+                                               buttons=[dict(label='日线', method='update', args=[{'visible': [True, False]}]),
+                                                        dict(label='周线', method='update', args=[{'visible': [False, True]}])])])
+        figures.append(figure)
+    for day, bars in enumerate(days):
+        figure = go.Figure(data=[candlestick(bars, bars['time'], 'day ' + str(day + 1))])
+        figure.update_layout(title='K线图 day ' + str(day + 1), xaxis_title='时间', yaxis_title='价格',
+                             xaxis_rangeslider_visible=False, xaxis_rangebreaks=[dict(bounds=[11.5, 13], pattern='hour'),
+                                                                                 dict(bounds=[15, 9.5], pattern='hour')],
+                             dragmode='pan', hovermode='x unified', template='plotly_white', updatemenus=[AXIS_BUTTONS])
+        figures.append(figure)
+    parts = [figure.to_html(full_html=False, include_plotlyjs=(i == 0)) for i, figure in enumerate(figures)]
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        file.write('<html><head><meta charset="utf-8"></head><body>\n')
+        file.write('\n'.join(parts))
+        file.write('\n</body></html>\n')
+    os.replace(temporary, path)
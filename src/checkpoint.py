@@ -0,0 +1,126 @@
+import glob
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+MAGIC = b'SIMCKPT1'
+COMPRESS_LEVEL = 1
+PATTERN = 'checkpoint-%012d.ckpt'
+
+def pack(snapshot, arrays: list):
+    # nested dicts, lists and scalars go into the JSON header, arrays are swapped for their index in arrays
+    if isinstance(snapshot, np.ndarray):
+        arrays.append(np.ascontiguousarray(snapshot))
+        return {'__array__': len(arrays) - 1}
+    if isinstance(snapshot, dict):
+        # JSON only has string keys, integer keys are tagged so they come back as integers
+        return {('#%d' % key if isinstance(key, int) else key): pack(value, arrays) for key, value in snapshot.items()}
+    if isinstance(snapshot, (list, tuple)):
+        return [pack(value, arrays) for value in snapshot]
+    if isinstance(snapshot, np.generic):
+        return snapshot.item()
+    return snapshot
+
+def unpack(header, arrays: list):
+    if isinstance(header, dict):
+        if '__array__' in header:
+            return arrays[header['__array__']]
+        return {(int(key[1:]) if key.startswith('#') else key): unpack(value, arrays) for key, value in header.items()}
+    if isinstance(header, list):
+        return [unpack(value, arrays) for value in header]
+    return header
+
+def write_snapshot(path: str, snapshot: dict, compress: bool = False) -> int:
+    # magic, header length, JSON header, then every array's raw bytes written straight from its buffer;
+    # the file only appears under its name once complete
+    arrays = []
+    header = {'snapshot': pack(snapshot, arrays), 'compressed': compress, 'arrays': []}
+    blobs = []
+    for array in arrays:
+        blob = zlib.compress(memoryview(array).cast('B'), COMPRESS_LEVEL) if compress else memoryview(array).cast('B')
+        header['arrays'].append({'dtype': array.dtype.str, 'shape': array.shape, 'nbytes': len(blob)})
+        blobs.append(blob)
+    encoded = json.dumps(header).encode()
+    with open(path + '.tmp', 'wb') as file:
+        file.write(MAGIC)
+        file.write(struct.pack('<Q', len(encoded)))
+        file.write(encoded)
+        for blob in blobs:
+            file.write(blob)
+    os.replace(path + '.tmp', path)
+    return os.path.getsize(path)
+
+def read_snapshot(path: str) -> dict:
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('%s is not a checkpoint' % path)
+    length, = struct.unpack_from('<Q', data, len(MAGIC))
+    offset = len(MAGIC) + 8
+    header = json.loads(data[offset:offset + length])
+    offset += length
+    view = memoryview(data)
+    arrays = []
+    for entry in header['arrays']:
+        blob = view[offset:offset + entry['nbytes']]
+        offset += entry['nbytes']
+        if header['compressed']:
+            blob = zlib.decompress(blob)
+        arrays.append(np.frombuffer(blob, dtype=np.dtype(entry['dtype'])).reshape(entry['shape']))
+    return unpack(header['snapshot'], arrays)
+
+def latest(directory: str) -> str:
+    paths = sorted(glob.glob(os.path.join(directory, PATTERN.replace('%012d', '*'))))
+    return paths[-1] if paths else None
+
+def restore(path: str, **options):
+    # a Simulation rebuilt from the checkpoint's own configuration; runtime options such as workers,
+    # profiler or recorder are passed through
+    from simulation import Simulation
+    snapshot = read_snapshot(path)
+    simulation = Simulation(**dict(snapshot['config'], **options))
+    simulation.set_snapshot(snapshot)
+    return simulation
+
+class Checkpointer:
+    def __init__(self, directory: str, every: int, compress: bool = False, keep: int = 2) -> None:
+        # snapshots are taken on the simulation thread and written by one background thread, at most one
+        # write is in flight so a slow disk holds back the next checkpoint rather than piling up copies
+        self.__directory = directory
+        self.__every = int(every)
+        self.__compress = compress
+        self.__keep = int(keep)
+        self.__executor = ThreadPoolExecutor(max_workers=1)
+        self.__pending = None
+        self.__written = []
+        os.makedirs(directory, exist_ok=True)
+
+    def get_every(self) -> int:
+        return self.__every
+
+    def get_written(self) -> list:
+        return self.__written
+
+    def save(self, snapshot: dict, tick: int) -> None:
+        self.wait()
+        path = os.path.join(self.__directory, PATTERN % tick)
+        self.__pending = self.__executor.submit(self.__write, path, snapshot)
+
+    def __write(self, path: str, snapshot: dict) -> None:
+        write_snapshot(path, snapshot, self.__compress)
+        self.__written.append(path)
+        # deal with old checkpoints
+        while len(self.__written) > self.__keep > 0:
+            os.remove(self.__written.pop(0))
+
+    def wait(self) -> None:
+        if self.__pending is not None:
+            self.__pending.result()
+            self.__pending = None
+
+    def close(self) -> None:
+        self.wait()
+        self.__executor.shutdown(wait=True)
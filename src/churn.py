@@ -0,0 +1,115 @@
+import numpy as np
+
+COMPACT_SHARE = 0.25
+
+class Churn:
+    def __init__(self, arrivals: float = 0.0, compact_share: float = COMPACT_SHARE, seed=None) -> None:
+        # agents retire once bankrupt with nothing left to sell, arrivals come as a Poisson number per day;
+        # retired slots are reused by arrivals and the columns are compacted at a day boundary once
+        # more than compact_share of them are dead. a retired agent is never rescheduled, so a tick only
+        # ever touches live agents
+        self.__arrivals = float(arrivals)
+        self.__compact_share = float(compact_share)
+        self.__generator = np.random.default_rng(seed)
+        self.__state = None
+        self.__free = []
+        self.__live = None
+        self.__retired = 0
+        self.__arrived = 0
+        self.__compactions = 0
+
+    def attach(self, state, calendar, spawn, resize, bankruptcy_cash: float) -> None:
+        # spawn(count) draws count new agents as {field: values, 'wake': ticks from now}, resize(size) lets
+        # the population grow its scratch buffers
+        if self.__state is not None:
+            raise ValueError('a Churn belongs to one population')
+        if state.get_matrix('cash').shape[0] != 1:
+            raise ValueError('churn needs a single-market population')
+        self.__state = state
+        self.__calendar = calendar
+        self.__spawn = spawn
+        self.__resize = resize
+        self.__bankruptcy_cash = float(bankruptcy_cash)
+        self.__alive = np.ones(state.get_size(), dtype=np.bool_)
+
+    def get_size(self) -> int:
+        return self.__alive.size
+
+    def get_alive(self) -> np.ndarray:
+        return self.__alive
+
+    def get_live_count(self) -> int:
+        return self.__alive.size - sum(free.size for free in self.__free)
+
+    def get_counts(self) -> dict:
+        return {'live': self.get_live_count(), 'size': self.__alive.size, 'retired': self.__retired,
+                'arrived': self.__arrived, 'compactions': self.__compactions}
+
+    def get_live(self) -> np.ndarray:
+        # slots of every live agent, cached until the next retirement, arrival or compaction
+        if self.__live is None:
+            self.__live = np.flatnonzero(self.__alive)
+        return self.__live
+
+    def retire(self, active_traders: np.ndarray, wake: np.ndarray, cash: np.ndarray, positions: np.ndarray) -> tuple:
+        # cash and positions are the settled values of the waking agents; returns who is rescheduled
+        retired = (cash <= self.__bankruptcy_cash) & (positions <= 0)
+        if not retired.any():
+            return active_traders, wake
+        slots = active_traders[retired]
+        self.__alive[slots] = False
+        self.__state.get_column('cash')[slots] = 0.0
+        self.__free.append(slots)
+        self.__retired += slots.size
+        self.__live = None
+        survivors = ~retired
+        return active_traders[survivors], wake[survivors]
+
+    def on_tick(self, node) -> None:
+        pass
+
+    def on_day(self, node) -> None:
+        dead = self.__alive.size - self.get_live_count()
+        if dead > self.__compact_share * self.__alive.size:
+            self.compact()
+        self.arrive(self.__generator.poisson(self.__arrivals) if self.__arrivals > 0 else 0)
+
+    def compact(self) -> None:
+        # live agents move to the front in slot order and the wake calendar follows them
+        order = np.flatnonzero(self.__alive)
+        mapping = np.full(self.__alive.size, -1, dtype=np.intp)
+        mapping[order] = np.arange(order.size)
+        for name in self.__state.get_fields():
+            column = self.__state.get_column(name)
+            column[:order.size] = column[order]
+        self.__state.resize(order.size)
+        self.__resize(order.size)
+        self.__calendar.remap(mapping)
+        self.__alive = np.ones(order.size, dtype=np.bool_)
+        self.__free = []
+        self.__live = None
+        self.__compactions += 1
+
+    def arrive(self, count: int) -> np.ndarray:
+        # free slots first, the columns grow for the rest
+        if count <= 0:
+            return np.zeros(0, dtype=np.intp)
+        free = np.concatenate(self.__free) if self.__free else np.zeros(0, dtype=np.intp)
+        slots = free[:count]
+        self.__free = [free[count:]] if free.size > count else []
+        if slots.size < count:
+            size = self.__alive.size
+            grown = count - slots.size
+            self.__state.resize(size + grown)
+            self.__resize(size + grown)
+            self.__alive = np.concatenate((self.__alive, np.zeros(grown, dtype=np.bool_)))
+            slots = np.concatenate((slots, np.arange(size, size + grown)))
+        values = self.__spawn(count)
+        # columns the population does not draw, such as a ledger's, start at zero
+        for name in self.__state.get_fields():
+            self.__state.get_column(name)[slots] = values[name] if name in values else 0
+        self.__alive[slots] = True
+        self.__calendar.schedule(slots, np.asarray(values['wake']) + self.__calendar.get_tick())
+        self.__arrived += count
+        self.__live = None
+        return slots
@@ -0,0 +1,289 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+RING = 2 ** 16
+RESOLUTIONS = (1, 60, 600)
+KEEP = 2000
+HISTORY = 2 ** 17
+POINTS = 1000
+INTERVAL = 0.05
+HOST = '127.0.0.1'
+
+# tick, price, depth, buy, sell
+COLUMNS = 5
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><title>market</title></head>
+<body style="font-family: sans-serif">
+<div id="status"></div>
+<canvas id="chart" width="1200" height="500"></canvas>
+<script>
+async function draw() {
+  const status = await (await fetch('/status')).json();
+  const prices = await (await fetch('/prices?points=1200')).json();
+  document.getElementById('status').textContent =
+    'tick ' + status.tick + '  price ' + status.price + '  dropped ' + status.dropped;
+  const canvas = document.getElementById('chart'), context = canvas.getContext('2d');
+  context.clearRect(0, 0, canvas.width, canvas.height);
+  if (prices.tick.length > 1) {
+    const x0 = prices.tick[0], x1 = prices.tick[prices.tick.length - 1];
+    const y0 = Math.min(...prices.price), y1 = Math.max(...prices.price);
+    context.beginPath();
+    prices.tick.forEach((tick, i) => {
+      const x = (tick - x0) / Math.max(x1 - x0, 1) * canvas.width;
+      const y = canvas.height - (prices.price[i] - y0) / Math.max(y1 - y0, 1e-9) * canvas.height;
+      i === 0 ? context.moveTo(x, y) : context.lineTo(x, y);
+    });
+    context.stroke();
+  }
+  setTimeout(draw, 1000);
+}
+draw();
+</script></body></html>
+"""
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    # largest-triangle-three-buckets: indices of at most points samples that keep the visual shape,
+    # first and last always included
+    size = x.size
+    if points >= size or points < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, points - 1).astype(np.intp)
+    chosen = np.zeros(points, dtype=np.intp)
+    chosen[-1] = size - 1
+    a = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        following_stop = edges[bucket + 2] if bucket + 2 < points - 1 else size
+        # the next bucket is stood in for by its average point
+        cx = x[stop:following_stop].mean()
+        cy = y[stop:following_stop].mean()
+        area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        chosen[bucket + 1] = a
+    return chosen
+
+class Bars:
+    def __init__(self, resolution: int, keep: int = KEEP) -> None:
+        # the last keep complete OHLCV bars of resolution ticks in a ring, plus the bar still filling
+        self.__resolution = int(resolution)
+        self.__keep = int(keep)
+        self.__bars = np.zeros((self.__keep, 6), dtype=np.float64)
+        self.__count = 0
+        self.__current = None
+
+    def get_resolution(self) -> int:
+        return self.__resolution
+
+    def add(self, ticks: np.ndarray, prices: np.ndarray, volume: np.ndarray) -> None:
+        if ticks.size == 0:
+            return
+        ids = ticks // self.__resolution
+        starts = np.flatnonzero(np.diff(ids)) + 1
+        starts = np.concatenate(([0], starts))
+        stops = np.append(starts[1:], ids.size)
+        # start tick, open, high, low, close, volume
+        bars = np.empty((starts.size, 6), dtype=np.float64)
+        bars[:, 0] = ids[starts] * self.__resolution
+        bars[:, 1] = prices[starts]
+        bars[:, 2] = np.maximum.reduceat(prices, starts)
+        bars[:, 3] = np.minimum.reduceat(prices, starts)
+        bars[:, 4] = prices[stops - 1]
+        bars[:, 5] = np.add.reduceat(volume, starts)
+        # deal with the bar left filling by the previous batch
+        current = self.__current
+        if current is not None:
+            if current[0] == bars[0, 0]:
+                bars[0, 1] = current[1]
+                bars[0, 2] = max(bars[0, 2], current[2])
+                bars[0, 3] = min(bars[0, 3], current[3])
+                bars[0, 5] += current[5]
+            else:
+                self.__append(current[np.newaxis])
+        self.__append(bars[:-1])
+        self.__current = bars[-1].copy()
+
+    def __append(self, bars: np.ndarray) -> None:
+        bars = bars[-self.__keep:]
+        slots = (self.__count + np.arange(bars.shape[0])) % self.__keep
+        self.__bars[slots] = bars
+        self.__count += bars.shape[0]
+
+    def get(self, count: int = KEEP) -> np.ndarray:
+        # oldest first, the bar still filling last
+        filling = self.__current is not None and count > 0
+        done = max(min(int(count) - filling, self.__count, self.__keep), 0)
+        bars = self.__bars[(self.__count - done + np.arange(done)) % self.__keep]
+        if filling:
+            bars = np.vstack((bars, self.__current))
+        return bars
+
+class LiveFeed:
+    def __init__(self, port: int = None, host: str = HOST, resolutions: tuple = RESOLUTIONS, capacity: int = RING,
+                 history: int = HISTORY, keep: int = KEEP, interval: float = INTERVAL) -> None:
+        # on_tick only writes one row into a single-producer single-consumer ring and moves the write
+        # counter; a full ring drops the tick rather than wait. a consumer thread drains the ring every
+        # interval seconds into OHLCV bars and a bounded price history, and an HTTP server (port None for
+        # none, 0 for any free port) serves them, so a slow client only ever holds up its own handler
+        capacity = 1 << (int(capacity) - 1).bit_length()
+        self.__ring = np.zeros((capacity, COLUMNS), dtype=np.float64)
+        self.__mask = capacity - 1
+        self.__written = 0
+        self.__read = 0
+        self.__tick = 0
+        self.__dropped = 0
+        self.__interval = float(interval)
+        self.__bars = {int(resolution): Bars(resolution, keep) for resolution in resolutions}
+        self.__history = np.zeros((1 << (int(history) - 1).bit_length(), 2), dtype=np.float64)
+        self.__stored = 0
+        self.__last = None
+        # the consumer and the HTTP handlers share this lock, the simulation thread never takes it
+        self.__lock = threading.Lock()
+        self.__version = 0
+        self.__cache = {}
+        self.__stop = threading.Event()
+        self.__consumer = threading.Thread(target=self.__consume, name='feed-consumer', daemon=True)
+        self.__consumer.start()
+        self.__server = None
+        if port is not None:
+            self.__server = ThreadingHTTPServer((host, int(port)), self.__handler())
+            self.__server.daemon_threads = True
+            threading.Thread(target=self.__server.serve_forever, name='feed-server', daemon=True).start()
+
+    def get_address(self) -> tuple:
+        return None if self.__server is None else self.__server.server_address
+
+    def get_published(self) -> int:
+        return self.__written
+
+    def get_dropped(self) -> int:
+        return self.__dropped
+
+    def on_tick(self, node) -> None:
+        written = self.__written
+        self.__tick += 1
+        if written - self.__read > self.__mask:
+            self.__dropped += 1
+            return
+        row = self.__ring[written & self.__mask]
+        row[0] = self.__tick
+        row[1] = node.get_current_price()
+        row[2] = node.get_market_depth()
+        row[3] = node.get_buy_per_tick()
+        row[4] = node.get_sell_per_tick()
+        # the row is complete before the consumer may see it
+        self.__written = written + 1
+
+    def on_day(self, node) -> None:
+        pass
+
+    def __consume(self) -> None:
+        while not self.__stop.wait(self.__interval):
+            self.__drain()
+        self.__drain()
+
+    def __drain(self) -> int:
+        # consumer thread only, the one reader of the ring: copy out whatever is published, then hand the
+        # slots back to the producer. close joins the thread after its last drain
+        read, written = self.__read, self.__written
+        if written == read:
+            return 0
+        rows = self.__ring[np.arange(read, written) & self.__mask]
+        self.__read = written
+        ticks = rows[:, 0].astype(np.int64)
+        prices = rows[:, 1]
+        volume = rows[:, 3] + rows[:, 4]
+        with self.__lock:
+            for bars in self.__bars.values():
+                bars.add(ticks, prices, volume)
+            kept = rows[-self.__history.shape[0]:, :2]
+            slots = (self.__stored + np.arange(kept.shape[0])) & (self.__history.shape[0] - 1)
+            self.__history[slots] = kept
+            self.__stored += kept.shape[0]
+            self.__last = rows[-1].copy()
+            self.__version += 1
+            self.__cache.clear()
+        return rows.shape[0]
+
+    def get_status(self) -> dict:
+        with self.__lock:
+            last = self.__last
+            return {'tick': 0 if last is None else int(last[0]), 'price': None if last is None else float(last[1]),
+                    'depth': None if last is None else float(last[2]), 'published': self.__written,
+                    'dropped': self.__dropped, 'pending': self.__written - self.__read,
+                    'resolutions': sorted(self.__bars)}
+
+    def get_bars(self, resolution: int, count: int = KEEP) -> dict:
+        if resolution not in self.__bars:
+            raise ValueError('no bars at resolution %d, only %s' % (resolution, sorted(self.__bars)))
+        with self.__lock:
+            bars = self.__bars[resolution].get(count)
+        return {'tick': bars[:, 0].astype(np.int64).tolist(), 'open': bars[:, 1].tolist(), 'high': bars[:, 2].tolist(),
+                'low': bars[:, 3].tolist(), 'close': bars[:, 4].tolist(), 'volume': bars[:, 5].tolist()}
+
+    def get_prices(self, points: int = POINTS) -> dict:
+        # the whole bounded history decimated to points by LTTB, cached until the next drain
+        with self.__lock:
+            key = ('prices', int(points))
+            if key in self.__cache:
+                return self.__cache[key]
+            size = self.__history.shape[0]
+            stored = min(self.__stored, size)
+            history = self.__history[(self.__stored - stored + np.arange(stored)) & (size - 1)]
+            version = self.__version
+        chosen = lttb(history[:, 0], history[:, 1], int(points))
+        prices = {'tick': history[chosen, 0].astype(np.int64).tolist(), 'price': history[chosen, 1].tolist()}
+        with self.__lock:
+            if self.__version == version:
+                self.__cache[key] = prices
+        return prices
+
+    def __handler(self):
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                try:
+                    if url.path == '/':
+                        self.__send(PAGE, 'text/html')
+                        return
+                    if url.path == '/status':
+                        body = feed.get_status()
+                    elif url.path == '/bars':
+                        body = feed.get_bars(int(query.get('resolution', min(feed.get_status()['resolutions']))),
+                                             int(query.get('count', KEEP)))
+                    elif url.path == '/prices':
+                        body = feed.get_prices(int(query.get('points', POINTS)))
+                    else:
+                        self.send_error(404)
+                        return
+                except ValueError as error:
+                    self.send_error(400, str(error))
+                    return
+                self.__send(json.dumps(body).encode(), 'application/json')
+
+            def __send(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        return Handler
+
+    def close(self) -> None:
+        self.__stop.set()
+        self.__consumer.join()
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
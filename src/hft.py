@@ -0,0 +1,63 @@
+import numpy as np
+from population import Strategy
+
+class MeanReversionHFT(Strategy):
+    # trades every tick against short deviations from a per-agent moving average of lookback ticks,
+    # a fixed clip per trade and an inventory band around the starting position
+    name = 'hft'
+    fields = {'lookback': np.int32, 'threshold': np.float64, 'clip': np.int32, 'home': np.int32}
+    floats = 3
+    masks = 2
+    indices = 1
+    window = 64
+    every_tick = True
+    bankruptcy_cash = 1000.0
+
+    def __init__(self, min_lookback: int = 5, max_lookback: int = 30, min_threshold: float = 0.0002,
+                 max_threshold: float = 0.001, min_clip: int = 1, max_clip: int = 10, inventory: int = 50) -> None:
+        self.__min_lookback = int(min_lookback)
+        self.__max_lookback = int(min(max_lookback, self.window))
+        self.__min_threshold = float(min_threshold)
+        self.__max_threshold = float(max_threshold)
+        self.__min_clip = int(min_clip)
+        self.__max_clip = int(max_clip)
+        self.__inventory = int(inventory)
+
+    def get_parameters(self) -> dict:
+        return {'min_lookback': self.__min_lookback, 'max_lookback': self.__max_lookback,
+                'min_threshold': self.__min_threshold, 'max_threshold': self.__max_threshold,
+                'min_clip': self.__min_clip, 'max_clip': self.__max_clip, 'inventory': self.__inventory}
+
+    def initialize(self, state: dict, generator: np.random.Generator, shape: tuple) -> None:
+        state['lookback'][:] = generator.integers(self.__min_lookback, self.__max_lookback + 1, shape)
+        state['threshold'][:] = generator.uniform(self.__min_threshold, self.__max_threshold, shape)
+        state['clip'][:] = generator.integers(self.__min_clip, self.__max_clip + 1, shape)
+        state['home'][:] = state['positions']
+
+    def signal(self, agents: dict) -> None:
+        window = agents['window']
+        deviation, held, end = agents['floats']
+        mask, other = agents['masks']
+        index, = agents['indices']
+        lookback = agents['lookback']
+        orders = agents['orders']
+        # deviation of the price from the moving average, in units of the average
+        window.sum(lookback, out=deviation, index=index, column=agents['replica'], end=end)
+        np.copyto(held, lookback)
+        np.divide(deviation, held, out=deviation)
+        np.divide(agents['price'], deviation, out=deviation)
+        np.subtract(deviation, 1.0, out=deviation)
+        np.greater(lookback, len(window), out=mask)
+        np.copyto(deviation, 0.0, where=mask)
+        # inventory relative to home
+        np.subtract(agents['positions'], agents['home'], out=held)
+        np.negative(agents['threshold'], out=end)
+        np.less(deviation, end, out=mask)
+        np.less(held, self.__inventory, out=other)
+        np.logical_and(mask, other, out=mask)
+        np.copyto(orders, agents['clip'], where=mask, casting='unsafe')
+        np.greater(deviation, agents['threshold'], out=mask)
+        np.greater(held, -self.__inventory, out=other)
+        np.logical_and(mask, other, out=mask)
+        np.negative(agents['clip'], out=end, casting='unsafe')
+        np.copyto(orders, end, where=mask)
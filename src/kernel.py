@@ -0,0 +1,133 @@
+import numpy as np
+
+class Scratch:
+    def __init__(self, n: int, floats: int = 6, masks: int = 3, indices: int = 2) -> None:
+        # every per-tick temporary of a population lives here, sliced to the number of waking traders
+        n = max(int(n), 1)
+        self.__floats = np.zeros((floats, n), dtype=np.float64)
+        self.__masks = np.zeros((masks, n), dtype=np.bool_)
+        self.__indices = np.zeros((indices, n), dtype=np.intp)
+
+    def get_floats(self, k: int) -> list:
+        return [buffer[:k] for buffer in self.__floats]
+
+    def get_masks(self, k: int) -> list:
+        return [buffer[:k] for buffer in self.__masks]
+
+    def get_indices(self, k: int) -> list:
+        return [buffer[:k] for buffer in self.__indices]
+
+    def get_capacity(self) -> int:
+        return self.__floats.shape[1]
+
+    def get_nbytes(self) -> int:
+        return self.__floats.nbytes + self.__masks.nbytes + self.__indices.nbytes
+
+def locate(active_traders: np.ndarray, n: int, replicas: int, replica: np.ndarray):
+    # replica market of every waking trader, None when the population trades in a single market
+    if replicas == 1:
+        return None
+    return np.floor_divide(active_traders, n, out=replica)
+
+def per_trader(values, replica, out: np.ndarray):
+    if replica is None:
+        return float(values) if np.ndim(values) == 0 else float(values[0])
+    return np.take(values, replica, out=out, mode='clip')
+
+def settle(cash: np.ndarray, positions: np.ndarray, orders: np.ndarray, current_price,
+           cost: np.ndarray, clipped: np.ndarray, side: np.ndarray,
+           replica=None, replicas: int = 1, clipped_counts=None) -> tuple:
+    # the settlement of every waking trader, evaluated in place on the gathered cash and positions
+    # not enough cash: buy as many as the cash allows
+    np.multiply(orders, current_price, out=cost)
+    np.less(cash, cost, out=clipped)
+    np.greater(orders, 0, out=side)
+    np.logical_and(clipped, side, out=clipped)
+    if clipped_counts is not None:
+        clipped_counts[0] += np.count_nonzero(clipped)
+    np.divide(cash, current_price, out=cost)
+    np.floor(cost, out=cost)
+    np.copyto(orders, cost, where=clipped)
+    # not enough position: sell everything held
+    np.add(positions, orders, out=cost)
+    np.less(cost, 0, out=clipped)
+    np.less(orders, 0, out=side)
+    np.logical_and(clipped, side, out=clipped)
+    if clipped_counts is not None:
+        clipped_counts[1] += np.count_nonzero(clipped)
+    np.negative(positions, out=orders, where=clipped)
+    # apply
+    np.add(positions, orders, out=positions)
+    np.multiply(orders, current_price, out=cost)
+    np.subtract(cash, cost, out=cash)
+    if replica is None:
+        buy_amount = np.maximum(orders, 0, out=cost).sum()
+        sell_amount = np.minimum(orders, 0, out=cost).sum()
+        return int(buy_amount), int(sell_amount)
+    buy_amount = np.bincount(replica, weights=np.maximum(orders, 0, out=cost), minlength=replicas)
+    sell_amount = np.bincount(replica, weights=np.minimum(orders, 0, out=cost), minlength=replicas)
+    return buy_amount.astype(np.int64), sell_amount.astype(np.int64)
+
+def liquidate(cash: np.ndarray, orders: np.ndarray, current_price, bankruptcy_cash: float,
+              bankrupt: np.ndarray, amount: np.ndarray, least: np.ndarray = None) -> None:
+    # deal with bankrupters: a forced sale of twice the shortfall's worth of shares, at least one (and at
+    # least least when given), overriding whatever order they held
+    np.less_equal(cash, bankruptcy_cash, out=bankrupt)
+    np.subtract(bankruptcy_cash, cash, out=amount)
+    np.divide(amount, current_price, out=amount)
+    np.multiply(amount, 2.0, out=amount)
+    np.floor(amount, out=amount)
+    if least is not None:
+        np.maximum(amount, least, out=amount)
+    np.maximum(amount, 1.0, out=amount)
+    np.negative(amount, out=orders, where=bankrupt)
+
+def refill(cash: np.ndarray, positions: np.ndarray, orders: np.ndarray, current_price,
+           filled: np.ndarray, paid: np.ndarray, price: np.ndarray, traded: np.ndarray) -> np.ndarray:
+    # undo a settlement at current_price and apply each trader's own fills instead: orders become the signed
+    # filled amounts, price the average price each trader got (current_price where nothing traded)
+    np.subtract(positions, orders, out=positions)
+    np.add(positions, filled, out=positions)
+    np.multiply(orders, current_price, out=price)
+    np.add(cash, price, out=cash)
+    np.subtract(cash, paid, out=cash)
+    np.copyto(orders, filled)
+    np.not_equal(filled, 0, out=traded)
+    np.copyto(price, current_price)
+    np.divide(paid, filled, out=price, where=traded)
+    return price
+
+def settle_into(state, active_traders: np.ndarray, cash: np.ndarray, positions: np.ndarray, orders: np.ndarray,
+                current_price, cost: np.ndarray, clipped: np.ndarray, side: np.ndarray,
+                replica=None, replicas: int = 1, clipped_counts=None, ledger=None, fill=None) -> tuple:
+    # settle, book the fills in the population's ledger, and write cash and positions back to state. with
+    # fill (settled orders and cash budgets -> signed filled and paid per trader, see Node.fill) each trader
+    # is settled again against what the book traded for it; the budget is the cash held before the trade,
+    # so a buy that walks the book stops where the cash runs out instead of overdrawing it
+    buy_amount, sell_amount = settle(cash, positions, orders, current_price, cost, clipped, side, replica, replicas,
+                                     clipped_counts)
+    if fill is not None:
+        np.multiply(orders, current_price, out=cost)
+        np.add(cash, cost, out=cost)
+        filled, paid = fill(orders, cost)
+        current_price = refill(cash, positions, orders, current_price, filled, paid, cost, clipped)
+    if ledger is not None:
+        ledger.settle(active_traders, orders, current_price, cash, positions)
+    if fill is not None:
+        buy_amount = int(np.maximum(orders, 0, out=cost).sum())
+        sell_amount = int(np.minimum(orders, 0, out=cost).sum())
+    state.scatter('cash', active_traders, cash)
+    state.scatter('positions', active_traders, positions)
+    return buy_amount, sell_amount
+
+def reschedule(calendar, churn, active_traders: np.ndarray, wake: np.ndarray, cash: np.ndarray, positions: np.ndarray) -> None:
+    # deal with cooldown: wake holds ticks from now, agents churn retires are not woken again
+    np.add(wake, calendar.get_tick(), out=wake)
+    if churn is not None:
+        active_traders, wake = churn.retire(active_traders, wake, cash, positions)
+    calendar.schedule(active_traders, wake)
+
+def count_settled(profiler, name: str, started: int, active_traders: np.ndarray, orders: np.ndarray) -> None:
+    profiler.lap(name + '.settle', started)
+    profiler.count(name + '.active', active_traders.size)
+    profiler.count(name + '.orders', np.count_nonzero(orders))
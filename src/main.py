@@ -1,18 +1,88 @@
-from datetime import datetime, timedelta
-from market import Node
-from trader import RandomTrader, TrendTrader, ValueTrader
-import matplotlib.pyplot as plt
-import pandas as pd
-import plotly.graph_objects as go
-from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+import time
+STARTED = time.perf_counter()
+import argparse
+import json
+import sys
+from market import DAY_TICK
+from simulation import Simulation
 
-DAY_TICK = 14400
+SEED = 2025
+DAYS = 30
+# the run main.py used to hardcode; a scenario file only lists what it changes
+SCENARIO = {'noise': 500, 'momentum': 200, 'value': 300, 'seed': SEED, 'day_tick': DAY_TICK, 'days': DAYS,
+            'report': 'report.html'}
+SIMULATION_KEYS = ('noise', 'momentum', 'value', 'seed', 'day_tick', 'price_sensitivity', 'start_market_depth',
+                   'workers', 'chunks', 'order_book', 'churn')
+# ticks overrides days, output keys are paths (feed is a port) and stay off when null
+RUN_KEYS = ('days', 'ticks', 'report', 'plot', 'recorder', 'analytics', 'accounting', 'profile', 'checkpoint', 'checkpoint_every',
+            'resume', 'feed')
+OUTPUT_KEYS = ('report', 'plot')
 
-def draw_day_price(tick_price_history: list):
+def load_scenario(path: str = None, **overrides) -> dict:
+    scenario = dict(SCENARIO)
+    if path is not None:
+        with open(path) as file:
+            scenario.update(json.load(file))
+    scenario.update({key: value for key, value in overrides.items() if value is not None})
+    unknown = sorted(set(scenario) - set(SIMULATION_KEYS) - set(RUN_KEYS))
+    if unknown:
+        raise ValueError('unknown scenario keys %s' % unknown)
+    return scenario
+
+def get_ticks(scenario: dict) -> int:
+    if scenario.get('ticks') is not None:
+        return int(scenario['ticks'])
+    return int(round(float(scenario['days']) * int(scenario['day_tick'])))
+
+def build_simulation(scenario: dict) -> tuple:
+    # listeners are imported only when the scenario asks for them; returns the simulation and the kline
+    # report, if any. with resume the newest checkpoint in the checkpoint directory, if there is one,
+    # rebuilds the simulation from its own configuration and only the listeners come from the scenario
+    options = {key: scenario[key] for key in SIMULATION_KEYS if key in scenario}
+    day_tick = int(scenario['day_tick'])
+    if scenario.get('recorder'):
+        from recorder import TickRecorder
+        options['recorder'] = TickRecorder(scenario['recorder'], day_tick)
+    if scenario.get('analytics'):
+        from analytics import StylizedFacts
+        options['analytics'] = StylizedFacts(path=scenario['analytics'])
+    if scenario.get('accounting'):
+        from accounting import Accounting
+        options['accounting'] = Accounting(path=scenario['accounting'])
+    if scenario.get('profile'):
+        from profiling import Profiler
+        options['profiler'] = Profiler(scenario['profile'], verbose=False)
+    if scenario.get('checkpoint'):
+        from checkpoint import Checkpointer
+        options['checkpointer'] = Checkpointer(scenario['checkpoint'], int(scenario.get('checkpoint_every') or day_tick))
+    if scenario.get('feed') is not None:
+        from feed import LiveFeed
+        options['feed'] = LiveFeed(port=int(scenario['feed']))
+    path = None
+    if scenario.get('resume'):
+        from checkpoint import latest
+        path = latest(scenario['checkpoint'])
+    if path is None:
+        simulation = Simulation(**options)
+    else:
+        from checkpoint import restore
+        simulation = restore(path, **{key: value for key, value in options.items() if key not in SIMULATION_KEYS or key == 'workers'})
+    report = None
+    if scenario.get('report'):
+        from charting import KlineReport
+        report = KlineReport(day_tick)
+        simulation.get_node().subscribe(report)
+    return simulation, report
+
+def draw_day_price(tick_price_history: list, path: str = None):
+    import matplotlib
+    if path is not None:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
     tick_price_history = tick_price_history[100:150]
     time_seconds = list(range(len(tick_price_history)))
     plt.figure(figsize=(12, 6))
-    plt.plot(time_seconds, tick_price_history, 
+    plt.plot(time_seconds, tick_price_history,
          color='steelblue',  # 线条颜色
          linewidth=1.5,      # 线宽
          label='Node Price')    # 图例名称
@@ -22,141 +92,68 @@ def draw_day_price(tick_price_history: list):
     plt.grid(True, linestyle='--', alpha=0.6)
     plt.legend()
     plt.tight_layout()
-    plt.show()
-    
-def draw_day_advance_kline(tick_price_history: list, name: str):
-    trading_hours = [
-        (pd.Timestamp("09:30:00"), pd.Timestamp("11:29:59")),
-        (pd.Timestamp("13:00:00"), pd.Timestamp("14:59:58"))
-    ]
-    timestamps = pd.DatetimeIndex([])
-    for start, end in trading_hours:
-        timestamps = timestamps.union(pd.date_range(start, end, freq="s"))
-    df = pd.DataFrame({
-        'timestamp': timestamps,
-        'price': tick_price_history[0:14399]
-    })
-    kline_df = df.resample('2min', on='timestamp', origin='start').agg({
-        'price': ['first', 'last', 'max', 'min']
-    })
-    kline_df.columns = ['open', 'close', 'high', 'low']
-    kline_df = kline_df.between_time("09:30", "15:00").dropna()
-    # 创建交互式K线图
-    fig = go.Figure(data=[go.Candlestick(
-        x=kline_df.index,  # 时间轴
-        open=kline_df['open'],
-        high=kline_df['high'],
-        low=kline_df['low'],
-        close=kline_df['close'],
-        increasing_line_color='red',  # 上涨颜色
-        decreasing_line_color='green' # 下跌颜色
-    )])
-    # 设置专业图表参数
-    fig.update_layout(
-        title='可交互式K线图（5秒周期）',
-        xaxis_title='时间',
-        yaxis_title='价格',
-        xaxis_rangeslider_visible=False,  # 底部滑动条（可设置为True）
-        dragmode='pan',  # 拖动模式：'pan'平移 / 'zoom'缩放
-        hovermode='x unified',  # 显示十字光标
-        template='plotly_white'  # 主题：白色背景
-    )
-    # 添加控制按钮
-    fig.update_layout(
-        updatemenus=[
-            dict(
-                type="buttons",
-                direction="left",
-                buttons=[
-                    dict(label="线性坐标", method="relayout", args=[{"yaxis.type": "linear"}]),
-                    dict(label="对数坐标", method="relayout", args=[{"yaxis.type": "log"}]),
-                    dict(label="重置缩放", method="relayout", args=[{"xaxis.autorange": True, "yaxis.autorange": True}])
-                ],
-                pad={"r": 10, "t": 10},
-                showactive=True,
-                x=0.1,
-                xanchor="left",
-                y=1.1,
-                yanchor="top"
-            )
-        ]
-    )
-    # 显示图表（自动打开浏览器）
-    # fig.show()
-    fig.write_html('day' + name + '.html')
+    if path is None:
+        plt.show()
+    else:
+        plt.savefig(path)
 
-def draw_month_advance_kline(day_price_history: list, name: str):
-    start_date = datetime(2025, 1, 1)
-    dates = [start_date + timedelta(days=i) for i in range(len(day_price_history['high']))]
-    df = pd.DataFrame(day_price_history, index=dates)
-    df = df.dropna()
-    candlestick = go.Candlestick(
-        x=df.index,
-        open=df['open'],
-        high=df['high'],
-        low=df['low'],
-        close=df['close'],
-        increasing_line_color='red',  # 阳线颜色
-        decreasing_line_color='green',# 阴线颜色
-        name='日K线'
-    )
-    layout = go.Layout(
-        title='多日K线走势分析',
-        xaxis=dict(
-            type='date',
-            tickformat='%Y-%m-%d',  # 显示完整日期
-            rangeslider=dict(visible=False)  # 隐藏底部滑动条
-        ),
-        yaxis=dict(title='价格'),
-        hovermode='x unified',  # 显示十字准星
-        template='plotly_white',  # 白色主题
-        height=600
-    )
-    fig = go.Figure(data=[candlestick], layout=layout)
-    fig.update_layout(
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(label="日线",
-                        method="update",
-                        args=[{"visible": [True, False]}]),
-                    dict(label="周线",
-                        method="restyle",
-                        args=[{"x": [df.resample('W').agg({'open':'first','high':'max','low':'min','close':'last'}).index]}])
-                ]
-            )
-        ]
-    )
-    # 显示图表（自动打开浏览器）
-    # fig.show()
-    fig.write_html('month' + name + '.html')
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Run a market scenario')
+    parser.add_argument('config', nargs='?', default=None, help='JSON scenario, keys as in main.SCENARIO')
+    parser.add_argument('--days', type=float, default=None)
+    parser.add_argument('--ticks', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--noise', type=int, default=None)
+    parser.add_argument('--momentum', type=int, default=None)
+    parser.add_argument('--value', type=int, default=None)
+    parser.add_argument('--report', default=None, help='kline report html path')
+    parser.add_argument('--plot', default=None, help='matplotlib figure path')
+    parser.add_argument('--recorder', default=None, help='tick recorder directory')
+    parser.add_argument('--analytics', default=None, help='daily stylized facts JSONL path')
+    parser.add_argument('--accounting', default=None, help='daily wealth and PnL distribution JSONL path')
+    parser.add_argument('--checkpoint', default=None, help='checkpoint directory')
+    parser.add_argument('--resume', action='store_true', default=None, help='continue from the newest checkpoint in --checkpoint')
+    parser.add_argument('--feed', type=int, default=None, help='serve the live feed on this port')
+    parser.add_argument('--headless', action='store_true', help='no report or plot, plotting libraries are never imported')
+    parser.add_argument('--timing', action='store_true', help='print cold start to first tick')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+    overrides = {key: getattr(args, key) for key in ('days', 'ticks', 'seed', 'noise', 'momentum', 'value', 'report', 'plot',
+                                                     'recorder', 'analytics', 'accounting', 'checkpoint', 'resume', 'feed')}
+    try:
+        scenario = load_scenario(args.config, **overrides)
+    except ValueError as error:
+        parser.error(str(error))
+    if scenario.get('resume') and not scenario.get('checkpoint'):
+        parser.error('resume needs a checkpoint directory')
+    # an explicit day count wins over a ticks entry in the scenario file
+    if args.days is not None and args.ticks is None:
+        scenario['ticks'] = None
+    if args.headless:
+        for key in OUTPUT_KEYS:
+            scenario[key] = None
+    ticks = get_ticks(scenario)
+    imported = time.perf_counter()
+    simulation, report = build_simulation(scenario)
+    built = time.perf_counter()
+    # a resumed run only does the ticks its checkpoint has not
+    if simulation.get_tick() < ticks:
+        simulation.step()
+    first_tick = time.perf_counter()
+    if args.timing:
+        # from the first line of main.py, interpreter start-up itself is not included
+        print("cold start to first tick %.3fs: imports %.3fs, build %.3fs, first tick %.3fs" % (
+            first_tick - STARTED, imported - STARTED, built - imported, first_tick - built), file=sys.stderr)
+    simulation.run(ticks - simulation.get_tick())
+    node = simulation.get_node()
+    if report is not None:
+        report.write(scenario['report'], node.get_day_price_history())
+    if scenario.get('plot'):
+        draw_day_price(node.get_tick_price_history(), scenario['plot'])
+    simulation.close()
+    if not args.quiet:
+        print("%d ticks, price %.4f, %.2fs" % (simulation.get_tick(), node.get_current_price(), time.perf_counter() - first_tick))
+    return 0
 
 if __name__ == "__main__":
-    node = Node()
-    noise_trader = NoiseTrader(500)
-    momentum_trader = MomentumTrader(200)
-    value_investor = ValueInvestors(300)
-    for tick in range(1, DAY_TICK * 30 + 1):
-        if tick % (DAY_TICK * 30) == 0:
-            day_price_history = node.get_day_price_history()
-            draw_month_advance_kline(day_price_history, str(tick // (DAY_TICK * 30)))
-        if tick % DAY_TICK == 0:
-            tick_price_history = node.get_tick_price_history()
-            draw_day_advance_kline(tick_price_history, str(tick // DAY_TICK))
-            node.day_update()
-        current_price = node.get_current_price()
-        buy_amount, sell_amount = noise_trader.tick_decision(current_price)
-        node.clinch(buy_amount)
-        node.clinch(sell_amount)
-        # print("tick: " + str(tick) + " rbuy: " + str(buy_amount) + " rsell: " + str(sell_amount))
-        buy_amount, sell_amount = momentum_trader.tick_decision(current_price)
-        node.clinch(buy_amount)
-        node.clinch(sell_amount)
-        # print(" mbuy: " + str(buy_amount) + " msell: " + str(sell_amount))
-        buy_amount, sell_amount = value_investor.tick_decision(current_price, node.get_basic_value())
-        node.clinch(buy_amount)
-        node.clinch(sell_amount)
-        # print(" vbuy: " + str(buy_amount) + " vsell: " + str(sell_amount))
-        node.tick_update(tick)
-    
\ No newline at end of file
+    sys.exit(main())
@@ -1,51 +1,122 @@
 import numpy as np
+from rolling import RollingWindow
+from streams import RandomStream
 
 PRICE_SENSITIVITY = 0.001
 DAY_LIMIT = 0.07
 START_MARKET_DEPTH = 1000
+DAY_TICK = 14400
+CLOSE_TICKS = 300
 
 class Node:
-    def __init__(self) -> None:
+    def __init__(self, window: int = 1080, seed=None, day_tick: int = DAY_TICK,
+                 price_sensitivity: float = PRICE_SENSITIVITY, start_market_depth: float = START_MARKET_DEPTH,
+                 book=None) -> None:
+        # with a book, every trader's order goes to it through fill and the price is read back from the book
+        self.__book = book
+        self.__filled = np.zeros(0, dtype=np.float64)
+        self.__paid = np.zeros(0, dtype=np.float64)
+        self.__price_sensitivity = price_sensitivity
+        self.__start_market_depth = start_market_depth
+        self.__rng = RandomStream(seed)
+        generator = self.__rng.get_generator()
         self.__buy_per_tick = 0
         self.__sell_per_tick = 0
         self.__current_price = 35.0
-        self.__day_price_history = {
-            'high': [self.__current_price + np.random.uniform(1.5, 2.0)],
-            'low': [self.__current_price - np.random.uniform(1.5, 2.0)],
-            'open': [self.__current_price + np.random.uniform(-1.2, 1.2)],
-            'close': [self.__current_price],
-        }
+        # day bars are columns that double in capacity, the tick history is one preallocated day
+        self.__day_price_history = {name: np.zeros(64, dtype=np.float64) for name in ('high', 'low', 'open', 'close')}
+        self.__days = 0
+        self.__append_day(self.__current_price + generator.uniform(1.5, 2.0),
+                          self.__current_price - generator.uniform(1.5, 2.0),
+                          self.__current_price + generator.uniform(-1.2, 1.2),
+                          self.__current_price)
         self.__basic_value = 45.0
-        self.__depth = START_MARKET_DEPTH
-        self.__tick_price_history = []
+        self.__depth = self.__start_market_depth
+        self.__tick_price_history = np.zeros(day_tick + 1, dtype=np.float64)
+        self.__ticks = 0
+        self.__high = -np.inf
+        self.__low = np.inf
+        self.__window = RollingWindow(window)
+        self.__order_volume = {}
+        self.__listeners = []
 
-    def __get_day(self) -> int:
-        return len(self.__day_price_history['high'])
+    def get_day(self) -> int:
+        return self.__days
+
+    def subscribe(self, listener) -> None:
+        # listener.on_tick(node) runs before each tick_update, listener.on_day(node) after each day_update
+        self.__listeners.append(listener)
+
+    def __append_day(self, high: float, low: float, opening: float, close: float) -> None:
+        if self.__days == self.__day_price_history['high'].size:
+            for name, column in self.__day_price_history.items():
+                self.__day_price_history[name] = np.concatenate((column, np.zeros_like(column)))
+        for name, value in (('high', high), ('low', low), ('open', opening), ('close', close)):
+            self.__day_price_history[name][self.__days] = value
+        self.__days += 1
     
     def __night_trade(self) -> None:
         # delta_value = np.random.uniform(-0.02, 0.02)
         # self.__basic_value *= (1 + delta_value)
         self.__depth *= 0.6
-        gap = np.random.normal(0, 0.02) + np.random.laplace(0, 0.005)
+        generator = self.__rng.get_generator()
+        gap = generator.normal(0, 0.02) + generator.laplace(0, 0.005)
         self.__current_price *= (1 + gap)
 
-    def get_tick_price_history(self) -> list:
-        return self.__tick_price_history.copy()
+    def get_tick_price_history(self) -> np.ndarray:
+        # read-only view of today's ticks, overwritten by the next day
+        history = self.__tick_price_history[:self.__ticks]
+        history.flags.writeable = False
+        return history
     
-    def get_day_price_history(self) -> list:
-        return self.__day_price_history.copy()
+    def get_day_price_history(self) -> dict:
+        day_price_history = {}
+        for name, column in self.__day_price_history.items():
+            day_price_history[name] = column[:self.__days]
+            day_price_history[name].flags.writeable = False
+        return day_price_history
         
-    def get_1080ticks_history(self) -> float:
-        if len(self.__tick_price_history) < 600:
-            return self.__tick_price_history.copy()
-        else:
-            return self.__tick_price_history[-1080:]
+    def get_1080ticks_history(self) -> np.ndarray:
+        return self.__window.values()
+
+    def clinch(self, position_change: int, source: str = None) -> tuple:
+        # one combined market order when there is a book, returns what it traded as (filled, cost)
+        traded = (0, 0.0)
+        if self.__book is not None and position_change != 0:
+            traded = self.__book.market(0 if position_change > 0 else 1, abs(int(position_change)))
+        self.__count(position_change, source)
+        return traded
+
+    def fill(self, orders: np.ndarray, source: str = None, budgets: np.ndarray = None) -> tuple:
+        # each order is its own market order, sent in array order, a buy spending at most its budget when
+        # budgets are given; returns the signed filled quantity and cash paid per order as views that the
+        # next fill overwrites, and counts the filled flow like clinch
+        size = orders.size
+        if size > self.__filled.size:
+            self.__filled = np.zeros(2 * size, dtype=np.float64)
+            self.__paid = np.zeros(2 * size, dtype=np.float64)
+        filled, paid = self.__filled[:size], self.__paid[:size]
+        self.__book.submit(orders, None, None, filled, paid, budgets)
+        self.__count(int(filled[filled > 0].sum()), source)
+        self.__count(int(filled[filled < 0].sum()), source)
+        return filled, paid
 
-    def clinch(self, position_change: int) -> None:
+    def __count(self, position_change: int, source: str) -> None:
         if position_change > 0:
             self.__buy_per_tick += int(position_change)
         else:
             self.__sell_per_tick += int(-position_change)
+        if source is not None:
+            self.__order_volume[source] = self.__order_volume.get(source, 0) + abs(int(position_change))
+
+    def get_buy_per_tick(self) -> int:
+        return self.__buy_per_tick
+
+    def get_sell_per_tick(self) -> int:
+        return self.__sell_per_tick
+
+    def get_order_volume(self) -> dict:
+        return self.__order_volume
 
     def get_current_price(self) -> float:
         return self.__current_price
@@ -55,39 +126,209 @@ class Node:
     
     def get_market_depth(self) -> int:
         return self.__depth
+
+    def get_book(self):
+        return self.__book
+
+    def get_snapshot(self) -> dict:
+        # everything a tick reads, listeners and the order book are not part of it
+        if self.__book is not None:
+            raise ValueError('a node trading through an order book cannot be checkpointed')
+        return {'buy_per_tick': self.__buy_per_tick, 'sell_per_tick': self.__sell_per_tick,
+                'current_price': self.__current_price, 'basic_value': self.__basic_value, 'depth': self.__depth,
+                'day_price_history': {name: column[:self.__days].copy() for name, column in self.__day_price_history.items()},
+                'tick_price_history': self.__tick_price_history[:self.__ticks].copy(), 'tick_capacity': self.__tick_price_history.size,
+                'high': self.__high, 'low': self.__low, 'order_volume': dict(self.__order_volume),
+                'window': self.__window.get_snapshot(), 'rng': self.__rng.get_snapshot()}
+
+    def set_snapshot(self, snapshot: dict) -> None:
+        self.__buy_per_tick = int(snapshot['buy_per_tick'])
+        self.__sell_per_tick = int(snapshot['sell_per_tick'])
+        self.__current_price = float(snapshot['current_price'])
+        self.__basic_value = float(snapshot['basic_value'])
+        self.__depth = float(snapshot['depth'])
+        self.__days = 0
+        self.__day_price_history = {name: np.zeros(64, dtype=np.float64) for name in self.__day_price_history}
+        history = snapshot['day_price_history']
+        for high, low, opening, close in zip(history['high'], history['low'], history['open'], history['close']):
+            self.__append_day(float(high), float(low), float(opening), float(close))
+        self.__tick_price_history = np.zeros(int(snapshot['tick_capacity']), dtype=np.float64)
+        self.__ticks = snapshot['tick_price_history'].size
+        self.__tick_price_history[:self.__ticks] = snapshot['tick_price_history']
+        self.__high = float(snapshot['high'])
+        self.__low = float(snapshot['low'])
+        self.__order_volume = dict(snapshot['order_volume'])
+        self.__window.set_snapshot(snapshot['window'])
+        self.__rng.set_snapshot(snapshot['rng'])
     
     def __update_depth(self) -> None:
-        self.__depth = 0.8 * self.__depth + 0.2 * (START_MARKET_DEPTH + 0.2 * (self.__buy_per_tick + self.__sell_per_tick))
+        self.__depth = 0.8 * self.__depth + 0.2 * (self.__start_market_depth + 0.2 * (self.__buy_per_tick + self.__sell_per_tick))
 
     def __update_price(self) -> None:
         net_flow = self.__buy_per_tick - self.__sell_per_tick
         adjust_net = ((np.sign(net_flow) * np.sqrt(abs(net_flow))) / (1 + 0.05 * np.sqrt(abs(net_flow))))
         lambda_t = 1.0 / np.sqrt(self.__depth)
-        delta = lambda_t * adjust_net * PRICE_SENSITIVITY
-        if delta > 0.001:
-            print(str(self.__buy_per_tick) + " " + str(self.__sell_per_tick) + " " + str(self.__depth))
+        delta = lambda_t * adjust_net * self.__price_sensitivity
         self.__current_price *= 1 + delta
-        self.__current_price += np.random.normal(0, 0.0001)
+        self.__current_price += self.__rng.standard_normal() * 0.0001
         self.__current_price = round(float(self.__current_price), 4)
         # if (self.__current_price - self.__tick_price_history[0]) / self.__tick_price_history[0] >= DAY_LIMIT:
         #     self.__current_price = self.__tick_price_history[0] * (1 + DAY_LIMIT)
 
+    def __record_tick(self, price: float) -> None:
+        if self.__ticks == self.__tick_price_history.size:
+            self.__tick_price_history = np.concatenate((self.__tick_price_history, np.zeros_like(self.__tick_price_history)))
+        self.__tick_price_history[self.__ticks] = price
+        self.__ticks += 1
+        if price > self.__high:
+            self.__high = price
+        if price < self.__low:
+            self.__low = price
+
     def tick_update(self, tick=0) -> None:
-        self.__tick_price_history.append(self.__current_price)
-        self.__update_depth()
-        self.__update_price()
+        for listener in self.__listeners:
+            listener.on_tick(self)
+        self.__record_tick(self.__current_price)
+        self.__window.append(self.__current_price)
+        if self.__book is None:
+            self.__update_depth()
+            self.__update_price()
+        else:
+            self.__depth = self.__book.get_depth()
+            self.__current_price = round(float(self.__book.get_reference_price()), 4)
         # print("tick " + str(tick) + ": " + "buy:" + str(self.__buy_per_tick) + " sell:" + str(self.__sell_per_tick) + " depth:" + str(self.__depth))
         self.__buy_per_tick = 0
         self.__sell_per_tick = 0
+        if self.__order_volume:
+            self.__order_volume.clear()
     
     def day_update(self) -> None:
-        self.__day_price_history['high'].append(max(self.__tick_price_history))
-        self.__day_price_history['low'].append(min(self.__tick_price_history))
-        self.__day_price_history['open'].append(self.__tick_price_history[0])
-        self.__day_price_history['close'].append(sum(self.__tick_price_history[-300:]) / 300)
+        close_ticks = min(self.__ticks, CLOSE_TICKS)
+        close = float(np.sum(self.__tick_price_history[self.__ticks - close_ticks:self.__ticks])) / close_ticks
+        self.__append_day(self.__high, self.__low, float(self.__tick_price_history[0]), close)
         # self.__night_trade()
-        self.__tick_price_history = [self.__current_price]
+        self.__ticks = 0
+        self.__high = -np.inf
+        self.__low = np.inf
+        self.__record_tick(self.__current_price)
+        for listener in self.__listeners:
+            listener.on_day(self)
+
+class ReplicaNode:
+    def __init__(self, replicas: int, window: int = 1080, seed=None, day_tick: int = DAY_TICK,
+                 price_sensitivity: float = PRICE_SENSITIVITY, start_market_depth: float = START_MARKET_DEPTH,
+                 start_price=35.0, basic_value=45.0) -> None:
+        # K independent copies of Node's single stock, stepped together as length-K arrays;
+        # the constants may be scalars or one value per column
+        self.__replicas = int(replicas)
+        self.__price_sensitivity = np.broadcast_to(np.asarray(price_sensitivity, dtype=np.float64), (self.__replicas,)).copy()
+        self.__start_market_depth = np.broadcast_to(np.asarray(start_market_depth, dtype=np.float64), (self.__replicas,)).copy()
+        self.__rng = RandomStream(seed)
+        generator = self.__rng.get_generator()
+        self.__buy_per_tick = np.zeros(self.__replicas, dtype=np.float64)
+        self.__sell_per_tick = np.zeros(self.__replicas, dtype=np.float64)
+        self.__current_price = np.broadcast_to(np.asarray(start_price, dtype=np.float64), (self.__replicas,)).copy()
+        self.__basic_value = np.broadcast_to(np.asarray(basic_value, dtype=np.float64), (self.__replicas,)).copy()
+        self.__depth = self.__start_market_depth.copy()
+        self.__noise = np.zeros(self.__replicas, dtype=np.float64)
+        self.__day_price_history = {name: np.zeros((64, self.__replicas), dtype=np.float64) for name in ('high', 'low', 'open', 'close')}
+        self.__days = 0
+        self.__append_day(self.__current_price + generator.uniform(1.5, 2.0, self.__replicas),
+                          self.__current_price - generator.uniform(1.5, 2.0, self.__replicas),
+                          self.__current_price + generator.uniform(-1.2, 1.2, self.__replicas),
+                          self.__current_price)
+        self.__tick_price_history = np.zeros((day_tick + 1, self.__replicas), dtype=np.float64)
+        self.__ticks = 0
+        self.__high = np.full(self.__replicas, -np.inf)
+        self.__low = np.full(self.__replicas, np.inf)
+        self.__window = RollingWindow(window, width=self.__replicas)
+
+    def get_replicas(self) -> int:
+        return self.__replicas
+
+    def __append_day(self, high: np.ndarray, low: np.ndarray, opening: np.ndarray, close: np.ndarray) -> None:
+        if self.__days == self.__day_price_history['high'].shape[0]:
+            for name, column in self.__day_price_history.items():
+                self.__day_price_history[name] = np.concatenate((column, np.zeros_like(column)))
+        for name, value in (('high', high), ('low', low), ('open', opening), ('close', close)):
+            self.__day_price_history[name][self.__days] = value
+        self.__days += 1
+
+    def get_tick_price_history(self) -> np.ndarray:
+        # read-only (ticks, replicas) view of today's ticks, overwritten by the next day
+        history = self.__tick_price_history[:self.__ticks]
+        history.flags.writeable = False
+        return history
+
+    def get_day_price_history(self) -> dict:
+        day_price_history = {}
+        for name, column in self.__day_price_history.items():
+            day_price_history[name] = column[:self.__days]
+            day_price_history[name].flags.writeable = False
+        return day_price_history
+
+    def get_1080ticks_history(self) -> np.ndarray:
+        return self.__window.values()
+
+    def clinch(self, position_change: np.ndarray) -> None:
+        position_change = np.asarray(position_change, dtype=np.float64)
+        self.__buy_per_tick += np.maximum(position_change, 0.0)
+        self.__sell_per_tick -= np.minimum(position_change, 0.0)
+
+    def get_current_price(self) -> np.ndarray:
+        return self.__current_price.copy()
+
+    def get_basic_value(self) -> np.ndarray:
+        return self.__basic_value.copy()
+
+    def get_market_depth(self) -> np.ndarray:
+        return self.__depth.copy()
+
+    def __update_depth(self) -> None:
+        self.__depth *= 0.8
+        self.__depth += 0.2 * (self.__start_market_depth + 0.2 * (self.__buy_per_tick + self.__sell_per_tick))
+
+    def __update_price(self) -> None:
+        net_flow = self.__buy_per_tick - self.__sell_per_tick
+        root = np.sqrt(np.abs(net_flow))
+        adjust_net = np.sign(net_flow) * root / (1 + 0.05 * root)
+        delta = adjust_net / np.sqrt(self.__depth) * self.__price_sensitivity
+        self.__current_price *= 1 + delta
+        self.__rng.standard_normal(out=self.__noise)
+        self.__current_price += self.__noise * 0.0001
+        np.round(self.__current_price, 4, out=self.__current_price)
+
+    def __record_tick(self, price: np.ndarray) -> None:
+        if self.__ticks == self.__tick_price_history.shape[0]:
+            self.__tick_price_history = np.concatenate((self.__tick_price_history, np.zeros_like(self.__tick_price_history)))
+        self.__tick_price_history[self.__ticks] = price
+        self.__ticks += 1
+        np.maximum(self.__high, price, out=self.__high)
+        np.minimum(self.__low, price, out=self.__low)
+
+    def tick_update(self, tick=0) -> None:
+        self.__record_tick(self.__current_price)
+        self.__window.append(self.__current_price)
+        self.__update_depth()
+        self.__update_price()
+        self.__buy_per_tick.fill(0.0)
+        self.__sell_per_tick.fill(0.0)
+
+    def day_update(self) -> None:
+        close_ticks = min(self.__ticks, CLOSE_TICKS)
+        close = self.__tick_price_history[self.__ticks - close_ticks:self.__ticks].sum(axis=0) / close_ticks
+        self.__append_day(self.__high, self.__low, self.__tick_price_history[0], close)
+        self.__ticks = 0
+        self.__high.fill(-np.inf)
+        self.__low.fill(np.inf)
+        self.__record_tick(self.__current_price)
+
+class Market(ReplicaNode):
+    def __init__(self, assets: int, start_price=35.0, basic_value=45.0, window: int = 1080, seed=None,
+                 day_tick: int = DAY_TICK, price_sensitivity=PRICE_SENSITIVITY, start_market_depth=START_MARKET_DEPTH) -> None:
+        # M assets priced by one tick_update: price, depth, basic value and flow are length-M arrays,
+        # and clinch takes the per-asset net order flow of a population
+        super().__init__(assets, window, seed, day_tick, price_sensitivity, start_market_depth, start_price, basic_value)
 
-class Market:
-    def __init__(self):
-        pass
+    def get_assets(self) -> int:
+        return self.get_replicas()
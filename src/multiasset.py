@@ -0,0 +1,361 @@
+import numpy as np
+from kernel import Scratch, liquidate, per_trader, reschedule, settle
+from market import Market, DAY_TICK, PRICE_SENSITIVITY, START_MARKET_DEPTH
+from rolling import RollingWindow
+from scheduler import WakeCalendar
+from storage import TraderState
+from streams import RandomStream, spawn_seeds
+
+class PortfolioNoiseTrader():
+    def __init__(self, n: int, assets: int,
+                 min_start_cash = 10000.0, max_start_cash = 30000.0,
+                 min_start_positions = 100, max_start_positions = 300,
+                 average_trade_amount = 15, average_wait_time = 1.0, backruptcy_cash = 1000.0,
+                 seed = None, dtypes = None):
+        # NoiseTrader over M assets: one cash account and an agents x assets position matrix, every waking
+        # trader buys an asset picked uniformly or sells one picked uniformly among those it holds
+        self.__n = int(n)
+        self.__assets = int(assets)
+        self.__average_trade_amount = np.int32(average_trade_amount)
+        self.__average_wait_time = np.float64(average_wait_time)
+        self.__bankruptcy_cash = np.float64(backruptcy_cash)
+        self.__state = TraderState(('cash',), self.__n, 1, dtypes)
+        self.__holdings = TraderState(('positions',), self.__assets, self.__n, dtypes)
+        self.__scratch = Scratch(self.__n, floats=9, masks=4, indices=5)
+        # agents x assets temporaries for the choice among held assets
+        self.__held = np.zeros((max(self.__n, 1), self.__assets), dtype=self.__holdings.get_dtype('positions'))
+        self.__owned = np.zeros((max(self.__n, 1), self.__assets), dtype=np.bool_)
+        self.__rank = np.zeros((max(self.__n, 1), self.__assets), dtype=np.intp)
+        self.__rng = RandomStream(seed)
+        generator = self.__rng.get_generator()
+        self.__state.get_column('cash')[:] = generator.uniform(min_start_cash, max_start_cash, self.__n)
+        self.__holdings.get_matrix('positions')[:] = generator.integers(min_start_positions, max_start_positions, (self.__n, self.__assets))
+        self.__calendar = WakeCalendar()
+        self.__calendar.schedule(np.arange(self.__n), generator.exponential(self.__average_wait_time, self.__n).astype(np.int32))
+
+    def get_state(self) -> TraderState:
+        return self.__state
+
+    def get_positions(self) -> np.ndarray:
+        return self.__holdings.get_matrix('positions')
+
+    def tick_decision(self, current_price) -> tuple:
+        active_traders = self.__calendar.pop()
+        k = active_traders.size
+        orders, amount, decision, trade, cost, price, cash, positions, pick = self.__scratch.get_floats(k)
+        bankrupt, mask, side, selling = self.__scratch.get_masks(k)
+        wake, asset, slot, choice, held_asset = self.__scratch.get_indices(k)
+        held_rows, owned, rank = self.__held[:k], self.__owned[:k], self.__rank[:k]
+        self.__rng.random(out=pick)
+        self.__rng.random(out=decision)
+        self.__rng.standard_exponential(out=trade)
+        self.__state.gather('cash', active_traders, cash)
+        # deal with the asset choice: the pick-th of the held assets for sells and forced sales, the pick-th
+        # of all assets otherwise
+        np.take(self.__holdings.get_matrix('positions'), active_traders, axis=0, out=held_rows, mode='clip')
+        np.greater(held_rows, 0, out=owned)
+        np.cumsum(owned, axis=1, out=rank)
+        np.multiply(pick, rank[:, -1], out=amount)
+        np.copyto(choice, amount, casting='unsafe')
+        np.greater(rank, choice.reshape(-1, 1), out=owned)
+        np.argmax(owned, axis=1, out=held_asset)
+        np.multiply(pick, self.__assets, out=pick)
+        np.copyto(asset, pick, casting='unsafe')
+        np.greater_equal(decision, 0.4, out=selling)
+        np.less(decision, 0.8, out=mask)
+        np.logical_and(selling, mask, out=selling)
+        np.less_equal(cash, self.__bankruptcy_cash, out=mask)
+        np.logical_or(selling, mask, out=selling)
+        np.greater(rank[:, -1], 0, out=mask)
+        np.logical_and(selling, mask, out=selling)
+        np.copyto(asset, held_asset, where=selling)
+        np.multiply(active_traders, self.__assets, out=slot)
+        np.add(slot, asset, out=slot)
+        current_price = per_trader(current_price, asset, price)
+        self.__holdings.gather('positions', slot, positions)
+        # trade
+        np.multiply(trade, self.__average_trade_amount, out=trade)
+        np.trunc(trade, out=trade)
+        np.copyto(orders, trade)
+        np.greater_equal(decision, 0.8, out=mask)
+        np.copyto(orders, 0.0, where=mask)
+        np.greater_equal(decision, 0.4, out=mask)
+        np.negative(orders, out=orders, where=mask)
+        liquidate(cash, orders, current_price, self.__bankruptcy_cash, bankrupt, amount, trade)
+        buy_amount, sell_amount = settle(cash, positions, orders, current_price, cost, mask, side, asset, self.__assets)
+        self.__state.scatter('cash', active_traders, cash)
+        self.__holdings.scatter('positions', slot, positions)
+        # deal with cooldown
+        self.__rng.standard_exponential(out=cost)
+        np.multiply(cost, self.__average_wait_time, out=cost)
+        np.copyto(wake, cost, casting='unsafe')
+        reschedule(self.__calendar, None, active_traders, wake, cash, positions)
+        return buy_amount, sell_amount
+
+class PortfolioMomentumTrader():
+    def __init__(self, n: int, assets: int,
+                 min_start_cash = 10000.0, max_start_cash = 30000.0,
+                 min_start_positions = 100, max_start_positions = 300,
+                 min_buy_proportion = 0.1, max_buy_proportion = 0.2,
+                 min_sell_proportion = 0.2, max_sell_proportion = 0.3,
+                 backruptcy_cash = 1000.0, window = 1080, seed = None, dtypes = None):
+        # MomentumTrader over M assets: every trader follows one asset, drawn uniformly at the start, and runs
+        # the single-asset moving-average rule on it against a price window with one column per asset
+        self.__n = int(n)
+        self.__assets = int(assets)
+        self.__min_buy_proportion = np.float64(min_buy_proportion)
+        self.__max_buy_proportion = np.float64(max_buy_proportion)
+        self.__min_sell_proportion = np.float64(min_sell_proportion)
+        self.__max_sell_proportion = np.float64(max_sell_proportion)
+        self.__bankruptcy_cash = np.float64(backruptcy_cash)
+        self.__state = TraderState(('cash', 'decision_time', 'judge_coef', 'risk_coef', 'asset'), self.__n, 1, dtypes)
+        self.__holdings = TraderState(('positions',), self.__assets, self.__n, dtypes)
+        self.__scratch = Scratch(self.__n, floats=13, masks=4, indices=5)
+        self.__window = RollingWindow(window, width=self.__assets)
+        self.__rng = RandomStream(seed)
+        generator = self.__rng.get_generator()
+        self.__state.get_column('cash')[:] = generator.uniform(min_start_cash, max_start_cash, self.__n)
+        self.__holdings.get_matrix('positions')[:] = generator.integers(min_start_positions, max_start_positions, (self.__n, self.__assets))
+        rand = generator.random(self.__n)
+        decision_time = np.where(rand < 0.5, generator.integers(30, 60, self.__n),
+                                 np.where(rand < 0.8, generator.integers(120, 180, self.__n), generator.integers(240, 360, self.__n)))
+        self.__state.get_column('decision_time')[:] = decision_time
+        self.__state.get_column('judge_coef')[:] = generator.uniform(1.0, 1.5, self.__n)
+        self.__state.get_column('risk_coef')[:] = generator.uniform(1.05, 1.15, self.__n)
+        self.__state.get_column('asset')[:] = generator.integers(0, self.__assets, self.__n)
+        self.__calendar = WakeCalendar()
+        self.__calendar.schedule(np.arange(self.__n), generator.integers(decision_time * 3, decision_time * 4))
+
+    def get_state(self) -> TraderState:
+        return self.__state
+
+    def get_positions(self) -> np.ndarray:
+        return self.__holdings.get_matrix('positions')
+
+    def tick_decision(self, current_price) -> tuple:
+        self.__window.append(current_price)
+        active_traders = self.__calendar.pop()
+        k = active_traders.size
+        orders, t, sum_t, sum_3t, square_sum_t, square_sum_3t, proportion, cost, held, price, end, cash, positions = self.__scratch.get_floats(k)
+        bankrupt, deciders, mask, side = self.__scratch.get_masks(k)
+        decision_time, decision_time_3t, index, asset, slot = self.__scratch.get_indices(k)
+        self.__state.gather('cash', active_traders, cash)
+        self.__state.gather('asset', active_traders, asset)
+        np.multiply(active_traders, self.__assets, out=slot)
+        np.add(slot, asset, out=slot)
+        self.__holdings.gather('positions', slot, positions)
+        current_price = per_trader(current_price, asset, price)
+        orders.fill(0.0)
+        liquidate(cash, orders, current_price, self.__bankruptcy_cash, bankrupt, cost)
+        # MA_t, sigma_market and sigma_t of the followed asset
+        self.__state.gather('decision_time', active_traders, decision_time)
+        np.multiply(decision_time, 3, out=decision_time_3t)
+        np.less_equal(decision_time_3t, len(self.__window), out=deciders)
+        np.logical_not(bankrupt, out=mask)
+        np.logical_and(deciders, mask, out=deciders)
+        np.copyto(t, decision_time)
+        self.__window.sum(decision_time, out=sum_t, index=index, column=asset, end=end)
+        self.__window.sum(decision_time_3t, out=sum_3t, index=index, column=asset, end=end)
+        self.__window.square_sum(decision_time, out=square_sum_t, index=index, column=asset, end=end)
+        self.__window.square_sum(decision_time_3t, out=square_sum_3t, index=index, column=asset, end=end)
+        MA_t = np.divide(sum_t, t, out=held)
+        sigma_market = square_sum_3t
+        np.multiply(sum_3t, sum_3t, out=sum_3t)
+        np.multiply(t, 3.0, out=cost)
+        np.divide(sum_3t, cost, out=sum_3t)
+        np.subtract(square_sum_3t, sum_3t, out=sigma_market)
+        sigma_t = square_sum_t
+        np.multiply(sum_t, sum_t, out=sum_t)
+        np.divide(sum_t, t, out=sum_t)
+        np.subtract(square_sum_t, sum_t, out=sigma_t)
+        signal = sum_t
+        np.subtract(current_price, MA_t, out=signal)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(signal, sigma_t, out=signal)
+        self.__state.gather('judge_coef', active_traders, proportion)
+        judge = np.multiply(proportion, sigma_market, out=sigma_market)
+        # deal with trade: cut the position above risk_coef times the average, else follow the signal
+        self.__state.gather('risk_coef', active_traders, proportion)
+        np.multiply(MA_t, proportion, out=cost)
+        np.less(cost, current_price, out=mask)
+        np.logical_and(mask, deciders, out=mask)
+        np.negative(positions, out=orders, where=mask)
+        np.logical_not(mask, out=mask)
+        np.logical_and(deciders, mask, out=deciders)
+        self.__rng.random(out=proportion)
+        np.greater(signal, judge, out=mask)
+        np.logical_and(mask, deciders, out=mask)
+        np.multiply(proportion, self.__max_buy_proportion - self.__min_buy_proportion, out=t)
+        np.add(t, self.__min_buy_proportion, out=t)
+        np.divide(cash, current_price, out=cost)
+        np.multiply(cost, t, out=cost)
+        np.floor(cost, out=cost)
+        np.copyto(orders, cost, where=mask)
+        np.negative(judge, out=judge)
+        np.less(signal, judge, out=mask)
+        np.logical_and(mask, deciders, out=mask)
+        np.multiply(proportion, self.__max_sell_proportion - self.__min_sell_proportion, out=t)
+        np.add(t, self.__min_sell_proportion, out=t)
+        np.multiply(positions, t, out=cost)
+        np.floor(cost, out=cost)
+        np.negative(cost, out=orders, where=mask)
+        buy_amount, sell_amount = settle(cash, positions, orders, current_price, cost, mask, side, asset, self.__assets)
+        self.__state.scatter('cash', active_traders, cash)
+        self.__holdings.scatter('positions', slot, positions)
+        # deal with cooldown
+        self.__rng.random(out=cost)
+        np.multiply(cost, decision_time, out=cost)
+        np.copyto(index, cost, casting='unsafe')
+        np.add(index, decision_time, out=index)
+        reschedule(self.__calendar, None, active_traders, index, cash, positions)
+        return buy_amount, sell_amount
+
+class PortfolioValueInvestors():
+    def __init__(self, n: int, assets: int,
+                 min_start_cash = 40000.0, max_start_cash = 80000.0,
+                 min_start_positions = 600, max_start_positions = 1000,
+                 min_buy_proportion = 0.1, max_buy_proportion = 0.2,
+                 min_sell_proportion = 0.2, max_sell_proportion = 0.3,
+                 decision_deviation_scale = 0.015,
+                 average_wait_time = 240.0, backruptcy_cash = 2500.0,
+                 seed = None, dtypes = None):
+        # ValueInvestors over M assets: a waking investor values every asset at once and trades the one
+        # furthest from its value, buying below 0.9 and selling a holding above 1.1 of its estimate
+        self.__n = int(n)
+        self.__assets = int(assets)
+        self.__min_buy_proportion = np.float64(min_buy_proportion)
+        self.__max_buy_proportion = np.float64(max_buy_proportion)
+        self.__min_sell_proportion = np.float64(min_sell_proportion)
+        self.__max_sell_proportion = np.float64(max_sell_proportion)
+        self.__decision_deviation_scale = np.float64(decision_deviation_scale)
+        self.__average_wait_time = np.float64(average_wait_time)
+        self.__bankruptcy_cash = np.float64(backruptcy_cash)
+        self.__state = TraderState(('cash', 'judge_coef'), self.__n, 1, dtypes)
+        self.__holdings = TraderState(('positions',), self.__assets, self.__n, dtypes)
+        self.__scratch = Scratch(self.__n, floats=9, masks=5, indices=5)
+        # agents x assets temporaries for the cross-asset valuation
+        self.__ratio = np.zeros((max(self.__n, 1), self.__assets), dtype=np.float64)
+        self.__held = np.zeros((max(self.__n, 1), self.__assets), dtype=self.__holdings.get_dtype('positions'))
+        self.__empty = np.zeros((max(self.__n, 1), self.__assets), dtype=np.bool_)
+        self.__rows = np.arange(max(self.__n, 1), dtype=np.intp) * self.__assets
+        self.__rng = RandomStream(seed)
+        generator = self.__rng.get_generator()
+        self.__state.get_column('cash')[:] = generator.uniform(min_start_cash, max_start_cash, self.__n)
+        self.__holdings.get_matrix('positions')[:] = generator.integers(min_start_positions, max_start_positions, (self.__n, self.__assets))
+        self.__calendar = WakeCalendar()
+        self.__calendar.schedule(np.arange(self.__n), generator.exponential(self.__average_wait_time, self.__n).astype(np.int32))
+        self.__state.get_column('judge_coef')[:] = generator.uniform(-0.05, 0.05, self.__n)
+
+    def get_state(self) -> TraderState:
+        return self.__state
+
+    def get_positions(self) -> np.ndarray:
+        return self.__holdings.get_matrix('positions')
+
+    def tick_decision(self, current_price, basic_value) -> tuple:
+        active_traders = self.__calendar.pop()
+        k = active_traders.size
+        orders, signal, best, proportion, cost, price, cash, positions, held = self.__scratch.get_floats(k)
+        bankrupt, solvent, buy, sell, side = self.__scratch.get_masks(k)
+        wake, asset, sell_asset, largest, slot = self.__scratch.get_indices(k)
+        ratio, held_rows, empty = self.__ratio[:k], self.__held[:k], self.__empty[:k]
+        self.__state.gather('cash', active_traders, cash)
+        np.take(self.__holdings.get_matrix('positions'), active_traders, axis=0, out=held_rows, mode='clip')
+        # price over predicted value for every asset: price / (value * (1 + noise) * (1 + judge_coef))
+        self.__rng.standard_normal(out=ratio.reshape(-1))
+        np.multiply(ratio, self.__decision_deviation_scale, out=ratio)
+        np.add(ratio, 1.0, out=ratio)
+        np.multiply(ratio, basic_value, out=ratio)
+        self.__state.gather('judge_coef', active_traders, signal)
+        np.add(signal, 1.0, out=signal)
+        np.multiply(ratio, signal.reshape(-1, 1), out=ratio)
+        np.divide(current_price, ratio, out=ratio)
+        # cheapest asset to buy, dearest holding to sell, largest holding for bankrupters
+        np.argmin(ratio, axis=1, out=asset)
+        np.add(self.__rows[:k], asset, out=slot)
+        np.take(ratio.reshape(-1), slot, out=best, mode='clip')
+        np.less(best, 0.9, out=buy)
+        np.equal(held_rows, 0, out=empty)
+        np.copyto(ratio, -np.inf, where=empty)
+        np.argmax(ratio, axis=1, out=sell_asset)
+        np.add(self.__rows[:k], sell_asset, out=slot)
+        np.take(ratio.reshape(-1), slot, out=best, mode='clip')
+        np.greater(best, 1.1, out=sell)
+        np.argmax(held_rows, axis=1, out=largest)
+        np.less_equal(cash, self.__bankruptcy_cash, out=bankrupt)
+        np.logical_not(bankrupt, out=solvent)
+        np.logical_and(buy, solvent, out=buy)
+        np.logical_not(buy, out=side)
+        np.logical_and(sell, side, out=sell)
+        np.logical_and(sell, solvent, out=sell)
+        np.copyto(asset, sell_asset, where=sell)
+        np.copyto(asset, largest, where=bankrupt)
+        np.multiply(active_traders, self.__assets, out=slot)
+        np.add(slot, asset, out=slot)
+        current_price = per_trader(current_price, asset, price)
+        self.__holdings.gather('positions', slot, positions)
+        orders.fill(0.0)
+        liquidate(cash, orders, current_price, self.__bankruptcy_cash, bankrupt, cost)
+        # trade
+        self.__rng.random(out=proportion)
+        np.multiply(proportion, self.__max_buy_proportion - self.__min_buy_proportion, out=held)
+        np.add(held, self.__min_buy_proportion, out=held)
+        np.divide(cash, current_price, out=cost)
+        np.multiply(cost, held, out=cost)
+        np.floor(cost, out=cost)
+        np.copyto(orders, cost, where=buy)
+        np.multiply(proportion, self.__max_sell_proportion - self.__min_sell_proportion, out=held)
+        np.add(held, self.__min_sell_proportion, out=held)
+        np.multiply(positions, held, out=cost)
+        np.floor(cost, out=cost)
+        np.negative(cost, out=orders, where=sell)
+        buy_amount, sell_amount = settle(cash, positions, orders, current_price, cost, buy, side, asset, self.__assets)
+        self.__state.scatter('cash', active_traders, cash)
+        self.__holdings.scatter('positions', slot, positions)
+        # deal with cooldown
+        self.__rng.standard_exponential(out=cost)
+        np.multiply(cost, self.__average_wait_time, out=cost)
+        np.copyto(wake, cost, casting='unsafe')
+        reschedule(self.__calendar, None, active_traders, wake, cash, positions)
+        return buy_amount, sell_amount
+
+class MarketSimulation:
+    def __init__(self, noise: int = 500, value: int = 300, assets: int = 4, seed=None,
+                 start_price=35.0, basic_value=45.0, day_tick: int = DAY_TICK,
+                 price_sensitivity=PRICE_SENSITIVITY, start_market_depth=START_MARKET_DEPTH, momentum: int = 200) -> None:
+        # the single-asset mix over M assets, flow clinched in Simulation's noise, momentum, value order;
+        # momentum takes the fourth seed so the other three draw as they did before it existed
+        market_seed, noise_seed, value_seed, momentum_seed = spawn_seeds(seed, 4)
+        self.__day_tick = int(day_tick)
+        self.__tick = 0
+        self.__market = Market(assets, start_price, basic_value, seed=market_seed, day_tick=day_tick,
+                               price_sensitivity=price_sensitivity, start_market_depth=start_market_depth)
+        self.__noise_trader = PortfolioNoiseTrader(noise, assets, seed=noise_seed)
+        self.__momentum_trader = PortfolioMomentumTrader(momentum, assets, seed=momentum_seed)
+        self.__value_investor = PortfolioValueInvestors(value, assets, seed=value_seed)
+
+    def get_market(self) -> Market:
+        return self.__market
+
+    def get_tick(self) -> int:
+        return self.__tick
+
+    def step(self) -> None:
+        self.__tick += 1
+        if self.__tick % self.__day_tick == 0:
+            self.__market.day_update()
+        current_price = self.__market.get_current_price()
+        buy_amount, sell_amount = self.__noise_trader.tick_decision(current_price)
+        self.__market.clinch(buy_amount)
+        self.__market.clinch(sell_amount)
+        buy_amount, sell_amount = self.__momentum_trader.tick_decision(current_price)
+        self.__market.clinch(buy_amount)
+        self.__market.clinch(sell_amount)
+        buy_amount, sell_amount = self.__value_investor.tick_decision(current_price, self.__market.get_basic_value())
+        self.__market.clinch(buy_amount)
+        self.__market.clinch(sell_amount)
+        self.__market.tick_update(self.__tick)
+
+    def run(self, ticks: int) -> None:
+        for _ in range(ticks):
+            self.step()
@@ -0,0 +1,305 @@
+import numpy as np
+
+BUY = 0
+SELL = 1
+EMPTY = -1
+TICK_SIZE = 0.01
+LEVELS = 100000
+# levels the best price walks one at a time before it searches the occupancy flags instead
+WALK = 16
+
+class OrderBook:
+    def __init__(self, tick_size: float = TICK_SIZE, levels: int = LEVELS, start_price: float = 35.0,
+                 capacity: int = 1024) -> None:
+        # price levels are integer ticks on a fixed grid; each level is a FIFO doubly linked list threaded
+        # through slot arrays, freed slots go on a stack and are reused. an order id carries the slot in its
+        # low 32 bits and the slot's serial above them, so ids of filled orders never hit a reused slot
+        self.__tick_size = float(tick_size)
+        self.__levels = int(levels)
+        self.__heads = [[EMPTY] * self.__levels, [EMPTY] * self.__levels]
+        self.__tails = [[EMPTY] * self.__levels, [EMPTY] * self.__levels]
+        self.__volume = [[0] * self.__levels, [0] * self.__levels]
+        # one flag per level with resting orders, so a side that empties finds its next level in one search
+        self.__occupied = [np.zeros(self.__levels, dtype=np.bool_), np.zeros(self.__levels, dtype=np.bool_)]
+        self.__best = [EMPTY, self.__levels]
+        self.__quantity = []
+        self.__owner = []
+        self.__next = []
+        self.__prev = []
+        self.__level = []
+        self.__side = []
+        self.__serial = []
+        self.__orders = 0
+        self.__free = []
+        self.__grow(capacity)
+        self.__resting = 0
+        self.__last_price = float(start_price)
+        self.__traded_volume = 0
+        self.__trades = 0
+        self.__fills = {}
+
+    def __grow(self, count: int) -> None:
+        start = len(self.__quantity)
+        for field, value in ((self.__quantity, 0), (self.__owner, EMPTY), (self.__next, EMPTY),
+                             (self.__prev, EMPTY), (self.__level, EMPTY), (self.__side, EMPTY), (self.__serial, EMPTY)):
+            field.extend([value] * count)
+        self.__free.extend(range(start + count - 1, start - 1, -1))
+
+    def get_tick_size(self) -> float:
+        return self.__tick_size
+
+    def to_level(self, price: float) -> int:
+        return min(max(int(round(price / self.__tick_size)), 0), self.__levels - 1)
+
+    def get_best_bid(self) -> float:
+        return self.__best[BUY] * self.__tick_size if self.__best[BUY] != EMPTY else np.nan
+
+    def get_best_ask(self) -> float:
+        return self.__best[SELL] * self.__tick_size if self.__best[SELL] != self.__levels else np.nan
+
+    def get_last_price(self) -> float:
+        return self.__last_price
+
+    def get_reference_price(self) -> float:
+        # mid when both sides rest, otherwise the last trade
+        if self.__best[BUY] != EMPTY and self.__best[SELL] != self.__levels:
+            return (self.__best[BUY] + self.__best[SELL]) * self.__tick_size / 2
+        return self.__last_price
+
+    def get_volume(self, side: int, price: float) -> int:
+        return self.__volume[side][self.to_level(price)]
+
+    def get_depth(self, levels: int = 10) -> int:
+        # resting quantity within levels ticks of each best price
+        depth = 0
+        if self.__best[BUY] != EMPTY:
+            depth += sum(self.__volume[BUY][max(self.__best[BUY] - levels + 1, 0):self.__best[BUY] + 1])
+        if self.__best[SELL] != self.__levels:
+            depth += sum(self.__volume[SELL][self.__best[SELL]:self.__best[SELL] + levels])
+        return depth
+
+    def get_resting(self) -> int:
+        return self.__resting
+
+    def get_trades(self) -> int:
+        return self.__trades
+
+    def get_traded_volume(self) -> int:
+        return self.__traded_volume
+
+    def get_fills(self, owner: int) -> tuple:
+        # signed quantity and cash flow of every resting order of owner that was hit
+        return tuple(self.__fills.get(owner, (0, 0.0)))
+
+    def __slot(self, order_id: int) -> int:
+        slot = order_id & 0xFFFFFFFF
+        if order_id < 0 or slot >= len(self.__serial) or self.__serial[slot] != order_id >> 32:
+            return EMPTY
+        return slot
+
+    def get_order(self, order_id: int) -> tuple:
+        slot = self.__slot(order_id)
+        if slot == EMPTY:
+            return None
+        return self.__side[slot], self.__level[slot] * self.__tick_size, self.__quantity[slot]
+
+    def __unlink(self, slot: int) -> None:
+        side, level = self.__side[slot], self.__level[slot]
+        previous, following = self.__prev[slot], self.__next[slot]
+        if previous == EMPTY:
+            self.__heads[side][level] = following
+        else:
+            self.__next[previous] = following
+        if following == EMPTY:
+            self.__tails[side][level] = previous
+        else:
+            self.__prev[following] = previous
+        self.__volume[side][level] -= self.__quantity[slot]
+        if self.__heads[side][level] == EMPTY:
+            self.__occupied[side][level] = False
+        self.__level[slot] = EMPTY
+        self.__quantity[slot] = 0
+        self.__serial[slot] = EMPTY
+        self.__free.append(slot)
+        self.__resting -= 1
+        if self.__heads[side][level] == EMPTY and level == self.__best[side]:
+            self.__advance(side)
+
+    def __advance(self, side: int) -> None:
+        # walk away from the spread to the next non-empty level, searching the flags past a few levels
+        heads, level = self.__heads[side], self.__best[side]
+        if side == BUY:
+            stop = max(level - WALK, -1)
+            while level > stop and heads[level] == EMPTY:
+                level -= 1
+            if level == stop and stop >= 0:
+                below = self.__occupied[BUY][stop::-1]
+                found = int(below.argmax())
+                level = stop - found if below[found] else EMPTY
+            self.__best[BUY] = level
+        else:
+            stop = min(level + WALK, self.__levels)
+            while level < stop and heads[level] == EMPTY:
+                level += 1
+            if level == stop and stop < self.__levels:
+                above = self.__occupied[SELL][stop:]
+                found = int(above.argmax())
+                level = stop + found if above[found] else self.__levels
+            self.__best[SELL] = level
+
+    def __match(self, side: int, limit: int, quantity: int, budget: float = None) -> tuple:
+        # a buy with a budget stops at the first share whose price would take its cost above the budget
+        opposite = 1 - side
+        heads, volume, best = self.__heads[opposite], self.__volume[opposite], self.__best
+        filled, cost = 0, 0.0
+        while quantity > 0:
+            level = best[opposite]
+            if level == EMPTY or level == self.__levels or (level > limit if side == BUY else level < limit):
+                break
+            price = level * self.__tick_size
+            if budget is not None and cost + price > budget:
+                break
+            slot = heads[level]
+            while slot != EMPTY and quantity > 0:
+                take = min(self.__quantity[slot], quantity)
+                if budget is not None and cost + take * price > budget:
+                    # deal with rounding: the floor can still overshoot the budget by one share
+                    take = min(take, int((budget - cost) // price))
+                    if cost + take * price > budget:
+                        take -= 1
+                    quantity = take
+                    if take <= 0:
+                        break
+                quantity -= take
+                filled += take
+                cost += take * price
+                owner = self.__owner[slot]
+                if owner != EMPTY:
+                    fill = self.__fills.setdefault(owner, [0, 0.0])
+                    fill[0] += take if opposite == BUY else -take
+                    fill[1] += -take * price if opposite == BUY else take * price
+                following = self.__next[slot]
+                if take == self.__quantity[slot]:
+                    self.__unlink(slot)
+                else:
+                    self.__quantity[slot] -= take
+                    volume[level] -= take
+                slot = following
+                self.__trades += 1
+            self.__last_price = price
+        self.__traded_volume += filled
+        return filled, cost
+
+    def __rest(self, side: int, level: int, quantity: int, owner: int) -> int:
+        if not self.__free:
+            self.__grow(len(self.__quantity))
+        slot = self.__free.pop()
+        tail = self.__tails[side][level]
+        self.__quantity[slot], self.__owner[slot], self.__level[slot], self.__side[slot] = quantity, owner, level, side
+        self.__prev[slot], self.__next[slot] = tail, EMPTY
+        self.__serial[slot] = self.__orders
+        self.__orders += 1
+        if tail == EMPTY:
+            self.__heads[side][level] = slot
+        else:
+            self.__next[tail] = slot
+        self.__tails[side][level] = slot
+        self.__volume[side][level] += quantity
+        self.__occupied[side][level] = True
+        self.__resting += 1
+        if (level > self.__best[BUY]) if side == BUY else (level < self.__best[SELL]):
+            self.__best[side] = level
+        return (self.__serial[slot] << 32) | slot
+
+    def limit(self, side: int, price: float, quantity: int, owner: int = EMPTY) -> tuple:
+        # match whatever crosses, rest the remainder; returns (order id or EMPTY, filled, cost)
+        level = self.to_level(price)
+        filled, cost = self.__match(side, level, int(quantity))
+        remaining = int(quantity) - filled
+        return (self.__rest(side, level, remaining, owner) if remaining > 0 else EMPTY), filled, cost
+
+    def market(self, side: int, quantity: int) -> tuple:
+        return self.__match(side, self.__levels if side == BUY else EMPTY, int(quantity))
+
+    def cancel(self, order_id: int) -> int:
+        slot = self.__slot(order_id)
+        if slot == EMPTY:
+            return 0
+        remaining = self.__quantity[slot]
+        self.__unlink(slot)
+        return remaining
+
+    def submit(self, quantities: np.ndarray, prices=None, owners=None, filled: np.ndarray = None,
+               paid: np.ndarray = None, budgets: np.ndarray = None) -> np.ndarray:
+        # batched orders from a population: signed quantities, limit prices (NaN or None for market
+        # orders) and owners; processed in array order, returns the order ids of whatever rests. filled
+        # and paid, when given, receive each order's signed traded quantity and its signed cash value.
+        # budgets, when given, is the cash each buyer may spend: its buy fills only as many shares as that
+        # pays for at the levels it walks, and the rest is cancelled rather than rested
+        quantities = np.asarray(quantities)
+        if filled is not None:
+            filled.fill(0)
+        if paid is not None:
+            paid.fill(0)
+        order_ids = np.full(quantities.size, EMPTY, dtype=np.int64)
+        live = np.flatnonzero(quantities)
+        sides = np.where(quantities[live] > 0, BUY, SELL).tolist()
+        sizes = np.abs(quantities[live]).astype(np.int64).tolist()
+        if prices is None:
+            levels = [None] * live.size
+        else:
+            prices = np.asarray(prices, dtype=np.float64)[live]
+            levels = np.where(np.isnan(prices), -1, np.clip(np.rint(prices / self.__tick_size), 0, self.__levels - 1)).astype(np.int64).tolist()
+        owners = [EMPTY] * live.size if owners is None else np.asarray(owners)[live].tolist()
+        budgets = [None] * live.size if budgets is None else np.asarray(budgets, dtype=np.float64)[live].tolist()
+        for index, side, size, level, owner, budget in zip(live.tolist(), sides, sizes, levels, owners, budgets):
+            market = level is None or level < 0
+            traded, cost = self.__match(side, (self.__levels if side == BUY else EMPTY) if market else level, size,
+                                        budget if side == BUY else None)
+            if filled is not None:
+                filled[index] = traded if side == BUY else -traded
+            if paid is not None:
+                paid[index] = cost if side == BUY else -cost
+            if not market and size > traded and (budget is None or side == SELL):
+                order_ids[index] = self.__rest(side, level, size - traded, owner)
+        return order_ids
+
+    def get_nbytes(self) -> int:
+        # python list storage: one 8 byte pointer per slot field and per level entry, small ints are cached
+        return 8 * (7 * len(self.__quantity) + len(self.__free) + 6 * self.__levels) + 2 * self.__levels
+
+class MarketMaker:
+    def __init__(self, book: OrderBook, quote_levels: int = 50, spread_ticks: int = 1, size: int = 200,
+                 owner: int = -2) -> None:
+        # re-quotes a symmetric ladder around the book's reference price every tick
+        self.__book = book
+        self.__quote_levels = int(quote_levels)
+        self.__spread_ticks = int(spread_ticks)
+        self.__size = int(size)
+        self.__owner = int(owner)
+        self.__orders = []
+        self.quote()
+
+    def get_inventory(self) -> tuple:
+        return self.__book.get_fills(self.__owner)
+
+    def quote(self) -> None:
+        # the new ladder goes in before the old one is pulled, so emptied levels never leave a side bare
+        # and the best-price walk stays short
+        tick_size = self.__book.get_tick_size()
+        reference = round(self.__book.get_reference_price() / tick_size)
+        previous, self.__orders = self.__orders, []
+        for offset in range(self.__quote_levels):
+            for side, sign in ((BUY, -1), (SELL, 1)):
+                price = (reference + sign * (self.__spread_ticks + offset)) * tick_size
+                order_id, _, _ = self.__book.limit(side, price, self.__size, self.__owner)
+                if order_id != EMPTY:
+                    self.__orders.append(order_id)
+        for order_id in previous:
+            self.__book.cancel(order_id)
+
+    def on_tick(self, node) -> None:
+        self.quote()
+
+    def on_day(self, node) -> None:
+        pass
@@ -0,0 +1,203 @@
+from abc import ABC, abstractmethod
+import numpy as np
+from accounting import LEDGER_FIELDS
+from kernel import Scratch, count_settled, liquidate, locate, per_trader, reschedule, settle_into
+from rolling import RollingWindow
+from scheduler import WakeCalendar
+from storage import TraderState
+from streams import RandomStream
+
+class Strategy(ABC):
+    # a vectorized agent type: declare the per-agent fields beyond cash and positions and fill in the hooks,
+    # Population supplies state, bankruptcy, cooldown scheduling, settlement and randomness
+    name = 'strategy'
+    # field name -> dtype; integer fields reach signal as intp buffers, the rest as float64
+    fields = {}
+    # fields signal may change, written back after settlement
+    updates = ()
+    # extra scratch buffers handed to signal
+    floats = 0
+    masks = 0
+    indices = 0
+    # > 0 keeps a price window of that many ticks in agents['window']
+    window = 0
+    # every agent decides on every tick, no wake calendar
+    every_tick = False
+    bankruptcy_cash = 1000.0
+
+    def initialize(self, state: dict, generator: np.random.Generator, shape: tuple) -> None:
+        # fill the (replicas, n) matrices of the declared fields, cash and positions are already drawn
+        pass
+
+    def first_wake(self, state: dict, generator: np.random.Generator, size: int) -> np.ndarray:
+        return np.zeros(size, dtype=np.int64)
+
+    @abstractmethod
+    def signal(self, agents: dict) -> None:
+        # write orders into agents['orders'] (prefilled with 0) for the waking agents; bankrupt agents are
+        # overridden with a forced sale afterwards, of at least agents['least'] shares when signal sets it
+        pass
+
+    def wait(self, agents: dict, out: np.ndarray) -> None:
+        # cooldown ticks of every waking agent, unused when every_tick is set
+        out.fill(0)
+
+    def get_parameters(self) -> dict:
+        return {}
+
+class Population:
+    def __init__(self, strategy: Strategy, n: int,
+                 min_start_cash = 10000.0, max_start_cash = 30000.0,
+                 min_start_positions = 100, max_start_positions = 300,
+                 replicas = 1, seed = None, dtypes = None, churn = None, ledger = None):
+        self.__strategy = strategy
+        self.__bankruptcy_cash = np.float64(strategy.bankruptcy_cash)
+        # replica markets form the leading axis, kernels work on the flat replica-major columns
+        self.__n = int(n)
+        self.__replicas = int(replicas)
+        shape = (self.__replicas, self.__n)
+        field_dtypes = {name: np.dtype(dtype) for name, dtype in strategy.fields.items()}
+        self.__state = TraderState(('cash', 'positions') + tuple(field_dtypes) + (LEDGER_FIELDS if ledger is not None else ()),
+                                   self.__n, self.__replicas,
+                                   dict(field_dtypes, **(dtypes or {})))
+        self.__float_fields = tuple(name for name, dtype in field_dtypes.items() if not np.issubdtype(dtype, np.integer))
+        self.__int_fields = tuple(name for name, dtype in field_dtypes.items() if np.issubdtype(dtype, np.integer))
+        self.__scratch = Scratch(self.__replicas * self.__n, floats=6 + len(self.__float_fields) + strategy.floats,
+                                 masks=3 + strategy.masks, indices=2 + len(self.__int_fields) + strategy.indices)
+        self.__rng = RandomStream(seed)
+        self.__start = (min_start_cash, max_start_cash, min_start_positions, max_start_positions)
+        values = self.__spawn(shape)
+        for name in self.__state.get_fields():
+            self.__state.get_matrix(name)[:] = values[name]
+        self.__profiler = None
+        self.__clipped_counts = None
+        self.__name = strategy.name
+        self.__window = RollingWindow(strategy.window, width=self.__replicas) if strategy.window > 0 else None
+        self.__calendar = WakeCalendar()
+        # every_tick strategies keep the index of every agent, the others only hand it to the calendar once
+        everyone = np.arange(self.__state.get_size())
+        self.__everyone = everyone if strategy.every_tick else None
+        if not strategy.every_tick:
+            self.__calendar.schedule(everyone, values['wake'].reshape(-1))
+        self.__churn = churn
+        if churn is not None:
+            churn.attach(self.__state, self.__calendar, self.__spawn, self.__grow, self.__bankruptcy_cash)
+        self.__ledger = ledger
+        self.__fill = None
+        if ledger is not None:
+            ledger.attach(self.__state, churn)
+
+    def __spawn(self, shape) -> dict:
+        # starting draws of new agents in the constructor's order, wake in ticks from now
+        generator = self.__rng.get_generator()
+        min_start_cash, max_start_cash, min_start_positions, max_start_positions = self.__start
+        values = {name: np.zeros(shape, dtype=self.__state.get_dtype(name)) for name in self.__state.get_fields()}
+        values['cash'][:] = generator.uniform(min_start_cash, max_start_cash, shape)
+        values['positions'][:] = generator.integers(min_start_positions, max_start_positions, shape)
+        self.__strategy.initialize(values, generator, shape)
+        if self.__strategy.every_tick:
+            values['wake'] = np.zeros(shape, dtype=np.int64)
+        else:
+            size = int(np.prod(shape))
+            columns = {name: value.reshape(-1) for name, value in values.items()}
+            values['wake'] = np.reshape(self.__strategy.first_wake(columns, generator, size), shape)
+        return values
+
+    def __grow(self, size: int) -> None:
+        self.__n = size
+        if size > self.__scratch.get_capacity():
+            strategy = self.__strategy
+            self.__scratch = Scratch(2 * size, floats=6 + len(self.__float_fields) + strategy.floats,
+                                     masks=3 + strategy.masks, indices=2 + len(self.__int_fields) + strategy.indices)
+
+    def get_state(self) -> TraderState:
+        return self.__state
+
+    def get_churn(self):
+        return self.__churn
+
+    def get_ledger(self):
+        return self.__ledger
+
+    def get_strategy(self) -> Strategy:
+        return self.__strategy
+
+    def get_parameters(self) -> dict:
+        return dict(self.__strategy.get_parameters(), bankruptcy_cash=float(self.__bankruptcy_cash))
+
+    def get_snapshot(self) -> dict:
+        snapshot = {'state': self.__state.get_snapshot(), 'rng': self.__rng.get_snapshot(), 'calendar': self.__calendar.get_snapshot()}
+        if self.__window is not None:
+            snapshot['window'] = self.__window.get_snapshot()
+        return snapshot
+
+    def set_snapshot(self, snapshot: dict) -> None:
+        self.__state.set_snapshot(snapshot['state'])
+        self.__rng.set_snapshot(snapshot['rng'])
+        self.__calendar.set_snapshot(snapshot['calendar'])
+        if self.__window is not None:
+            self.__window.set_snapshot(snapshot['window'])
+
+    def get_nbytes(self) -> dict:
+        return {'state': self.__state.get_nbytes(), 'scratch': self.__scratch.get_nbytes()}
+
+    def set_fill(self, fill) -> None:
+        # (orders, budgets) -> (filled, paid) per trader, e.g. Node.fill; None settles everything at the price given
+        self.__fill = fill
+
+    def set_profiler(self, profiler, name: str = None) -> None:
+        self.__profiler = profiler
+        self.__name = self.__name if name is None else name
+        self.__clipped_counts = None if profiler is None else profiler.get_clipped(self.__name)
+
+    def tick_decision(self, current_price, basic_value=None) -> tuple:
+        profiler = self.__profiler
+        if profiler is not None:
+            started = profiler.clock()
+        strategy = self.__strategy
+        if self.__window is not None:
+            self.__window.append(current_price)
+        if strategy.every_tick:
+            active_traders = self.__everyone if self.__churn is None else self.__churn.get_live()
+            self.__calendar.pop()
+        else:
+            active_traders = self.__calendar.pop()
+        k = active_traders.size
+        floats = self.__scratch.get_floats(k)
+        masks = self.__scratch.get_masks(k)
+        indices = self.__scratch.get_indices(k)
+        orders, cost, price, value, cash, positions = floats[:6]
+        bankrupt, mask, side = masks[:3]
+        wake, replica = indices[:2]
+        self.__state.gather('cash', active_traders, cash)
+        self.__state.gather('positions', active_traders, positions)
+        replica = locate(active_traders, self.__n, self.__replicas, replica)
+        agents = {'active': active_traders, 'cash': cash, 'positions': positions, 'orders': orders,
+                  'price': per_trader(current_price, replica, price),
+                  'basic_value': None if basic_value is None else per_trader(basic_value, replica, value),
+                  'replica': replica, 'window': self.__window, 'rng': self.__rng, 'tick': self.__calendar.get_tick() - 1,
+                  'floats': floats[6 + len(self.__float_fields):], 'masks': masks[3:],
+                  'indices': indices[2 + len(self.__int_fields):]}
+        for name, buffer in zip(self.__float_fields, floats[6:]):
+            agents[name] = self.__state.gather(name, active_traders, buffer)
+        for name, buffer in zip(self.__int_fields, indices[2:]):
+            agents[name] = self.__state.gather(name, active_traders, buffer)
+        orders.fill(0.0)
+        strategy.signal(agents)
+        liquidate(cash, orders, agents['price'], self.__bankruptcy_cash, bankrupt, cost, agents.get('least'))
+        if profiler is not None:
+            started = profiler.lap(self.__name + '.decision', started)
+        buy_amount, sell_amount = settle_into(self.__state, active_traders, cash, positions, orders, agents['price'], cost, mask, side,
+                                              replica, self.__replicas, self.__clipped_counts, self.__ledger, self.__fill)
+        for name in strategy.updates:
+            self.__state.scatter(name, active_traders, agents[name])
+        if profiler is not None:
+            count_settled(profiler, self.__name, started, active_traders, orders)
+        # deal with cooldown
+        if strategy.every_tick:
+            if self.__churn is not None:
+                self.__churn.retire(active_traders, wake, cash, positions)
+        else:
+            strategy.wait(agents, wake)
+            reschedule(self.__calendar, self.__churn, active_traders, wake, cash, positions)
+        return buy_amount, sell_amount
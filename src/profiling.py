@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+import numpy as np
+
+class Profiler:
+    def __init__(self, trace_path: str = None, verbose: bool = True) -> None:
+        # phase times in nanoseconds and counters, both reset at every end_day
+        self.__trace = open(trace_path, 'w') if trace_path is not None else None
+        self.__verbose = verbose
+        self.__times = {}
+        self.__counts = {}
+        self.__clipped = {}
+        self.__ticks = 0
+        self.__days = []
+        # populations stepped on a thread pool lap and count concurrently
+        self.__lock = threading.Lock()
+
+    clock = staticmethod(time.perf_counter_ns)
+
+    def lap(self, phase: str, started: int) -> int:
+        now = time.perf_counter_ns()
+        with self.__lock:
+            self.__times[phase] = self.__times.get(phase, 0) + now - started
+        return now
+
+    def count(self, name: str, value: int) -> None:
+        value = int(value)
+        with self.__lock:
+            self.__counts[name] = self.__counts.get(name, 0) + value
+
+    def get_clipped(self, name: str) -> np.ndarray:
+        # cash-limited and position-limited order counts, incremented by kernel.settle
+        with self.__lock:
+            if name not in self.__clipped:
+                self.__clipped[name] = np.zeros(2, dtype=np.int64)
+            return self.__clipped[name]
+
+    def tick(self) -> None:
+        self.__ticks += 1
+
+    def get_days(self) -> list:
+        return self.__days
+
+    def end_day(self, day: int) -> dict:
+        for name, clipped in self.__clipped.items():
+            self.count(name + '.clipped_cash', clipped[0])
+            self.count(name + '.clipped_position', clipped[1])
+            clipped.fill(0)
+        with self.__lock:
+            row = {'day': day, 'ticks': self.__ticks, 'times_ns': self.__times, 'counts': self.__counts}
+            self.__times = {}
+            self.__counts = {}
+            self.__ticks = 0
+        self.__days.append(row)
+        if self.__trace is not None:
+            self.__trace.write(json.dumps(row) + '\n')
+            self.__trace.flush()
+        if self.__verbose:
+            print(format_summary(row))
+        return row
+
+    def close(self) -> None:
+        if self.__trace is not None:
+            self.__trace.close()
+            self.__trace = None
+
+def format_summary(row: dict) -> str:
+    ticks = max(row['ticks'], 1)
+    total = max(sum(row['times_ns'].values()), 1)
+    lines = ["day %d, %d ticks" % (row['day'], row['ticks']),
+             "%-24s %12s %12s %8s" % ('phase', 'total ms', 'us/tick', 'share')]
+    for phase, spent in sorted(row['times_ns'].items(), key=lambda item: -item[1]):
+        lines.append("%-24s %12.1f %12.2f %7.1f%%" % (phase, spent / 1e6, spent / 1e3 / ticks, 100.0 * spent / total))
+    lines.append("%-24s %12s %12s" % ('counter', 'total', 'per tick'))
+    for name, value in sorted(row['counts'].items()):
+        lines.append("%-24s %12d %12.2f" % (name, value, value / ticks))
+    return '\n'.join(lines)
+
+def load_trace(path: str) -> list:
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,126 @@
+import json
+import os
+import numpy as np
+
+SOURCES = ('noise', 'momentum', 'value')
+META_FILE = 'meta.json'
+
+class TickRecorder:
+    def __init__(self, directory: str, day_tick: int, sources=SOURCES) -> None:
+        # one raw float64 file per column, appended a whole day (day_tick rows, NaN padded) at a time; a
+        # directory already recorded into is resumed after its last complete day, rows meta does not count
+        # are cut off
+        self.__directory = directory
+        self.__day_tick = int(day_tick)
+        self.__sources = tuple(sources)
+        self.__columns = ('price', 'depth', 'buy', 'sell') + tuple('volume_' + source for source in self.__sources)
+        self.__buffer = np.full((len(self.__columns), self.__day_tick), np.nan, dtype=np.float64)
+        self.__ticks = 0
+        self.__day_ticks = self.__read_meta()
+        os.makedirs(self.__directory, exist_ok=True)
+        size = len(self.__day_ticks) * self.__day_tick * self.__buffer.itemsize
+        self.__files = []
+        for column in self.__columns:
+            file = open(self.__path(column), 'ab')
+            if file.tell() < size:
+                file.close()
+                raise ValueError('%s is shorter than the %d days in %s' % (self.__path(column), len(self.__day_ticks), META_FILE))
+            file.truncate(size)
+            self.__files.append(file)
+        self.__write_meta()
+
+    def __read_meta(self) -> list:
+        path = os.path.join(self.__directory, META_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path) as file:
+            meta = json.load(file)
+        if meta['day_tick'] != self.__day_tick or tuple(meta['columns']) != self.__columns:
+            raise ValueError('%s was recorded with day_tick %d and columns %s' % (self.__directory, meta['day_tick'], meta['columns']))
+        return list(meta['day_ticks'])
+
+    def __path(self, column: str) -> str:
+        return os.path.join(self.__directory, column + '.f64')
+
+    def get_columns(self) -> tuple:
+        return self.__columns
+
+    def get_days(self) -> int:
+        return len(self.__day_ticks)
+
+    def on_tick(self, node) -> None:
+        if self.__ticks >= self.__day_tick:
+            self.flush()
+        row = self.__buffer[:, self.__ticks]
+        row[0] = node.get_current_price()
+        row[1] = node.get_market_depth()
+        row[2] = node.get_buy_per_tick()
+        row[3] = node.get_sell_per_tick()
+        volume = node.get_order_volume()
+        for i, source in enumerate(self.__sources):
+            row[4 + i] = volume.get(source, 0)
+        self.__ticks += 1
+
+    def on_day(self, node) -> None:
+        if self.__ticks > 0:
+            self.flush()
+
+    def flush(self) -> None:
+        # deal with a partial day: the tail keeps its NaN padding and meta records the real length
+        for column, file in zip(self.__buffer, self.__files):
+            file.write(column.tobytes())
+            file.flush()
+        self.__day_ticks.append(self.__ticks)
+        self.__buffer.fill(np.nan)
+        self.__ticks = 0
+        self.__write_meta()
+
+    def __write_meta(self) -> None:
+        meta = {'day_tick': self.__day_tick, 'columns': list(self.__columns), 'days': len(self.__day_ticks),
+                'day_ticks': self.__day_ticks}
+        path = os.path.join(self.__directory, META_FILE)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(path + '.tmp', path)
+
+    def close(self) -> None:
+        if self.__ticks > 0:
+            self.flush()
+        for file in self.__files:
+            file.close()
+
+class TickReader:
+    def __init__(self, directory: str) -> None:
+        with open(os.path.join(directory, META_FILE)) as file:
+            meta = json.load(file)
+        self.__day_tick = meta['day_tick']
+        self.__columns = tuple(meta['columns'])
+        self.__days = meta['days']
+        self.__day_ticks = np.array(meta['day_ticks'], dtype=np.int64)
+        self.__maps = {}
+        for column in self.__columns:
+            if self.__days > 0:
+                self.__maps[column] = np.memmap(os.path.join(directory, column + '.f64'), dtype=np.float64,
+                                                mode='r', shape=(self.__days, self.__day_tick))
+            else:
+                self.__maps[column] = np.zeros((0, self.__day_tick), dtype=np.float64)
+
+    def get_columns(self) -> tuple:
+        return self.__columns
+
+    def get_days(self) -> int:
+        return self.__days
+
+    def get_day_tick(self) -> int:
+        return self.__day_tick
+
+    def get_day_ticks(self, start: int = 0, stop: int = None) -> np.ndarray:
+        return self.__day_ticks[start:stop]
+
+    def get_column(self, column: str, start: int = 0, stop: int = None) -> np.ndarray:
+        # (days, day_tick) view onto the mapped file, nothing is read until it is touched
+        return self.__maps[column][start:stop]
+
+    def get_day(self, day: int) -> dict:
+        length = int(self.__day_ticks[day])
+        return {column: self.__maps[column][day, :length] for column in self.__columns}
@@ -0,0 +1,202 @@
+import os
+import numpy as np
+from kernel import settle
+from market import DAY_TICK
+from recorder import TickReader
+from streams import CounterStream, RandomStream
+from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+
+LOOKBACK = 1080
+# counter slots reserved per wake, one per variate a decision draws
+DRAWS = 4
+
+def load_prices(source) -> np.ndarray:
+    # a TickRecorder directory, a .npy file, a text file with one price per line, or anything array-like
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            reader = TickReader(source)
+            prices = np.concatenate([reader.get_column('price', day, day + 1)[0, :length]
+                                     for day, length in enumerate(reader.get_day_ticks().tolist())] or [np.zeros(0)])
+        elif source.endswith('.npy'):
+            prices = np.load(source)
+        else:
+            prices = np.loadtxt(source, delimiter=',', ndmin=1)
+    else:
+        prices = source
+    prices = np.asarray(prices, dtype=np.float64).reshape(-1)
+    return prices[~np.isnan(prices)]
+
+def prefix_sums(prices: np.ndarray, start: int, stop: int, lookback: int = LOOKBACK) -> tuple:
+    # prefix sums of one block plus its lookback, shifted by the first price so the squares stay small
+    origin = max(start - lookback, 0)
+    segment = prices[origin:stop] - prices[origin]
+    prefix = np.zeros((2, segment.size + 1), dtype=np.float64)
+    np.cumsum(segment, out=prefix[0, 1:])
+    np.cumsum(segment * segment, out=prefix[1, 1:])
+    return prefix, origin, float(prices[origin])
+
+def window_sums(prefix: np.ndarray, origin: int, ticks: np.ndarray, t: np.ndarray) -> tuple:
+    # sum and square sum of the t prices up to and including each tick
+    end = ticks - origin + 1
+    start = end - t
+    return prefix[0, end] - prefix[0, start], prefix[1, end] - prefix[1, start]
+
+class Replay:
+    def __init__(self, prices, basic_value=45.0, block: int = DAY_TICK, seed=None) -> None:
+        # the price path is given, so agents never feed back into it: every agent can be carried from one
+        # wake to its next independently, a round at a time, and time only advances in blocks
+        self.__prices = load_prices(prices)
+        self.__basic_value = np.broadcast_to(np.asarray(basic_value, dtype=np.float64), self.__prices.shape)
+        self.__block = int(block)
+        # the starting wakes come from one stream, every later draw from the population's counter stream keyed
+        # by agent and wake, so neither the block size nor the order of the rounds moves any agent's variates
+        self.__rng = RandomStream(seed)
+        self.__seed = np.random.SeedSequence(seed)
+        self.__agents = {}
+        self.__strategies = {NoiseTrader: self.__noise, MomentumTrader: self.__momentum, ValueInvestors: self.__value}
+
+    def get_ticks(self) -> int:
+        return self.__prices.size
+
+    def get_sources(self) -> tuple:
+        return tuple(self.__agents)
+
+    def add(self, source: str, population) -> None:
+        # starts from a copy of the population's current state and parameters, the population is not touched
+        state = population.get_state()
+        agents = {name: state.get_column(name).astype(np.float64) for name in state.get_fields()}
+        agents['parameters'] = population.get_parameters()
+        agents['decide'] = self.__strategies[type(population)]
+        agents['wealth'] = agents['cash'] + agents['positions'] * self.__prices[0]
+        agents['trades'] = np.zeros(state.get_size(), dtype=np.int64)
+        agents['volume'] = np.zeros(state.get_size(), dtype=np.float64)
+        agents['wakes'] = np.zeros(state.get_size(), dtype=np.int64)
+        agents['stream'] = CounterStream(self.__seed.spawn(1)[0])
+        generator = self.__rng.get_generator()
+        if 'decision_time' in agents:
+            agents['decision_time'] = agents['decision_time'].astype(np.int64)
+            agents['wake'] = generator.integers(agents['decision_time'] * 3, agents['decision_time'] * 4)
+        else:
+            agents['wake'] = generator.exponential(agents['parameters']['average_wait_time'], state.get_size()).astype(np.int64)
+        self.__agents[source] = agents
+
+    def run(self) -> dict:
+        for start in range(0, self.__prices.size, self.__block):
+            stop = min(start + self.__block, self.__prices.size)
+            window = prefix_sums(self.__prices, start, stop)
+            for agents in self.__agents.values():
+                self.__run_block(agents, stop, window)
+        return {source: {'pnl': self.get_pnl(source), 'trades': self.get_trades(source)} for source in self.__agents}
+
+    def __run_block(self, agents: dict, stop: int, window: tuple) -> None:
+        # round k settles the k-th wake inside the block of every agent, so the number of rounds follows
+        # the busiest agent's wakes rather than the ticks: a momentum trader wakes every t to 2t ticks
+        wake = agents['wake']
+        active = np.flatnonzero(wake < stop)
+        while active.size > 0:
+            self.__round(agents, active, window)
+            active = active[wake[active] < stop]
+
+    def __round(self, agents: dict, active: np.ndarray, window: tuple) -> None:
+        # one wake of every agent still waking inside the block, each at its own tick
+        ticks = agents['wake'][active]
+        price = self.__prices[ticks]
+        cash = agents['cash'][active]
+        positions = agents['positions'][active]
+        orders, waits = agents['decide'](agents, active, ticks, price, cash, positions, window)
+        settle(cash, positions, orders, price, np.empty_like(orders), np.empty(orders.size, dtype=np.bool_),
+               np.empty(orders.size, dtype=np.bool_))
+        agents['cash'][active] = cash
+        agents['positions'][active] = positions
+        agents['trades'][active] += orders != 0
+        agents['volume'][active] += np.abs(orders)
+        agents['wake'][active] = ticks + 1 + waits
+        agents['wakes'][active] += 1
+
+    def __draw(self, agents: dict, active: np.ndarray, name: str, slot: int) -> np.ndarray:
+        # the slot-th variate of every active agent's current wake
+        return getattr(agents['stream'], name)(active, agents['wakes'][active] * DRAWS + slot)
+
+    def __bankrupt(self, cash: np.ndarray, price, bankruptcy_cash: float, orders: np.ndarray, floor=1.0) -> np.ndarray:
+        # deal with bankrupters
+        bankrupt = cash <= bankruptcy_cash
+        amount = np.maximum(np.floor((bankruptcy_cash - cash) / price * 2.0), floor)
+        np.negative(amount, out=orders, where=bankrupt)
+        return bankrupt
+
+    def __noise(self, agents, active, ticks, price, cash, positions, window) -> tuple:
+        parameters = agents['parameters']
+        decision = self.__draw(agents, active, 'random', 0)
+        trade = np.trunc(self.__draw(agents, active, 'standard_exponential', 1) * parameters['average_trade_amount'])
+        orders = np.where(decision < 0.4, trade, np.where(decision < 0.8, -trade, 0.0))
+        self.__bankrupt(cash, price, parameters['bankruptcy_cash'], orders, np.maximum(trade, 1.0))
+        waits = self.__draw(agents, active, 'standard_exponential', 2) * parameters['average_wait_time']
+        return orders, waits.astype(np.int64)
+
+    def __momentum(self, agents, active, ticks, price, cash, positions, window) -> tuple:
+        parameters = agents['parameters']
+        prefix, origin, reference = window
+        orders = np.zeros(active.size)
+        bankrupt = self.__bankrupt(cash, price, parameters['bankruptcy_cash'], orders)
+        # MA_t, sigma_market and sigma_t straight from the block prefix sums
+        t = agents['decision_time'][active]
+        deciders = (t * 3 <= np.minimum(ticks + 1, LOOKBACK)) & ~bankrupt
+        t = np.where(deciders, t, 1)
+        sum_t, square_sum_t = window_sums(prefix, origin, ticks, t)
+        sum_3t, square_sum_3t = window_sums(prefix, origin, ticks, t * 3)
+        MA_t = sum_t / t
+        sigma_market = square_sum_3t - sum_3t * sum_3t / (t * 3.0)
+        sigma_t = square_sum_t - sum_t * sum_t / t
+        with np.errstate(divide='ignore', invalid='ignore'):
+            signal = (price - reference - MA_t) / sigma_t
+        judge = agents['judge_coef'][active] * sigma_market
+        # deal with trade
+        cut = deciders & ((MA_t + reference) * agents['risk_coef'][active] < price)
+        np.negative(positions, out=orders, where=cut)
+        deciders &= ~cut
+        proportion = self.__draw(agents, active, 'random', 0)
+        buy = deciders & (signal > judge)
+        held = proportion * (parameters['max_buy_proportion'] - parameters['min_buy_proportion']) + parameters['min_buy_proportion']
+        np.copyto(orders, np.floor(cash / price * held), where=buy)
+        sell = deciders & (signal < -judge)
+        held = proportion * (parameters['max_sell_proportion'] - parameters['min_sell_proportion']) + parameters['min_sell_proportion']
+        np.negative(np.floor(positions * held), out=orders, where=sell)
+        # deal with cooldown
+        t = agents['decision_time'][active]
+        waits = (self.__draw(agents, active, 'random', 1) * t).astype(np.int64) + t
+        return orders, waits
+
+    def __value(self, agents, active, ticks, price, cash, positions, window) -> tuple:
+        parameters = agents['parameters']
+        orders = np.zeros(active.size)
+        solvent = ~self.__bankrupt(cash, price, parameters['bankruptcy_cash'], orders)
+        # trade
+        pridicted_IV = self.__basic_value[ticks] * (1.0 + parameters['decision_deviation_scale'] * self.__draw(agents, active, 'standard_normal', 0))
+        signal = (agents['judge_coef'][active] + 1.0) * pridicted_IV
+        proportion = self.__draw(agents, active, 'random', 1)
+        buy = solvent & (signal * 0.9 > price)
+        held = proportion * (parameters['max_buy_proportion'] - parameters['min_buy_proportion']) + parameters['min_buy_proportion']
+        np.copyto(orders, np.floor(cash / price * held), where=buy)
+        sell = solvent & (signal * 1.1 < price)
+        held = proportion * (parameters['max_sell_proportion'] - parameters['min_sell_proportion']) + parameters['min_sell_proportion']
+        np.negative(np.floor(positions * held), out=orders, where=sell)
+        # deal with cooldown
+        waits = self.__draw(agents, active, 'standard_exponential', 2) * parameters['average_wait_time']
+        return orders, waits.astype(np.int64)
+
+    def get_cash(self, source: str) -> np.ndarray:
+        return self.__agents[source]['cash']
+
+    def get_positions(self, source: str) -> np.ndarray:
+        return self.__agents[source]['positions']
+
+    def get_pnl(self, source: str) -> np.ndarray:
+        # mark to market against the last price of the path
+        agents = self.__agents[source]
+        return agents['cash'] + agents['positions'] * self.__prices[-1] - agents['wealth']
+
+    def get_trades(self, source: str) -> np.ndarray:
+        return self.__agents[source]['trades']
+
+    def get_volume(self, source: str) -> np.ndarray:
+        return self.__agents[source]['volume']
@@ -0,0 +1,110 @@
+import numpy as np
+
+class RollingWindow:
+    def __init__(self, capacity: int = 1080, rebase_interval: int = 0, width: int = 1) -> None:
+        # width > 1 keeps one independent column per replica market, all advanced by the same append
+        self.__capacity = int(capacity)
+        self.__width = int(width)
+        self.__rebase_interval = int(rebase_interval) if rebase_interval > 0 else self.__capacity
+        self.__values = np.zeros((self.__capacity, self.__width), dtype=np.float64)
+        # prefix sums keep capacity + 1 slots so every window length up to capacity stays addressable
+        self.__prefix_sum = np.zeros((self.__capacity + 1, self.__width), dtype=np.float64)
+        self.__square_prefix_sum = np.zeros((self.__capacity + 1, self.__width), dtype=np.float64)
+        self.__square = np.zeros(self.__width, dtype=np.float64)
+        self.__count = 0
+        self.__since_rebase = 0
+
+    def __len__(self) -> int:
+        return min(self.__count, self.__capacity)
+
+    def get_capacity(self) -> int:
+        return self.__capacity
+
+    def get_width(self) -> int:
+        return self.__width
+
+    def get_snapshot(self) -> dict:
+        return {'values': self.__values.copy(), 'prefix_sum': self.__prefix_sum.copy(),
+                'square_prefix_sum': self.__square_prefix_sum.copy(), 'count': self.__count, 'since_rebase': self.__since_rebase}
+
+    def set_snapshot(self, snapshot: dict) -> None:
+        if snapshot['values'].shape != self.__values.shape:
+            raise ValueError('window snapshot of shape %s does not fit %s' % (snapshot['values'].shape, self.__values.shape))
+        self.__values[:] = snapshot['values']
+        self.__prefix_sum[:] = snapshot['prefix_sum']
+        self.__square_prefix_sum[:] = snapshot['square_prefix_sum']
+        self.__count = int(snapshot['count'])
+        self.__since_rebase = int(snapshot['since_rebase'])
+
+    def append(self, value) -> None:
+        slot = self.__count % (self.__capacity + 1)
+        next_slot = (self.__count + 1) % (self.__capacity + 1)
+        row = self.__values[self.__count % self.__capacity]
+        row[:] = value
+        np.add(self.__prefix_sum[slot], row, out=self.__prefix_sum[next_slot])
+        np.multiply(row, row, out=self.__square)
+        np.add(self.__square_prefix_sum[slot], self.__square, out=self.__square_prefix_sum[next_slot])
+        self.__count += 1
+        self.__since_rebase += 1
+        if self.__since_rebase >= self.__rebase_interval:
+            self.__rebase()
+
+    def __rebase(self) -> None:
+        # rebuild the live prefix sums from the raw values to stop rounding drift of the running sums
+        length = len(self)
+        values = self.__ordered_values()
+        slots = np.arange(self.__count - length, self.__count + 1) % (self.__capacity + 1)
+        self.__prefix_sum[slots[0]] = 0.0
+        self.__square_prefix_sum[slots[0]] = 0.0
+        self.__prefix_sum[slots[1:]] = np.cumsum(values, axis=0)
+        self.__square_prefix_sum[slots[1:]] = np.cumsum(values * values, axis=0)
+        self.__since_rebase = 0
+
+    def __start(self, t, index):
+        if index is None:
+            return (self.__count - np.asarray(t)) % (self.__capacity + 1)
+        np.subtract(self.__count, t, out=index)
+        np.remainder(index, self.__capacity + 1, out=index)
+        return index
+
+    def __range(self, prefix: np.ndarray, t, out, index, column, end):
+        start = self.__start(t, index)
+        end_row = prefix[self.__count % (self.__capacity + 1)]
+        if out is None:
+            column = 0 if column is None else column
+            return end_row[column] - prefix[start, column]
+        if self.__width > 1:
+            np.multiply(start, self.__width, out=start)
+            if column is not None:
+                np.add(start, column, out=start)
+        np.take(prefix.reshape(-1), start, out=out, mode='clip')
+        if column is None:
+            return np.subtract(end_row[0], out, out=out)
+        np.take(end_row, column, out=end, mode='clip')
+        return np.subtract(end, out, out=out)
+
+    def sum(self, t, out=None, index=None, column=None, end=None):
+        return self.__range(self.__prefix_sum, t, out, index, column, end)
+
+    def square_sum(self, t, out=None, index=None, column=None, end=None):
+        return self.__range(self.__square_prefix_sum, t, out, index, column, end)
+
+    def mean(self, t, column=None):
+        return self.sum(t, column=column) / t
+
+    def variance(self, t, column=None):
+        mean = self.mean(t, column)
+        return self.square_sum(t, column=column) / t - mean * mean
+
+    def last(self):
+        row = self.__values[(self.__count - 1) % self.__capacity]
+        return float(row[0]) if self.__width == 1 else row.copy()
+
+    def __ordered_values(self) -> np.ndarray:
+        length = len(self)
+        start = (self.__count - length) % self.__capacity
+        return np.roll(self.__values, -start, axis=0)[:length] if length == self.__capacity else self.__values[:length].copy()
+
+    def values(self) -> np.ndarray:
+        values = self.__ordered_values()
+        return values[:, 0] if self.__width == 1 else values
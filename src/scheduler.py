@@ -0,0 +1,202 @@
+import numpy as np
+
+EMPTY = np.zeros(0, dtype=np.intp)
+# an entry packs a wake tick and an agent index as (tick << SHIFT) | index, so sorted entries are ordered by
+# tick and then by agent
+SHIFT = 32
+MASK = (1 << SHIFT) - 1
+# pool rows hold at least MIN_CHUNK entries, or about 1 / ROWS_PER_SCHEDULE of the first schedule
+MIN_CHUNK = 64
+ROWS_PER_SCHEDULE = 256
+
+def grown(buffer: np.ndarray, size: int) -> np.ndarray:
+    # a buffer of at least size entries: exactly size the first time, at least doubled after that
+    if size <= buffer.size:
+        return buffer
+    return np.zeros(size if buffer.size == 0 else max(size, 2 * buffer.size), dtype=buffer.dtype)
+
+class WakeCalendar:
+    def __init__(self, resolution: int = 64) -> None:
+        # two level timing wheel: exact tick slots for the current block, coarse buckets for later blocks.
+        # a bucket is a list [entries, row, row, ...] of rows of one persistent pool, filled in order so only
+        # the last row is partial; rows come from and go back to a free stack. the slots are a ring indexed
+        # by tick % resolution and emptied block buckets are kept for reuse, and schedule and pop sort and
+        # copy through persistent buffers, so once the pool has grown a tick allocates nothing per agent
+        self.__resolution = int(resolution)
+        self.__tick = 0
+        self.__slots = [[0] for _ in range(self.__resolution)]
+        self.__blocks = {}
+        self.__spare = []
+        self.__chunk = 0
+        self.__pool = np.zeros((0, 0), dtype=np.int64)
+        self.__free = []
+        self.__batch = np.zeros(0, dtype=np.int64)
+        self.__out = np.zeros(0, dtype=np.int64)
+
+    def get_tick(self) -> int:
+        return self.__tick
+
+    def get_nbytes(self) -> int:
+        return self.__pool.nbytes + self.__batch.nbytes + self.__out.nbytes
+
+    def __reserve(self, size: int) -> np.ndarray:
+        # the schedule buffer for size entries; the first call also fixes the row length
+        if self.__chunk == 0:
+            self.__chunk = max(MIN_CHUNK, 1 << max(size // ROWS_PER_SCHEDULE - 1, 0).bit_length())
+            self.__pool = np.zeros((0, self.__chunk), dtype=np.int64)
+        self.__batch = grown(self.__batch, size)
+        return self.__batch[:size]
+
+    def __take_rows(self, count: int) -> list:
+        if len(self.__free) < count:
+            rows = self.__pool.shape[0]
+            pool = np.zeros((max(2 * rows, rows + count, 16), self.__chunk), dtype=np.int64)
+            pool[:rows] = self.__pool
+            self.__pool = pool
+            self.__free.extend(range(pool.shape[0] - 1, rows - 1, -1))
+        taken = self.__free[-count:]
+        del self.__free[-count:]
+        return taken
+
+    def __append(self, bucket: list, entries: np.ndarray) -> None:
+        chunk = self.__chunk
+        size, count = bucket[0], entries.size
+        bucket[0] = size + count
+        # deal with the partial last row first
+        used = size - (len(bucket) - 2) * chunk
+        start = 0
+        if len(bucket) > 1 and used < chunk:
+            start = min(chunk - used, count)
+            self.__pool[bucket[-1], used:used + start] = entries[:start]
+        if start == count:
+            return
+        # then whole rows, and what is left into one more
+        full, rest = divmod(count - start, chunk)
+        rows = self.__take_rows(full + (rest > 0))
+        bucket.extend(rows)
+        pool = self.__pool
+        if full > 0:
+            pool[rows[:full]] = entries[start:start + full * chunk].reshape(full, chunk)
+        if rest > 0:
+            pool[rows[-1], :rest] = entries[start + full * chunk:]
+
+    def __copy(self, bucket: list, out: np.ndarray) -> np.ndarray:
+        # a bucket's entries into the front of out
+        chunk, size = self.__chunk, bucket[0]
+        full, rest = divmod(size, chunk)
+        if full > 0:
+            np.take(self.__pool, bucket[1:full + 1], axis=0, out=out[:full * chunk].reshape(full, chunk), mode='clip')
+        if rest > 0:
+            out[full * chunk:size] = self.__pool[bucket[-1], :rest]
+        return out[:size]
+
+    def __release(self, bucket: list) -> None:
+        self.__free.extend(bucket[1:])
+        del bucket[1:]
+        bucket[0] = 0
+
+    def __file(self, entries: np.ndarray) -> None:
+        # sorted entries, none before the current tick, into the slots of the current block and the buckets
+        # of later blocks, one bucket at a time
+        resolution = self.__resolution
+        block = self.__tick // resolution
+        start, size = 0, entries.size
+        while start < size:
+            tick = int(entries[start]) >> SHIFT
+            if tick // resolution == block:
+                bucket, end = self.__slots[tick % resolution], tick + 1
+            else:
+                bucket = self.__blocks.get(tick // resolution)
+                if bucket is None:
+                    bucket = self.__blocks[tick // resolution] = self.__spare.pop() if self.__spare else [0]
+                end = (tick // resolution + 1) * resolution
+            stop = int(entries.searchsorted(end << SHIFT))
+            self.__append(bucket, entries[start:stop])
+            start = stop
+
+    def __read(self) -> tuple:
+        # (tick, entries) of every non-empty slot and (block, entries) of every block in order, copied out
+        first = self.__tick // self.__resolution * self.__resolution
+        slots = [(first + position, bucket) for position, bucket in enumerate(self.__slots) if bucket[0] > 0]
+        blocks = sorted(self.__blocks.items())
+        return ([(tick, self.__copy(bucket, np.zeros(bucket[0], dtype=np.int64))) for tick, bucket in slots],
+                [(block, self.__copy(bucket, np.zeros(bucket[0], dtype=np.int64))) for block, bucket in blocks])
+
+    def __clear(self) -> None:
+        for bucket in self.__slots + list(self.__blocks.values()):
+            self.__release(bucket)
+        self.__spare.extend(self.__blocks.values())
+        self.__blocks = {}
+
+    def __refile(self, entries: np.ndarray) -> None:
+        if entries.size > 0:
+            batch = self.__reserve(entries.size)
+            np.copyto(batch, entries)
+            batch.sort()
+            self.__file(batch)
+
+    def get_snapshot(self) -> dict:
+        # each slot and block flattened into one array, a slot's order does not matter since pop sorts
+        slots, blocks = self.__read()
+        return {'resolution': self.__resolution, 'tick': self.__tick,
+                'slot_ticks': np.array([tick for tick, _ in slots], dtype=np.int64),
+                'slot_sizes': np.array([entries.size for _, entries in slots], dtype=np.int64),
+                'slot_indices': np.concatenate([entries & MASK for _, entries in slots] + [EMPTY]).astype(np.intp),
+                'block_keys': np.array([block for block, _ in blocks], dtype=np.int64),
+                'block_sizes': np.array([entries.size for _, entries in blocks], dtype=np.int64),
+                'block_indices': np.concatenate([entries & MASK for _, entries in blocks] + [EMPTY]).astype(np.intp),
+                'block_wakes': np.concatenate([entries >> SHIFT for _, entries in blocks] + [EMPTY]).astype(np.int64)}
+
+    def set_snapshot(self, snapshot: dict) -> None:
+        self.__clear()
+        if int(snapshot['resolution']) != self.__resolution:
+            self.__resolution = int(snapshot['resolution'])
+            self.__slots = [[0] for _ in range(self.__resolution)]
+        self.__tick = int(snapshot['tick'])
+        wakes = np.concatenate((np.repeat(np.asarray(snapshot['slot_ticks'], dtype=np.int64), snapshot['slot_sizes']),
+                                np.asarray(snapshot['block_wakes'], dtype=np.int64)))
+        indices = np.concatenate((np.asarray(snapshot['slot_indices'], dtype=np.int64),
+                                  np.asarray(snapshot['block_indices'], dtype=np.int64)))
+        self.__refile(np.left_shift(np.maximum(wakes, self.__tick), SHIFT) | indices)
+
+    def remap(self, mapping: np.ndarray) -> None:
+        # renumber every scheduled agent through mapping, agents mapped to -1 are dropped
+        slots, blocks = self.__read()
+        entries = np.concatenate([entries for _, entries in slots + blocks] + [np.zeros(0, dtype=np.int64)])
+        self.__clear()
+        indices = mapping[entries & MASK]
+        keep = indices >= 0
+        self.__refile(np.left_shift(np.right_shift(entries[keep], SHIFT), SHIFT) | indices[keep])
+
+    def schedule(self, indices, wake_ticks) -> None:
+        indices = np.asarray(indices, dtype=np.intp)
+        if indices.size == 0:
+            return
+        entries = self.__reserve(indices.size)
+        np.maximum(np.asarray(wake_ticks), self.__tick, out=entries, casting='unsafe')
+        np.left_shift(entries, SHIFT, out=entries)
+        np.bitwise_or(entries, indices, out=entries)
+        entries.sort()
+        self.__file(entries)
+
+    def pop(self) -> np.ndarray:
+        # indices of the traders waking at the current tick, then advance the clock by one tick; the result
+        # is a view of a calendar buffer, valid until the next pop
+        if self.__tick % self.__resolution == 0:
+            bucket = self.__blocks.pop(self.__tick // self.__resolution, None)
+            if bucket is not None:
+                entries = self.__copy(bucket, self.__reserve(bucket[0]))
+                self.__release(bucket)
+                self.__spare.append(bucket)
+                entries.sort()
+                self.__file(entries)
+        bucket = self.__slots[self.__tick % self.__resolution]
+        self.__tick += 1
+        if bucket[0] == 0:
+            return EMPTY
+        self.__out = grown(self.__out, bucket[0])
+        indices = self.__copy(bucket, self.__out)
+        self.__release(bucket)
+        indices.sort()
+        np.bitwise_and(indices, MASK, out=indices)
+        return indices
@@ -0,0 +1,156 @@
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+from market import Node, DAY_TICK, PRICE_SENSITIVITY, START_MARKET_DEPTH
+from streams import spawn_seeds
+from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+
+SOURCES = ('noise', 'momentum', 'value')
+POPULATIONS = (NoiseTrader, MomentumTrader, ValueInvestors)
+STOP = -1
+# seconds the coordinator waits at a barrier for a shard that is alive but stuck
+TIMEOUT = 60.0
+
+# shared block layout, all 8 byte slots:
+#   [0]                      generation: tick number the coordinator has published, STOP to shut down
+#   [1], [2]                 current price and basic value (float64)
+#   [3 : 3 + workers]        generation each shard has finished
+#   [3 + workers : ...]      per shard, per source buy and sell flow (int64)
+# the block is plain memory without atomics; every handoff goes through the start and finish barriers,
+# whose semaphores order the stores before them ahead of the loads after them on any CPU, so a shard
+# never sees a new generation next to an old price, and the coordinator never reads half-written flow
+def layout(workers: int) -> dict:
+    return {'generation': 0, 'price': 1, 'value': 2, 'done': 3, 'flow': 3 + workers,
+            'size': 3 + workers + workers * len(SOURCES) * 2}
+
+def run_shard(shard: int, workers: int, name: str, specs: list, start, finish) -> None:
+    # the block is created by the coordinator, whose resource tracker the shards share
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        slots = layout(workers)
+        words = np.ndarray(slots['size'], dtype=np.int64, buffer=block.buf)
+        floats = np.ndarray(slots['size'], dtype=np.float64, buffer=block.buf)
+        flow = words[slots['flow']:].reshape(workers, len(SOURCES), 2)[shard]
+        populations = [(source, POPULATIONS[SOURCES.index(source)](size, seed=seed), source == 'value')
+                       for source, size, seed in specs]
+        while True:
+            start.wait()
+            generation = int(words[slots['generation']])
+            if generation == STOP:
+                break
+            current_price = float(floats[slots['price']])
+            basic_value = float(floats[slots['value']])
+            flow.fill(0)
+            for source, population, valued in populations:
+                if valued:
+                    buy_amount, sell_amount = population.tick_decision(current_price, basic_value)
+                else:
+                    buy_amount, sell_amount = population.tick_decision(current_price)
+                row = flow[SOURCES.index(source)]
+                row[0] += buy_amount
+                row[1] += sell_amount
+            words[slots['done'] + shard] = generation
+            finish.wait()
+        del words, floats, flow
+    finally:
+        block.close()
+
+class ShardedSimulation:
+    def __init__(self, noise: int = 500, momentum: int = 200, value: int = 300, seed=None, workers: int = 4,
+                 day_tick: int = DAY_TICK, price_sensitivity: float = PRICE_SENSITIVITY,
+                 start_market_depth: float = START_MARKET_DEPTH, recorder=None) -> None:
+        # every population is split into one chunk per shard exactly as Simulation(chunks=workers) does,
+        # so both produce the same prices
+        node_seed, noise_seed, momentum_seed, value_seed = spawn_seeds(seed, 4)
+        self.__workers = int(workers)
+        self.__day_tick = int(day_tick)
+        self.__tick = 0
+        self.__node = Node(seed=node_seed, day_tick=day_tick,
+                           price_sensitivity=price_sensitivity, start_market_depth=start_market_depth)
+        if recorder is not None:
+            self.__node.subscribe(recorder)
+        self.__recorder = recorder
+        specs = [[] for _ in range(self.__workers)]
+        for source, size, population_seed in zip(SOURCES, (noise, momentum, value), (noise_seed, momentum_seed, value_seed)):
+            sizes = [size // self.__workers + (1 if shard < size % self.__workers else 0) for shard in range(self.__workers)]
+            seeds = [population_seed] if self.__workers == 1 else spawn_seeds(population_seed, self.__workers)
+            for shard in range(self.__workers):
+                specs[shard].append((source, sizes[shard], seeds[shard]))
+        self.__slots = layout(self.__workers)
+        # the coordinator is the extra party of both barriers
+        self.__start = multiprocessing.Barrier(self.__workers + 1)
+        self.__finish = multiprocessing.Barrier(self.__workers + 1)
+        self.__block = shared_memory.SharedMemory(create=True, size=self.__slots['size'] * 8)
+        self.__words = np.ndarray(self.__slots['size'], dtype=np.int64, buffer=self.__block.buf)
+        self.__floats = np.ndarray(self.__slots['size'], dtype=np.float64, buffer=self.__block.buf)
+        self.__words.fill(0)
+        self.__done = self.__words[self.__slots['done']:self.__slots['done'] + self.__workers]
+        self.__flow = self.__words[self.__slots['flow']:].reshape(self.__workers, len(SOURCES), 2)
+        self.__processes = [multiprocessing.Process(target=run_shard, args=(shard, self.__workers, self.__block.name, specs[shard],
+                                                                                     self.__start, self.__finish),
+                                                    name='shard-%d' % shard, daemon=True) for shard in range(self.__workers)]
+        for process in self.__processes:
+            process.start()
+
+    def get_node(self) -> Node:
+        return self.__node
+
+    def get_tick(self) -> int:
+        return self.__tick
+
+    def get_workers(self) -> int:
+        return self.__workers
+
+    def step(self) -> None:
+        self.__tick += 1
+        if self.__tick % self.__day_tick == 0:
+            self.__node.day_update()
+        # broadcast the price, release the shards, then reduce their flow in shard order
+        self.__floats[self.__slots['price']] = self.__node.get_current_price()
+        self.__floats[self.__slots['value']] = self.__node.get_basic_value()
+        self.__words[self.__slots['generation']] = self.__tick
+        if not all(process.is_alive() for process in self.__processes):
+            self.__start.abort()
+        self.__wait(self.__start)
+        self.__wait(self.__finish)
+        if not (self.__done == self.__tick).all():
+            raise RuntimeError('a shard passed the barrier without finishing tick %d' % self.__tick)
+        totals = self.__flow.sum(axis=0)
+        for source, (buy_amount, sell_amount) in zip(SOURCES, totals.tolist()):
+            self.__node.clinch(buy_amount, source)
+            self.__node.clinch(sell_amount, source)
+        self.__node.tick_update(self.__tick)
+
+    def __wait(self, barrier) -> None:
+        try:
+            barrier.wait(TIMEOUT)
+        except threading.BrokenBarrierError:
+            dead = [shard for shard, process in enumerate(self.__processes) if not process.is_alive()]
+            raise RuntimeError('shards %s exited before finishing tick %d' % (dead, self.__tick) if dead
+                               else 'shards did not finish tick %d within %.0fs' % (self.__tick, TIMEOUT)) from None
+
+    def run(self, ticks: int) -> None:
+        for _ in range(ticks):
+            self.step()
+
+    def close(self) -> None:
+        if self.__block is None:
+            return
+        self.__words[self.__slots['generation']] = STOP
+        # a dead shard or a failed tick leaves the barriers unusable; aborting them wakes whoever still waits
+        try:
+            if not all(process.is_alive() for process in self.__processes):
+                raise threading.BrokenBarrierError
+            self.__start.wait(TIMEOUT)
+        except threading.BrokenBarrierError:
+            self.__start.abort()
+            self.__finish.abort()
+        for process in self.__processes:
+            process.join()
+        if self.__recorder is not None:
+            self.__recorder.close()
+        del self.__words, self.__floats, self.__done, self.__flow
+        self.__block.close()
+        self.__block.unlink()
+        self.__block = None
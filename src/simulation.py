@@ -0,0 +1,205 @@
+from concurrent.futures import ThreadPoolExecutor
+from accounting import Accounting
+from churn import Churn
+from orderbook import OrderBook, MarketMaker
+from market import Node, DAY_TICK, PRICE_SENSITIVITY, START_MARKET_DEPTH
+from streams import spawn_seeds
+from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+
+def split_population(population, size: int, chunks: int, seed, arrivals: float = None, churn_seed=None, ledger=None) -> list:
+    # one population, or chunks independent ones with spawned seeds whose sizes add up to size;
+    # with arrivals every chunk gets its own Churn and an even share of the daily arrivals, with ledger
+    # (a callable) its own Ledger
+    churn_seeds = spawn_seeds(churn_seed, max(chunks, 1)) if arrivals is not None else None
+    def build(chunk_size: int, chunk_seed, chunk: int):
+        options = {}
+        if arrivals is not None:
+            options['churn'] = Churn(arrivals / max(chunks, 1), seed=churn_seeds[chunk])
+        if ledger is not None:
+            options['ledger'] = ledger()
+        return population(chunk_size, seed=chunk_seed, **options)
+    if chunks <= 1:
+        return [build(size, seed, 0)]
+    sizes = [size // chunks + (1 if chunk < size % chunks else 0) for chunk in range(chunks)]
+    return [build(chunk_size, chunk_seed, chunk)
+            for chunk, (chunk_size, chunk_seed) in enumerate(zip(sizes, spawn_seeds(seed, chunks)))]
+
+class Simulation:
+    def __init__(self, noise: int = 500, momentum: int = 200, value: int = 300, seed=None,
+                 day_tick: int = DAY_TICK, price_sensitivity: float = PRICE_SENSITIVITY,
+                 start_market_depth: float = START_MARKET_DEPTH, recorder=None, profiler=None,
+                 workers: int = 0, chunks: int = 1, order_book: bool = False, analytics=None,
+                 checkpointer=None, populations=(), churn=None, feed=None, accounting=None) -> None:
+        # what it takes to rebuild the same populations before a snapshot is restored into them
+        self.__config = {'noise': noise, 'momentum': momentum, 'value': value,
+                         'seed': seed if isinstance(seed, int) else None, 'day_tick': day_tick,
+                         'price_sensitivity': price_sensitivity, 'start_market_depth': start_market_depth, 'chunks': chunks,
+                         'accounting': accounting is not None}
+        # accounting=True stands for a default Accounting, so a checkpoint's config can rebuild the ledger columns
+        accounting = Accounting() if accounting is True else accounting or None
+        # churn maps a built-in source to its expected arrivals per day, its seeds come after the original four
+        churn = churn or {}
+        node_seed, noise_seed, momentum_seed, value_seed, churn_seed = spawn_seeds(seed, 5)
+        churn_seeds = dict(zip(('noise', 'momentum', 'value'), spawn_seeds(churn_seed, 3)))
+        self.__day_tick = int(day_tick)
+        self.__tick = 0
+        if order_book and workers > 0:
+            raise ValueError('an order book fills the populations in list order, it cannot take workers')
+        book = OrderBook() if order_book else None
+        self.__book = book
+        self.__node = Node(seed=node_seed, day_tick=day_tick, price_sensitivity=price_sensitivity,
+                           start_market_depth=start_market_depth, book=book)
+        if book is not None:
+            # the market maker re-quotes first thing in every tick_update, after the flow has hit the book
+            self.__node.subscribe(MarketMaker(book))
+        # (source, population, takes basic value) in the fixed order their flow is clinched
+        self.__populations = []
+        for source, population, size, population_seed in (('noise', NoiseTrader, noise, noise_seed),
+                                                          ('momentum', MomentumTrader, momentum, momentum_seed),
+                                                          ('value', ValueInvestors, value, value_seed)):
+            ledger = None if accounting is None else (lambda source=source: accounting.create(source))
+            for chunk in split_population(population, size, chunks, population_seed, churn.get(source), churn_seeds[source], ledger):
+                self.__populations.append((source, chunk, population is ValueInvestors))
+        # plugin populations (population.Population) come after the built-in ones and always get the basic value
+        for source, population in populations:
+            self.__populations.append((source, population, True))
+        # retirements happen inside tick_decision, compaction and arrivals at the day boundary
+        if book is not None:
+            # each trader's order hits the book on its own and is settled against its own fills, Node.fill
+            # counts the flow so nothing is clinched afterwards
+            node = self.__node
+            for source, population, _ in self.__populations:
+                population.set_fill(lambda orders, budgets, source=source: node.fill(orders, source, budgets))
+        self.__churns = [population.get_churn() for _, population, _ in self.__populations if population.get_churn() is not None]
+        for population_churn in self.__churns:
+            self.__node.subscribe(population_churn)
+        # plugin populations bring their own ledger from accounting.create; the accounting listener comes
+        # after churn so arrivals are valued at the close they arrive on
+        self.__accounting = accounting
+        if accounting is not None:
+            accounting.open(self.__node)
+            self.__node.subscribe(accounting)
+        self.__executor = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+        self.__recorder = recorder
+        if recorder is not None:
+            self.__node.subscribe(recorder)
+        self.__analytics = analytics
+        self.__checkpointer = checkpointer
+        if analytics is not None:
+            self.__node.subscribe(analytics)
+        self.__feed = feed
+        if feed is not None:
+            self.__node.subscribe(feed)
+        self.__profiler = profiler
+        if profiler is not None:
+            # the instrumented step replaces step outright, so a run without a profiler pays nothing
+            for index, (source, population, _) in enumerate(self.__populations):
+                population.set_profiler(profiler, source if chunks == 1 else '%s.%d' % (source, index % chunks))
+            self.step = self.__profiled_step
+
+    def get_node(self) -> Node:
+        return self.__node
+
+    def get_tick(self) -> int:
+        return self.__tick
+
+    def get_accounting(self):
+        return self.__accounting
+
+    def get_churn_counts(self) -> dict:
+        # live and total slots, retirements, arrivals and compactions added up per source
+        counts = {}
+        for source, population, _ in self.__populations:
+            if population.get_churn() is None:
+                continue
+            totals = counts.setdefault(source, {})
+            for name, count in population.get_churn().get_counts().items():
+                totals[name] = totals.get(name, 0) + count
+        return counts
+
+    def __decide(self) -> None:
+        # populations only read the price, so they may run concurrently; flow is clinched in list order
+        current_price = self.__node.get_current_price()
+        basic_value = self.__node.get_basic_value()
+        if self.__executor is None:
+            for source, population, valued in self.__populations:
+                if valued:
+                    buy_amount, sell_amount = population.tick_decision(current_price, basic_value)
+                else:
+                    buy_amount, sell_amount = population.tick_decision(current_price)
+                if self.__book is None:
+                    self.__node.clinch(buy_amount, source)
+                    self.__node.clinch(sell_amount, source)
+            return
+        futures = [self.__executor.submit(population.tick_decision, current_price, basic_value) if valued
+                   else self.__executor.submit(population.tick_decision, current_price)
+                   for _, population, valued in self.__populations]
+        for (source, _, _), future in zip(self.__populations, futures):
+            buy_amount, sell_amount = future.result()
+            self.__node.clinch(buy_amount, source)
+            self.__node.clinch(sell_amount, source)
+
+    def step(self) -> None:
+        # one tick of the main.py loop, closing the day first on day boundaries
+        self.__tick += 1
+        if self.__tick % self.__day_tick == 0:
+            self.__node.day_update()
+        self.__decide()
+        self.__node.tick_update(self.__tick)
+
+    def __profiled_step(self) -> None:
+        profiler = self.__profiler
+        self.__tick += 1
+        if self.__tick % self.__day_tick == 0:
+            started = profiler.clock()
+            self.__node.day_update()
+            profiler.lap('day_update', started)
+            profiler.end_day(self.__tick // self.__day_tick)
+        self.__decide()
+        started = profiler.clock()
+        self.__node.tick_update(self.__tick)
+        profiler.lap('tick_update', started)
+        profiler.tick()
+
+    def get_snapshot(self) -> dict:
+        # copies of every array, so the run can go on while a checkpoint is written
+        if self.__churns:
+            raise ValueError('a simulation with churn cannot be checkpointed')
+        return {'config': dict(self.__config), 'tick': self.__tick, 'node': self.__node.get_snapshot(),
+                'populations': [population.get_snapshot() for _, population, _ in self.__populations]}
+
+    def set_snapshot(self, snapshot: dict) -> None:
+        if len(snapshot['populations']) != len(self.__populations):
+            raise ValueError('snapshot has %d populations, the simulation %d' % (len(snapshot['populations']), len(self.__populations)))
+        self.__tick = int(snapshot['tick'])
+        self.__node.set_snapshot(snapshot['node'])
+        for (_, population, _), population_snapshot in zip(self.__populations, snapshot['populations']):
+            population.set_snapshot(population_snapshot)
+
+    def run(self, ticks: int) -> None:
+        if self.__checkpointer is None:
+            for _ in range(ticks):
+                self.step()
+            return
+        every = self.__checkpointer.get_every()
+        for _ in range(ticks):
+            self.step()
+            if self.__tick % every == 0:
+                self.__checkpointer.save(self.get_snapshot(), self.__tick)
+
+    def close(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+        if self.__recorder is not None:
+            self.__recorder.close()
+        if self.__checkpointer is not None:
+            self.__checkpointer.close()
+        if self.__analytics is not None:
+            self.__analytics.close()
+        if self.__feed is not None:
+            self.__feed.close()
+        if self.__accounting is not None:
+            self.__accounting.close()
+        if self.__profiler is not None:
+            self.__profiler.close()
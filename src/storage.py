@@ -0,0 +1,102 @@
+import numpy as np
+
+# bytes per agent of the trader state itself, one contiguous column per field:
+#   field           PRECISE   COMPACT
+#   cash            8         8        money stays float64 so settlement keeps cent accuracy
+#   positions       4         4
+#   decision_time   4         2        at most 359 ticks
+#   judge_coef      8         4        drawn from narrow uniform ranges, float32 keeps ~7 digits
+#   risk_coef       8         4
+#   asset           4         2        followed asset of the multi-asset momentum traders
+# noise 12/12, momentum 32/22, value 20/16. kernel scratch comes on top (8 bytes per float buffer, 1 per
+# mask, 8 per index buffer: noise 84, momentum 165, value 100) plus the 8 byte staging column, so measured
+# totals at 10^6 agents are about 114/114, 223/213 and 144/140 bytes, see benchmark.measure_bytes_per_agent.
+# a population with a ledger (accounting.LEDGER_FIELDS) adds 44 bytes per agent in both layouts.
+PRECISE = {
+    'cash': np.float64,
+    'positions': np.int32,
+    'decision_time': np.int32,
+    'judge_coef': np.float64,
+    'risk_coef': np.float64,
+    'asset': np.int32,
+    'cost_basis': np.float64,
+    'realized': np.float64,
+    'volume': np.float64,
+    'trades': np.int32,
+    'peak': np.float64,
+    'drawdown': np.float64,
+}
+COMPACT = dict(PRECISE, decision_time=np.int16, judge_coef=np.float32, risk_coef=np.float32, asset=np.int16)
+
+class TraderState:
+    def __init__(self, fields: tuple, n: int, replicas: int = 1, dtypes: dict = None) -> None:
+        # one contiguous array per field, replica-major, and one shared staging column for narrow fields
+        dtypes = PRECISE if dtypes is None else dict(PRECISE, **dtypes)
+        self.__n = int(n)
+        self.__replicas = int(replicas)
+        self.__size = self.__n * self.__replicas
+        self.__columns = {name: np.zeros(self.__size, dtype=dtypes[name]) for name in fields}
+        self.__staging = np.zeros(max(self.__size, 1) * 8, dtype=np.uint8)
+
+    def get_fields(self) -> tuple:
+        return tuple(self.__columns)
+
+    def get_size(self) -> int:
+        return self.__size
+
+    def get_dtype(self, name: str) -> np.dtype:
+        return self.__columns[name].dtype
+
+    def get_column(self, name: str) -> np.ndarray:
+        return self.__columns[name]
+
+    def get_matrix(self, name: str) -> np.ndarray:
+        return self.__columns[name].reshape(self.__replicas, self.__n)
+
+    def __staged(self, name: str, k: int) -> np.ndarray:
+        dtype = self.__columns[name].dtype
+        return self.__staging[:k * dtype.itemsize].view(dtype)
+
+    def gather(self, name: str, active_traders: np.ndarray, out: np.ndarray) -> np.ndarray:
+        # widen into a float64 or intp kernel buffer, going through staging when the dtypes differ
+        column = self.__columns[name]
+        if column.dtype == out.dtype:
+            return np.take(column, active_traders, out=out, mode='clip')
+        staged = np.take(column, active_traders, out=self.__staged(name, active_traders.size), mode='clip')
+        np.copyto(out, staged, casting='unsafe')
+        return out
+
+    def scatter(self, name: str, active_traders: np.ndarray, values: np.ndarray) -> None:
+        column = self.__columns[name]
+        if column.dtype != values.dtype:
+            staged = self.__staged(name, active_traders.size)
+            np.copyto(staged, values, casting='unsafe')
+            values = staged
+        column[active_traders] = values
+
+    def resize(self, size: int) -> None:
+        # single market only: columns keep their leading values and grow with zeros
+        if self.__replicas != 1:
+            raise ValueError('only a single-market state can be resized')
+        size = int(size)
+        for name, column in self.__columns.items():
+            resized = np.zeros(size, dtype=column.dtype)
+            resized[:min(size, self.__size)] = column[:size]
+            self.__columns[name] = resized
+        self.__n = self.__size = size
+        self.__staging = np.zeros(max(size, 1) * 8, dtype=np.uint8)
+
+    def get_snapshot(self) -> dict:
+        return {name: column.copy() for name, column in self.__columns.items()}
+
+    def set_snapshot(self, snapshot: dict) -> None:
+        for name, column in self.__columns.items():
+            if snapshot[name].shape != column.shape:
+                raise ValueError('%s snapshot of shape %s does not fit %s' % (name, snapshot[name].shape, column.shape))
+            column[:] = snapshot[name]
+
+    def get_bytes_per_agent(self) -> int:
+        return sum(column.dtype.itemsize for column in self.__columns.values())
+
+    def get_nbytes(self) -> int:
+        return sum(column.nbytes for column in self.__columns.values()) + self.__staging.nbytes
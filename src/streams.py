@@ -0,0 +1,98 @@
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 65536
+
+def spawn_seeds(seed, count: int) -> list:
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(count)
+
+class RandomStream:
+    def __init__(self, seed=None, block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+        # variates are drawn a block at a time and handed out through a cursor, so a tick only copies
+        self.__generator = np.random.default_rng(seed)
+        self.__block_size = int(block_size)
+        self.__blocks = {}
+        self.__cursors = {}
+        for name in ('random', 'standard_exponential', 'standard_normal'):
+            self.__blocks[name] = np.zeros(self.__block_size, dtype=np.float64)
+            self.__cursors[name] = self.__block_size
+
+    def get_generator(self) -> np.random.Generator:
+        return self.__generator
+
+    def get_snapshot(self) -> dict:
+        # the bit generator state plus the unread rest of every block, so a restored stream hands out the same variates
+        return {'state': self.__generator.bit_generator.state, 'cursors': dict(self.__cursors),
+                'blocks': {name: block.copy() for name, block in self.__blocks.items()}}
+
+    def set_snapshot(self, snapshot: dict) -> None:
+        self.__generator.bit_generator.state = snapshot['state']
+        self.__cursors = dict(snapshot['cursors'])
+        self.__blocks = {name: np.array(block, dtype=np.float64) for name, block in snapshot['blocks'].items()}
+
+    def __refill(self, name: str, size: int) -> None:
+        if size > self.__blocks[name].size:
+            self.__blocks[name] = np.zeros(size, dtype=np.float64)
+        getattr(self.__generator, name)(out=self.__blocks[name])
+        self.__cursors[name] = 0
+
+    def __draw(self, name: str, out):
+        if out is None:
+            if self.__cursors[name] >= self.__blocks[name].size:
+                self.__refill(name, 1)
+            self.__cursors[name] += 1
+            return float(self.__blocks[name][self.__cursors[name] - 1])
+        filled = 0
+        while filled < out.size:
+            block, cursor = self.__blocks[name], self.__cursors[name]
+            if cursor >= block.size:
+                self.__refill(name, out.size - filled)
+                continue
+            count = min(out.size - filled, block.size - cursor)
+            np.copyto(out[filled:filled + count], block[cursor:cursor + count])
+            self.__cursors[name] = cursor + count
+            filled += count
+        return out
+
+    def random(self, out=None):
+        return self.__draw('random', out)
+
+    def standard_exponential(self, out=None):
+        return self.__draw('standard_exponential', out)
+
+    def standard_normal(self, out=None):
+        return self.__draw('standard_normal', out)
+
+class CounterStream:
+    def __init__(self, seed=None) -> None:
+        # stateless variates keyed by (agent, counter): an agent's n-th draw is the same whatever is drawn
+        # around it and in whatever order, the counter-based counterpart of RandomStream
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.__key = seed.generate_state(1, np.uint64)[0]
+
+    def __mix(self, agents: np.ndarray, counters: np.ndarray) -> np.ndarray:
+        # splitmix64 finalizer over key, agent and counter; uint64 arithmetic wraps
+        x = np.multiply(np.asarray(agents, dtype=np.uint64), np.uint64(0x9E3779B97F4A7C15))
+        x ^= np.multiply(np.asarray(counters, dtype=np.uint64), np.uint64(0xD1B54A32D192ED03))
+        x ^= self.__key
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+        return x
+
+    def random(self, agents: np.ndarray, counters: np.ndarray) -> np.ndarray:
+        # 53 bit uniforms on [0, 1)
+        return (self.__mix(agents, counters) >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+    def standard_exponential(self, agents: np.ndarray, counters: np.ndarray) -> np.ndarray:
+        return -np.log1p(-self.random(agents, counters))
+
+    def standard_normal(self, agents: np.ndarray, counters: np.ndarray) -> np.ndarray:
+        # Box-Muller, the second uniform comes from the counter with its top bit set
+        counters = np.asarray(counters, dtype=np.uint64)
+        radius = np.sqrt(-2.0 * np.log1p(-self.random(agents, counters)))
+        return radius * np.cos(2.0 * np.pi * self.random(agents, counters | np.uint64(1 << 63)))
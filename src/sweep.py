@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from market import DAY_TICK
+from simulation import Simulation
+
+BLOWUP_RATIO = 3.0
+CHECK_INTERVAL = 600
+
+def grid_design(replicates: int = 1, **axes) -> list:
+    names = sorted(axes)
+    design = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        for replicate in range(replicates):
+            design.append(dict(zip(names, values), replicate=replicate))
+    return design
+
+def random_design(count: int, seed: int = 0, integers=('noise', 'momentum', 'value'), **ranges) -> list:
+    generator = np.random.default_rng(seed)
+    design = []
+    for replicate in range(count):
+        params = {'replicate': replicate}
+        for name in sorted(ranges):
+            low, high = ranges[name]
+            params[name] = int(generator.integers(low, high + 1)) if name in integers else float(generator.uniform(low, high))
+        design.append(params)
+    return design
+
+def get_run_id(params: dict, ticks: int = None, seed: int = None) -> str:
+    # params alone name the design point (and seed its simulation); with the horizon and the base seed they
+    # name one run, so a resume with either changed recomputes instead of reusing the old results
+    payload = params if ticks is None and seed is None else {'params': params, 'ticks': ticks, 'seed': seed}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:12]
+
+def run_one(run: dict) -> dict:
+    # one sweep point, stopped early once the price leaves [start / BLOWUP_RATIO, start * BLOWUP_RATIO]
+    params = dict(run['params'])
+    params.pop('replicate', None)
+    simulation = Simulation(seed=run['seed'], **params)
+    node = simulation.get_node()
+    start_price = previous = node.get_current_price()
+    count, mean, m2, low, high = 0, 0.0, 0.0, start_price, start_price
+    status = 'completed'
+    started = time.perf_counter()
+    for tick in range(1, run['ticks'] + 1):
+        simulation.step()
+        price = node.get_current_price()
+        if not math.isfinite(price) or price <= 0.0:
+            status = 'blown_up'
+            break
+        # Welford update of the tick log return moments
+        value = math.log(price / previous)
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+        low, high, previous = min(low, price), max(high, price), price
+        if tick % CHECK_INTERVAL == 0 and not (start_price / BLOWUP_RATIO < price < start_price * BLOWUP_RATIO):
+            status = 'blown_up'
+            break
+    return {
+        'run_id': run['run_id'],
+        'params': run['params'],
+        'horizon': run['ticks'],
+        'seed': run['seed'][0],
+        'status': status,
+        'ticks': simulation.get_tick(),
+        'final_price': previous,
+        'low': low,
+        'high': high,
+        'mean_return': mean,
+        'volatility': math.sqrt(m2 / count) if count > 0 else 0.0,
+        'seconds': time.perf_counter() - started,
+    }
+
+def load_results(path: str) -> dict:
+    results = {}
+    if os.path.exists(path):
+        with open(path) as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    result = json.loads(line)
+                    results[result['run_id']] = result
+    return results
+
+def run_sweep(design: list, ticks: int, path: str, workers: int = None, seed: int = 0):
+    # yields summaries as runs finish and appends them to path, skipping runs already recorded there
+    done = load_results(path)
+    runs = []
+    for params in design:
+        run_id = get_run_id(params, ticks, seed)
+        if run_id in done:
+            continue
+        runs.append({'run_id': run_id, 'params': params, 'ticks': ticks,
+                     'seed': [seed, int(get_run_id(params), 16)]})
+    with open(path, 'a') as file, ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_one, run) for run in runs]
+        for future in as_completed(futures):
+            result = future.result()
+            file.write(json.dumps(result) + '\n')
+            file.flush()
+            yield result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sweep NT/MT/VI population sizes and market constants')
+    parser.add_argument('--output', default='sweep.jsonl')
+    parser.add_argument('--days', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--random', type=int, default=0, help='number of random design points instead of the grid')
+    parser.add_argument('--replicates', type=int, default=1)
+    args = parser.parse_args()
+    if args.random > 0:
+        design = random_design(args.random, args.seed, noise=(100, 1000), momentum=(0, 600), value=(0, 600),
+                               price_sensitivity=(0.0005, 0.002), start_market_depth=(500, 2000))
+    else:
+        design = grid_design(args.replicates, noise=[250, 500, 1000], momentum=[0, 200, 400], value=[0, 300, 600],
+                             price_sensitivity=[0.001], start_market_depth=[1000])
+    for result in run_sweep(design, int(args.days * DAY_TICK), args.output, args.workers, args.seed):
+        print("%s %-9s ticks=%-7d price=%.4f vol=%.2e %s" % (result['run_id'], result['status'], result['ticks'],
+                                                              result['final_price'], result['volatility'], result['params']))
@@ -0,0 +1,23 @@
+import numpy as np
+from accounting import Accounting
+from simulation import Simulation
+
+def test_ledgers_leave_prices_alone():
+    plain = Simulation(seed=4, day_tick=200)
+    plain.run(500)
+    counted = Simulation(seed=4, day_tick=200, accounting=True)
+    counted.run(500)
+    assert np.array_equal(plain.get_node().get_tick_price_history(), counted.get_node().get_tick_price_history())
+    assert len(counted.get_accounting().get_days()) == 2
+
+def test_wealth_change_is_realized_plus_unrealized():
+    accounting = Accounting()
+    simulation = Simulation(5000, 2000, 3000, seed=4, day_tick=1000, accounting=accounting)
+    price = simulation.get_node().get_current_price()
+    opening = [ledger.get_state().get_column('cash') + ledger.get_state().get_column('positions') * price
+               for _, ledger in accounting.get_ledgers()]
+    simulation.run(600)
+    price = simulation.get_node().get_current_price()
+    for (_, ledger), wealth in zip(accounting.get_ledgers(), opening):
+        columns = ledger.mark(price)
+        assert np.allclose(columns['wealth'] - wealth, columns['realized'] + columns['unrealized'], rtol=0.0, atol=1e-6)
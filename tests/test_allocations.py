@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+import pytest
+from allocations import ALLOCATION_BUDGET, measure_tick_allocations
+
+@pytest.mark.parametrize('scale', [1, 20])
+def test_whole_tick_stays_within_budget(scale):
+    # the calendar included: the same constant budget at every population size, and after more ticks have run
+    peaks = measure_tick_allocations(500 * scale, 200 * scale, 300 * scale, 100, warmup=200)
+    assert max(peaks.values()) <= ALLOCATION_BUDGET
+    later = measure_tick_allocations(500 * scale, 200 * scale, 300 * scale, 100, warmup=2000)
+    assert max(later.values()) <= ALLOCATION_BUDGET
+
+def test_gate_imports_no_heavy_subsystems():
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+    loaded = subprocess.run([sys.executable, '-c', 'import sys, allocations; print(" ".join(sys.modules))'],
+                            cwd=src, capture_output=True, text=True, check=True).stdout.split()
+    assert not {'plotly', 'orderbook', 'sharded', 'trader', 'benchmark'} & set(loaded)
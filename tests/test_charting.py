@@ -0,0 +1,11 @@
+import numpy as np
+from charting import START_DATE, week_kline
+
+def test_week_kline_folds_days_into_calendar_weeks():
+    dates = START_DATE + np.arange(12).astype('timedelta64[D]')
+    days = {'open': np.arange(12.0), 'high': np.arange(12.0) + 1, 'low': np.arange(12.0) - 1, 'close': np.arange(12.0) + 0.5}
+    weeks = week_kline(days, dates)
+    # 2025-01-01 is a Wednesday, so the first week holds five days
+    assert weeks['time'].tolist() == [np.datetime64('2025-01-05').item(), np.datetime64('2025-01-12').item()]
+    assert weeks['open'].tolist() == [0.0, 5.0] and weeks['close'].tolist() == [4.5, 11.5]
+    assert weeks['high'].tolist() == [5.0, 12.0] and weeks['low'].tolist() == [-1.0, 4.0]
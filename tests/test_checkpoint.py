@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from checkpoint import Checkpointer, latest, read_snapshot, restore, write_snapshot
+from simulation import Simulation
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_restored_copy_steps_on_the_same_prices(tmp_path, compress):
+    simulation = Simulation(2000, 800, 1200, seed=11, day_tick=200, accounting=True)
+    simulation.run(300)
+    path = str(tmp_path / 'snapshot.ckpt')
+    write_snapshot(path, simulation.get_snapshot(), compress)
+    restored = Simulation(**read_snapshot(path)['config'])
+    restored.set_snapshot(read_snapshot(path))
+    simulation.run(250)
+    restored.run(250)
+    assert restored.get_tick() == simulation.get_tick()
+    assert np.array_equal(simulation.get_node().get_tick_price_history(), restored.get_node().get_tick_price_history())
+
+def test_checkpointer_keeps_the_latest(tmp_path):
+    directory = str(tmp_path)
+    checkpointed = Simulation(seed=3, day_tick=100, checkpointer=Checkpointer(directory, 50, keep=2))
+    checkpointed.run(260)
+    checkpointed.close()
+    restored = restore(latest(directory))
+    assert restored.get_tick() == 250
+    restored.run(50)
+    simulation = Simulation(seed=3, day_tick=100)
+    simulation.run(300)
+    assert np.array_equal(simulation.get_node().get_tick_price_history(), restored.get_node().get_tick_price_history())
@@ -0,0 +1,32 @@
+import json
+import urllib.request
+import numpy as np
+from feed import LiveFeed
+from simulation import Simulation
+
+def test_feed_leaves_prices_alone_and_serves_every_tick():
+    plain = Simulation(seed=9, day_tick=500)
+    plain.run(1200)
+    feed = LiveFeed(port=0, interval=0.01)
+    watched = Simulation(seed=9, day_tick=500, feed=feed)
+    watched.run(1200)
+    watched.close()
+    assert np.array_equal(plain.get_node().get_tick_price_history(), watched.get_node().get_tick_price_history())
+    status = feed.get_status()
+    assert status['published'] == 1200 and status['dropped'] == 0 and status['pending'] == 0
+    assert status['tick'] == 1200
+    bars = feed.get_bars(60)
+    assert len(bars['tick']) == 1200 // 60 + 1 and sum(bars['volume']) > 0
+
+def test_http_endpoints():
+    feed = LiveFeed(port=0, interval=0.01)
+    simulation = Simulation(seed=9, day_tick=500, feed=feed)
+    simulation.run(300)
+    url = 'http://%s:%d' % feed.get_address()
+    try:
+        status = json.loads(urllib.request.urlopen(url + '/status').read())
+        prices = json.loads(urllib.request.urlopen(url + '/prices?points=50').read())
+        assert status['published'] == 300
+        assert len(prices['price']) <= 50
+    finally:
+        simulation.close()
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from kernel import settle
+
+def reference_settle(cash: np.ndarray, positions: np.ndarray, orders: np.ndarray, current_price: float) -> tuple:
+    # one trader at a time: buy what the cash allows, sell no more than is held
+    buy_amount, sell_amount = 0, 0
+    for i in range(orders.size):
+        order = int(orders[i])
+        if order > 0 and cash[i] < order * current_price:
+            order = int(np.floor(cash[i] / current_price))
+        if order < 0 and positions[i] + order < 0:
+            order = -int(positions[i])
+        positions[i] += order
+        cash[i] -= order * current_price
+        orders[i] = order
+        buy_amount += max(order, 0)
+        sell_amount += min(order, 0)
+    return buy_amount, sell_amount
+
+@pytest.mark.parametrize('density', [0.0, 0.05, 1.0])
+def test_settle_matches_reference(density):
+    generator = np.random.default_rng(2025)
+    agents = 2000
+    cash = generator.uniform(0.0, 30000.0, agents)
+    positions = generator.integers(0, 300, agents).astype(np.float64)
+    expected_cash, expected_positions = cash.copy(), positions.copy()
+    cost, side = np.zeros(agents), np.zeros(agents, dtype=np.bool_)
+    clipped = np.zeros(agents, dtype=np.bool_)
+    for round in range(20):
+        price = 20.0 + round * 0.37
+        orders = generator.integers(-400, 400, agents).astype(np.float64)
+        orders[generator.random(agents) >= density] = 0
+        expected_orders = orders.astype(np.int64)
+        totals = settle(cash, positions, orders, price, cost, clipped, side)
+        assert totals == reference_settle(expected_cash, expected_positions, expected_orders, price)
+        assert np.array_equal(orders, expected_orders)
+        assert np.array_equal(positions, expected_positions)
+        assert np.allclose(cash, expected_cash, rtol=0.0, atol=1e-9)
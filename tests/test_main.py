@@ -0,0 +1,23 @@
+import json
+import numpy as np
+from checkpoint import latest, read_snapshot
+from main import build_simulation, load_scenario, main
+from simulation import Simulation
+
+def test_resume_continues_from_the_newest_checkpoint(tmp_path):
+    directory = str(tmp_path / 'checkpoints')
+    config = str(tmp_path / 'scenario.json')
+    with open(config, 'w') as file:
+        json.dump({'noise': 300, 'momentum': 100, 'value': 200, 'seed': 3, 'day_tick': 100, 'checkpoint': directory,
+                   'checkpoint_every': 50}, file)
+    # an interrupted run that got as far as its tick 250 checkpoint
+    assert main([config, '--ticks', '260', '--headless', '--quiet']) == 0
+    simulation, _ = build_simulation(load_scenario(config, resume=True))
+    assert simulation.get_tick() == 250
+    simulation.close()
+    assert main([config, '--ticks', '300', '--resume', '--headless', '--quiet']) == 0
+    resumed = read_snapshot(latest(directory))
+    uninterrupted = Simulation(300, 100, 200, seed=3, day_tick=100)
+    uninterrupted.run(300)
+    assert resumed['tick'] == 300
+    assert np.array_equal(resumed['node']['tick_price_history'], uninterrupted.get_node().get_tick_price_history())
@@ -0,0 +1,29 @@
+import numpy as np
+from multiasset import MarketSimulation, PortfolioMomentumTrader, PortfolioNoiseTrader
+
+def test_noise_traders_only_sell_assets_they_hold():
+    trader = PortfolioNoiseTrader(2000, 4, seed=1)
+    positions = trader.get_positions()
+    positions[:] = 0
+    positions[:, 2] = 100
+    buy_amount, sell_amount = trader.tick_decision(np.full(4, 35.0))
+    assert sell_amount[2] < 0 and np.all(sell_amount[[0, 1, 3]] == 0)
+    assert np.all(buy_amount > 0)
+
+def test_momentum_traders_trade_only_the_asset_they_follow():
+    trader = PortfolioMomentumTrader(1000, 4, seed=2)
+    start = trader.get_positions().copy()
+    generator = np.random.default_rng(0)
+    price = np.full(4, 35.0)
+    for _ in range(1500):
+        price *= 1 + generator.normal(0.0, 0.002, 4)
+        trader.tick_decision(price)
+    changed = trader.get_positions() != start
+    followed = trader.get_state().get_column('asset')
+    assert changed.any()
+    assert not np.delete(changed, followed + np.arange(1000) * 4).any()
+
+def test_market_simulation_runs_the_full_mix():
+    simulation = MarketSimulation(500, 300, assets=4, seed=1, day_tick=500)
+    simulation.run(1200)
+    assert np.all(np.isfinite(simulation.get_market().get_current_price()))
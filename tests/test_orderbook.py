@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from accounting import Accounting
+from kernel import settle_into
+from orderbook import BUY, SELL, OrderBook
+from simulation import Simulation
+from storage import TraderState
+
+def test_submit_reports_every_orders_own_fills():
+    book = OrderBook(start_price=10.0)
+    book.limit(SELL, 10.01, 5)
+    book.limit(SELL, 10.02, 5)
+    book.limit(BUY, 9.99, 4)
+    filled = np.full(4, np.nan)
+    paid = np.full(4, np.nan)
+    book.submit(np.array([3.0, 0.0, 4.0, -6.0]), None, None, filled, paid)
+    assert filled.tolist() == [3.0, 0.0, 4.0, -4.0]
+    assert np.allclose(paid, [3 * 10.01, 0.0, 2 * 10.01 + 2 * 10.02, -4 * 9.99])
+    assert np.isnan(book.get_best_bid()) and np.isclose(book.get_best_ask(), 10.02)
+
+def test_best_price_jumps_wide_gaps():
+    book = OrderBook(start_price=10.0)
+    book.limit(SELL, 10.01, 1)
+    book.limit(SELL, 900.0, 1)
+    book.limit(BUY, 9.99, 1)
+    book.limit(BUY, 0.05, 1)
+    book.market(BUY, 1)
+    book.market(SELL, 1)
+    assert np.isclose(book.get_best_ask(), 900.0) and np.isclose(book.get_best_bid(), 0.05)
+    book.market(BUY, 1)
+    book.market(SELL, 1)
+    assert np.isnan(book.get_best_ask()) and np.isnan(book.get_best_bid())
+
+def test_book_mode_settles_traders_against_the_book():
+    # whatever the traders gain the market maker gives up, share for share and cent for cent
+    accounting = Accounting()
+    simulation = Simulation(seed=3, day_tick=400, order_book=True, accounting=accounting)
+    states = [ledger.get_state() for _, ledger in accounting.get_ledgers()]
+    cash = sum(state.get_column('cash').sum() for state in states)
+    positions = sum(state.get_column('positions').sum() for state in states)
+    simulation.run(600)
+    book = simulation.get_node().get_book()
+    maker_positions, maker_cash = book.get_fills(-2)
+    assert sum(state.get_column('positions').sum() for state in states) - positions == -maker_positions
+    assert np.isclose(sum(state.get_column('cash').sum() for state in states) - cash, -maker_cash, rtol=0.0, atol=1e-4)
+    assert all(state.get_column('positions').min() >= 0 for state in states)
+    assert all(state.get_column('cash').min() >= 0 for state in states)
+
+def test_book_buys_stop_where_the_cash_runs_out():
+    # cash for 10 shares at the last price, but the book only has 5 there: the rest is bought a level up
+    # while the cash lasts, and cancelled after that
+    book = OrderBook(start_price=10.0)
+    book.limit(SELL, 10.0, 5)
+    book.limit(SELL, 10.5, 10)
+    state = TraderState(('cash', 'positions'), 2)
+    state.get_column('cash')[:] = [100.0, 100.0]
+    filled, paid = np.zeros(2), np.zeros(2)
+    def fill(orders, budgets):
+        book.submit(orders, None, None, filled, paid, budgets)
+        return filled, paid
+    traders = np.arange(2)
+    cash, positions, orders = np.array([100.0, 100.0]), np.zeros(2), np.array([10.0, 0.0])
+    cost, clipped, side = np.zeros(2), np.zeros(2, dtype=np.bool_), np.zeros(2, dtype=np.bool_)
+    assert settle_into(state, traders, cash, positions, orders, 10.0, cost, clipped, side, fill=fill) == (9, 0)
+    assert orders.tolist() == [9.0, 0.0] and positions.tolist() == [9.0, 0.0]
+    assert np.isclose(cash[0], 100.0 - 5 * 10.0 - 4 * 10.5) and cash[1] == 100.0
+    assert np.isclose(book.get_best_ask(), 10.5) and book.get_volume(SELL, 10.5) == 6
+    assert book.get_resting() == 1
+
+def test_book_mode_refuses_workers():
+    with pytest.raises(ValueError):
+        Simulation(seed=3, order_book=True, workers=2)
@@ -0,0 +1,71 @@
+import hashlib
+import numpy as np
+import pytest
+from allocations import run_ticks
+from hft import MeanReversionHFT
+from kernel import liquidate
+from market import Node, ReplicaNode
+from population import Population, Strategy
+from simulation import Simulation
+from storage import COMPACT
+from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+
+# sha1 prefixes of the price paths (and, off the Simulation, every state column) the built-in traders
+# produced before they ran as Strategy subclasses on Population
+BEFORE = {'plain': 'd7cc0050fd41e8d3', 'churn': '87cf47073785b758', 'book': '837aac2efad1620a',
+          'replicas': '3ef3e94d321d4859', 'compact': '4a2c1a5324a932f0'}
+
+def digest(*arrays) -> str:
+    hashed = hashlib.sha1()
+    for array in arrays:
+        hashed.update(np.ascontiguousarray(array).tobytes())
+    return hashed.hexdigest()[:16]
+
+def simulated(ticks: int, **options) -> str:
+    simulation = Simulation(seed=11, day_tick=300, **options)
+    simulation.run(ticks)
+    return digest(simulation.get_node().get_tick_price_history())
+
+def traded(node, populations: list, history) -> str:
+    run_ticks(node, *populations, 1500)
+    return digest(history(node), *[population.get_state().get_column(name)
+                                   for population in populations for name in population.get_state().get_fields()])
+
+def test_strategy_needs_a_signal():
+    class Silent(Strategy):
+        name = 'silent'
+    with pytest.raises(TypeError):
+        Silent()
+
+def test_bankrupt_agents_sell_twice_the_shortfall():
+    cash = np.array([500.0, 999.0, 5000.0])
+    orders = np.array([10.0, 0.0, 7.0])
+    bankrupt = np.zeros(3, dtype=np.bool_)
+    liquidate(cash, orders, 10.0, 1000.0, bankrupt, np.zeros(3))
+    assert bankrupt.tolist() == [True, True, False]
+    assert orders.tolist() == [-100.0, -1.0, 7.0]
+
+def test_population_is_reproducible():
+    runs = []
+    for _ in range(2):
+        population = Population(MeanReversionHFT(), 300, seed=5)
+        flow = [population.tick_decision(35.0 + 0.01 * tick, 35.0) for tick in range(200)]
+        runs.append((flow, population.get_state().get_column('cash').copy()))
+    assert runs[0][0] == runs[1][0]
+    assert np.array_equal(runs[0][1], runs[1][1])
+
+@pytest.mark.parametrize('run', sorted(BEFORE))
+def test_builtin_traders_keep_their_price_path(run):
+    if run == 'plain':
+        found = simulated(1500)
+    elif run == 'churn':
+        found = simulated(1500, chunks=2, churn={'noise': 20, 'momentum': 5, 'value': 5}, accounting=True)
+    elif run == 'book':
+        found = simulated(800, order_book=True)
+    elif run == 'replicas':
+        found = traded(ReplicaNode(3, seed=1), [NoiseTrader(300, replicas=3, seed=2), MomentumTrader(100, replicas=3, seed=3),
+                                                ValueInvestors(150, replicas=3, seed=4)], lambda node: node.get_current_price())
+    else:
+        found = traded(Node(seed=1), [NoiseTrader(300, seed=2, dtypes=COMPACT), MomentumTrader(100, seed=3, dtypes=COMPACT),
+                                      ValueInvestors(150, seed=4, dtypes=COMPACT)], lambda node: node.get_tick_price_history())
+    assert found == BEFORE[run]
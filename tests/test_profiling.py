@@ -0,0 +1,26 @@
+import threading
+from profiling import Profiler
+from simulation import Simulation
+
+def test_concurrent_laps_and_counts_are_not_lost():
+    profiler = Profiler(verbose=False)
+    def work() -> None:
+        for _ in range(20000):
+            profiler.count('shared', 1)
+            profiler.lap('shared', profiler.clock())
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert profiler.end_day(0)['counts']['shared'] == 8 * 20000
+
+def test_thread_pool_counts_match_sequential():
+    rows = []
+    for workers in (0, 3):
+        profiler = Profiler(verbose=False)
+        simulation = Simulation(3000, 1200, 1800, seed=13, chunks=4, workers=workers, day_tick=200, profiler=profiler)
+        simulation.run(400)
+        simulation.close()
+        rows.append([day['counts'] for day in profiler.get_days()])
+    assert rows[0] == rows[1]
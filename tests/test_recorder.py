@@ -0,0 +1,51 @@
+import json
+import os
+import numpy as np
+import pytest
+from recorder import META_FILE, TickReader, TickRecorder
+from simulation import Simulation
+
+def record(directory: str, ticks: int, seed: int, day_tick: int = 100) -> None:
+    simulation = Simulation(seed=seed, day_tick=day_tick, recorder=TickRecorder(directory, day_tick))
+    simulation.run(ticks)
+    simulation.close()
+
+def read(directory: str) -> tuple:
+    reader = TickReader(directory)
+    return reader.get_day_ticks().tolist(), [reader.get_day(day)['price'] for day in range(reader.get_days())]
+
+def test_second_run_resumes_after_recorded_days(tmp_path):
+    record(str(tmp_path / 'first'), 250, 1)
+    record(str(tmp_path / 'second'), 150, 2)
+    record(str(tmp_path / 'both'), 250, 1)
+    record(str(tmp_path / 'both'), 150, 2)
+    first_ticks, first = read(str(tmp_path / 'first'))
+    second_ticks, second = read(str(tmp_path / 'second'))
+    both_ticks, both = read(str(tmp_path / 'both'))
+    assert both_ticks == first_ticks + second_ticks
+    assert all(np.array_equal(day, expected) for day, expected in zip(both, first + second))
+    assert os.path.getsize(str(tmp_path / 'both' / 'price.f64')) == len(both_ticks) * 100 * 8
+
+def test_rows_meta_does_not_count_are_cut(tmp_path):
+    directory = str(tmp_path)
+    record(directory, 200, 1)
+    days = TickReader(directory).get_days()
+    with open(os.path.join(directory, 'price.f64'), 'ab') as file:
+        file.write(np.zeros(30).tobytes())
+    TickRecorder(directory, 100).close()
+    assert os.path.getsize(os.path.join(directory, 'price.f64')) == days * 100 * 8
+    assert TickReader(directory).get_days() == days
+
+def test_mismatched_directory_is_refused(tmp_path):
+    directory = str(tmp_path)
+    record(directory, 100, 1)
+    with pytest.raises(ValueError):
+        TickRecorder(directory, 50)
+    with open(os.path.join(directory, META_FILE)) as file:
+        meta = json.load(file)
+    meta['days'] += 1
+    meta['day_ticks'].append(100)
+    with open(os.path.join(directory, META_FILE), 'w') as file:
+        json.dump(meta, file)
+    with pytest.raises(ValueError):
+        TickRecorder(directory, 100)
@@ -0,0 +1,30 @@
+import numpy as np
+from replay import Replay
+from simulation import Simulation
+from VectorizationTrader import NoiseTrader, MomentumTrader, ValueInvestors
+
+POPULATIONS = (('noise', NoiseTrader, 300), ('momentum', MomentumTrader, 100), ('value', ValueInvestors, 200))
+
+def replay(prices: np.ndarray, block: int, sources=POPULATIONS) -> Replay:
+    path = Replay(prices, seed=5, block=block)
+    for source, population, size in sources:
+        path.add(source, population(size, seed=9))
+    path.run()
+    return path
+
+def test_results_do_not_depend_on_the_block():
+    simulation = Simulation(seed=2, day_tick=1000)
+    prices = []
+    for _ in range(4000):
+        simulation.step()
+        prices.append(simulation.get_node().get_current_price())
+    prices = np.array(prices)
+    whole = replay(prices, prices.size)
+    for block in (100, 777):
+        blocked = replay(prices, block)
+        for source, _, _ in POPULATIONS:
+            assert np.array_equal(whole.get_pnl(source), blocked.get_pnl(source))
+            assert np.array_equal(whole.get_trades(source), blocked.get_trades(source))
+    # a population's draws are its own, the ones added after it do not move them
+    alone = replay(prices, 100, POPULATIONS[:1])
+    assert np.array_equal(whole.get_pnl('noise'), alone.get_pnl('noise'))
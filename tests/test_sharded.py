@@ -0,0 +1,28 @@
+import multiprocessing
+import numpy as np
+import pytest
+from sharded import ShardedSimulation
+from simulation import Simulation
+
+def test_shards_match_in_process_chunks():
+    sharded = ShardedSimulation(600, 240, 360, seed=5, workers=2, day_tick=200)
+    try:
+        sharded.run(300)
+    finally:
+        sharded.close()
+    chunked = Simulation(600, 240, 360, seed=5, chunks=2, day_tick=200)
+    chunked.run(300)
+    assert np.array_equal(sharded.get_node().get_tick_price_history(), chunked.get_node().get_tick_price_history())
+
+def test_a_dead_shard_stops_the_run():
+    sharded = ShardedSimulation(60, 24, 36, seed=5, workers=2, day_tick=200)
+    try:
+        sharded.run(5)
+        for child in multiprocessing.active_children():
+            if child.name == 'shard-1':
+                child.terminate()
+                child.join()
+        with pytest.raises(RuntimeError, match=r'shards \[1\] exited'):
+            sharded.step()
+    finally:
+        sharded.close()
@@ -0,0 +1,21 @@
+import numpy as np
+from simulation import Simulation
+
+def prices(simulation) -> np.ndarray:
+    return simulation.get_node().get_tick_price_history()
+
+def test_thread_pool_matches_sequential():
+    sequential = Simulation(3000, 1200, 1800, seed=13, chunks=4)
+    sequential.run(400)
+    pooled = Simulation(3000, 1200, 1800, seed=13, chunks=4, workers=3)
+    pooled.run(400)
+    pooled.close()
+    assert np.array_equal(prices(sequential), prices(pooled))
+
+def test_day_boundaries_match_one_long_run():
+    whole = Simulation(seed=7, day_tick=300)
+    whole.run(1000)
+    stepped = Simulation(seed=7, day_tick=300)
+    for ticks in (1, 299, 300, 400):
+        stepped.run(ticks)
+    assert np.array_equal(prices(whole), prices(stepped))
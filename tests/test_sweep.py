@@ -0,0 +1,12 @@
+from sweep import grid_design, load_results, run_sweep
+
+def test_resume_recomputes_runs_with_another_horizon(tmp_path):
+    path = str(tmp_path / 'sweep.jsonl')
+    design = grid_design(noise=[50, 80], momentum=[0], value=[20])
+    first = list(run_sweep(design, 40, path, workers=1))
+    assert len(first) == 2 and all(result['horizon'] == 40 for result in first)
+    assert list(run_sweep(design, 40, path, workers=1)) == []
+    longer = list(run_sweep(design, 60, path, workers=1))
+    assert len(longer) == 2 and all(result['ticks'] == 60 for result in longer)
+    assert len(list(run_sweep(design, 40, path, workers=1, seed=1))) == 2
+    assert len(load_results(path)) == 6